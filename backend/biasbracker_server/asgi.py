@@ -14,7 +14,9 @@ django_asgi_app = get_asgi_application()
 
 websocket_urlpatterns = [
     path("ws/eye-tracking/", EyeTrackingConsumer.as_asgi()),
+    path("ws/eye-tracking/<str:session_id>/", EyeTrackingConsumer.as_asgi()),
     path("ws/gaze-collector/", GazeCollectorConsumer.as_asgi()),
+    path("ws/gaze-collector/<str:session_id>/", GazeCollectorConsumer.as_asgi()),
 ]
 
 application = ProtocolTypeRouter({
@@ -96,11 +96,49 @@ WSGI_APPLICATION = 'biasbracker_server.wsgi.application'
 
 ASGI_APPLICATION = 'biasbracker_server.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# The in-memory layer only reaches consumers in the same process. Set
+# CHANNEL_LAYER_URL to a Redis URL to share group broadcasts between ASGI
+# workers; CHANNEL_LAYER_BACKEND picks Redis pub/sub ("pubsub", one PUBLISH
+# per broadcast) or the list-based "core" layer (per-channel capacity and
+# expiry). `manage.py pubsub_standin` serves the pubsub protocol locally.
+CHANNEL_LAYER_URL = getenv("CHANNEL_LAYER_URL")
+CHANNEL_LAYER_BACKEND = getenv("CHANNEL_LAYER_BACKEND", "pubsub")
+
+if CHANNEL_LAYER_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": (
+                "channels_redis.core.RedisChannelLayer" if CHANNEL_LAYER_BACKEND == "core"
+                else "channels_redis.pubsub.RedisPubSubChannelLayer"
+            ),
+            "CONFIG": {"hosts": [CHANNEL_LAYER_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Gaze samples are buffered per session and written with bulk_create once a
+# batch reaches GAZE_WRITER_MAX_ROWS rows or GAZE_WRITER_MAX_LATENCY seconds.
+GAZE_WRITER_MAX_ROWS = int(getenv("GAZE_WRITER_MAX_ROWS", "500"))
+GAZE_WRITER_MAX_LATENCY = float(getenv("GAZE_WRITER_MAX_LATENCY", "0.25"))
+# Collectors in a process share one writer per table. Once one buffers
+# GAZE_WRITER_MAX_PENDING rows, GAZE_WRITER_POLICY applies: "drop-newest",
+# "drop-oldest", or "spill" to a temporary file in GAZE_WRITER_SPILL_DIR.
+GAZE_WRITER_MAX_PENDING = int(getenv("GAZE_WRITER_MAX_PENDING", "20000"))
+GAZE_WRITER_POLICY = getenv("GAZE_WRITER_POLICY", "drop-newest")
+GAZE_WRITER_SPILL_DIR = getenv("GAZE_WRITER_SPILL_DIR") or None
+# Minimum seconds (sender clock) between persisted samples; 0 keeps every one.
+GAZE_SAVE_INTERVAL = float(getenv("GAZE_SAVE_INTERVAL", "0.1"))
+
+# Opt-in: once a stopped session's collectors have flushed, pack its GazeData
+# into a columnar GazeArchive. Unless GAZE_ARCHIVE_DELETE_RAW is also set the
+# raw rows are kept, so the samples are stored twice.
+GAZE_ARCHIVE_ON_STOP = getenv("GAZE_ARCHIVE_ON_STOP", "False") == "True"
+GAZE_ARCHIVE_DELETE_RAW = getenv("GAZE_ARCHIVE_DELETE_RAW", "False") == "True"
 
 
 
@@ -0,0 +1,98 @@
+"""Areas of interest: map gaze points to the article sections on screen.
+
+The page registers the bounding box of each rendered section (see
+``AreaOfInterest``) in viewport pixels. ``AOIIndex`` answers "which box is
+this point in" with two binary searches: the x axis is cut into slabs at
+every distinct left/right edge, and each slab into cells at the top/bottom
+edges of the boxes spanning it. Where boxes overlap, a cell belongs to the
+smallest one, i.e. the most specific section. Gaze points in another
+coordinate space are brought into the viewport with ``to_viewport`` first.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from channels.db import database_sync_to_async
+from .attention import SCREEN_HEIGHT, SCREEN_WIDTH
+from .models import AreaOfInterest, EyeTrackingSession
+
+Box = namedtuple("Box", "key left top right bottom")
+
+
+def _cell(edges, value):
+    """Index of the ``[edges[i], edges[i + 1])`` interval holding ``value``,
+    closed on the last edge, or None outside them all."""
+    i = bisect_right(edges, value) - 1
+    if i == len(edges) - 1 and edges and value == edges[-1]:
+        i -= 1
+    return i if 0 <= i < len(edges) - 1 else None
+
+
+class AOIIndex:
+    """Point lookup over a fixed set of ``Box``es in O(log n) per point.
+
+    ``width`` and ``height`` are the viewport the boxes were measured in, if
+    the page reported it.
+    """
+
+    def __init__(self, boxes=(), width=None, height=None):
+        self.boxes = [box for box in boxes if box.right > box.left and box.bottom > box.top]
+        self.width = width
+        self.height = height
+        self.xs = sorted({edge for box in self.boxes for edge in (box.left, box.right)})
+        self.slabs = []
+        for x0, x1 in zip(self.xs, self.xs[1:]):
+            spanning = [box for box in self.boxes if box.left <= x0 and box.right >= x1]
+            ys = sorted({edge for box in spanning for edge in (box.top, box.bottom)})
+            owners = []
+            for y0, y1 in zip(ys, ys[1:]):
+                inside = [box for box in spanning if box.top <= y0 and box.bottom >= y1]
+                owners.append(min(
+                    inside, key=lambda box: (box.right - box.left) * (box.bottom - box.top), default=None
+                ))
+            self.slabs.append((ys, owners))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def to_viewport(self, x, y, space):
+        """``(x, y)`` in ``space`` (see ``protocol.COORDINATE_SPACES``) as
+        viewport pixels.
+
+        The page is assumed to fill the screen, so screen pixels and
+        fractions of the screen scale onto the viewport; without a reported
+        viewport, screen pixels stand in for it.
+        """
+        if space == "viewport":
+            return x, y
+        width, height = self.width or SCREEN_WIDTH, self.height or SCREEN_HEIGHT
+        if space == "normalised":
+            return x * width, y * height
+        return x * width / SCREEN_WIDTH, y * height / SCREEN_HEIGHT
+
+    def locate(self, x, y):
+        """The key of the box containing viewport point ``(x, y)``, or None."""
+        i = _cell(self.xs, x)
+        if i is None:
+            return None
+        ys, owners = self.slabs[i]
+        j = _cell(ys, y)
+        if j is None or owners[j] is None:
+            return None
+        return owners[j].key
+
+
+def session_index(session_pk):
+    """An ``AOIIndex`` over a session's registered areas, keyed by AOI pk."""
+    session = EyeTrackingSession.objects.filter(pk=session_pk).values(
+        "viewport_width", "viewport_height"
+    ).first()
+    if session is None:
+        return AOIIndex()
+    areas = AreaOfInterest.objects.filter(session_id=session_pk).values_list(
+        "pk", "left", "top", "right", "bottom"
+    )
+    return AOIIndex(
+        [Box(*area) for area in areas], session["viewport_width"], session["viewport_height"]
+    )
+
+
+load_session_index = database_sync_to_async(session_index)
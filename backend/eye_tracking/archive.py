@@ -0,0 +1,177 @@
+"""Columnar archive of finished sessions' gaze samples.
+
+``pack`` turns a session's samples into one zlib-compressed blob holding
+``sample_count`` little-endian values per column, column after column:
+
+    id     int64    difference from the previous sample's id
+    t      int64    difference from the previous sample's time, in
+                    microseconds; the first is relative to GazeArchive.t0
+    x, y   float32
+    pupil  float32  NaN where missing
+
+Delta-encoded ids and times are near-constant and compress to almost
+nothing. ``unpack`` decompresses once and maps each column onto that buffer
+with ``np.frombuffer``, so x, y and pupil are read without copying.
+GazeData rows written after the archive (ids above ``last_id``) are merged
+in by ``session_columns``.
+"""
+import zlib
+from collections import namedtuple
+import numpy as np
+from django.db import transaction
+from .models import EyeTrackingSession, GazeArchive, GazeData
+
+ARCHIVE_VERSION = 1
+PACKED_DTYPES = tuple(np.dtype(code) for code in ("<i8", "<i8", "<f4", "<f4", "<f4"))
+PACKED_ROW_SIZE = sum(dtype.itemsize for dtype in PACKED_DTYPES)
+COMPRESSION_LEVEL = 6
+COLUMN_FIELDS = ("id", "timestamp", "gaze_x", "gaze_y", "pupil_diameter")
+
+
+class GazeColumns(namedtuple("GazeColumns", "id t x y pupil")):
+    """A session's samples as parallel arrays sorted by time.
+
+    ``t`` is float64 epoch seconds; ``pupil`` is NaN where the sample had none.
+    """
+    __slots__ = ()
+
+    @property
+    def size(self):
+        return len(self.id)
+
+    def take(self, index):
+        return GazeColumns(*(column[index] for column in self))
+
+
+def empty_columns():
+    return GazeColumns(
+        np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0), np.empty(0)
+    )
+
+
+def raw_columns(session, after_id=None):
+    """Load a session's GazeData rows, optionally only those after ``after_id``."""
+    rows = GazeData.objects.filter(session=session)
+    if after_id is not None:
+        rows = rows.filter(id__gt=after_id)
+    return rows_to_columns(list(
+        rows.order_by("timestamp", "id")
+        .values_list(*COLUMN_FIELDS)
+        .iterator(chunk_size=10000)
+    ))
+
+
+def rows_to_columns(rows):
+    """Build ``GazeColumns`` from ``values_list(*COLUMN_FIELDS)`` tuples."""
+    if not rows:
+        return empty_columns()
+    ids, timestamps, x, y, pupil = zip(*rows)
+    return GazeColumns(
+        np.array(ids, dtype=np.int64),
+        np.array([timestamp.timestamp() for timestamp in timestamps]),
+        np.array(x, dtype=np.float64),
+        np.array(y, dtype=np.float64),
+        # None becomes NaN.
+        np.array(pupil, dtype=np.float64),
+    )
+
+
+def pack(columns):
+    """Return ``(t0, blob)`` for ``columns``."""
+    t0 = float(columns.t[0]) if columns.size else 0.0
+    micros = np.round((columns.t - t0) * 1e6).astype(np.int64)
+    packed = (
+        np.diff(columns.id, prepend=0),
+        np.diff(micros, prepend=0),
+        columns.x,
+        columns.y,
+        columns.pupil,
+    )
+    body = b"".join(column.astype(dtype).tobytes() for column, dtype in zip(packed, PACKED_DTYPES))
+    return t0, zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def packed_columns(archive):
+    """The archive's columns as stored (ids and times still delta-encoded),
+    each a read-only view onto one decompressed buffer."""
+    if archive.format_version != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported gaze archive version {archive.format_version}.")
+    n = archive.sample_count
+    buffer = zlib.decompress(archive.data, bufsize=max(n * PACKED_ROW_SIZE, 1))
+    columns = []
+    offset = 0
+    for dtype in PACKED_DTYPES:
+        columns.append(np.frombuffer(buffer, dtype=dtype, count=n, offset=offset))
+        offset += n * dtype.itemsize
+    return GazeColumns(*columns)
+
+
+def unpack(archive):
+    packed = packed_columns(archive)
+    return GazeColumns(
+        np.cumsum(packed.id), np.cumsum(packed.t) / 1e6 + archive.t0, packed.x, packed.y, packed.pupil
+    )
+
+
+def iter_unpacked(archive, chunk_size):
+    """``unpack`` a chunk at a time, decoding ids and times as it goes."""
+    packed = packed_columns(archive)
+    last_id = last_micros = 0
+    for start in range(0, packed.size, chunk_size):
+        chunk = packed.take(slice(start, start + chunk_size))
+        ids = np.cumsum(chunk.id) + last_id
+        micros = np.cumsum(chunk.t) + last_micros
+        last_id = int(ids[-1])
+        last_micros = int(micros[-1])
+        yield GazeColumns(ids, micros / 1e6 + archive.t0, chunk.x, chunk.y, chunk.pupil)
+
+
+def session_columns(session):
+    """All of a session's samples, from its archive and/or the GazeData table."""
+    archive = GazeArchive.objects.filter(session=session).first()
+    if archive is None:
+        return raw_columns(session)
+    archived = unpack(archive)
+    late = raw_columns(session, after_id=archive.last_id)
+    if not late.size:
+        return archived
+    merged = GazeColumns(*(np.concatenate(pair) for pair in zip(archived, late)))
+    return merged.take(np.lexsort((merged.id, merged.t)))
+
+
+def session_sample_count(session):
+    """How many samples ``session_columns`` would return, counted in SQL."""
+    archive = GazeArchive.objects.filter(session=session).values_list("sample_count", "last_id").first()
+    if archive is None:
+        return GazeData.objects.filter(session=session).count()
+    sample_count, last_id = archive
+    return sample_count + GazeData.objects.filter(session=session, id__gt=last_id).count()
+
+
+def archive_session(session, delete_raw=False):
+    """Pack ``session`` into its GazeArchive, replacing any earlier archive.
+
+    Re-archiving picks up rows written since the last run. With
+    ``delete_raw`` the archived GazeData rows are removed afterwards.
+    Returns the archive, or None if the session has no samples.
+    """
+    with transaction.atomic():
+        # Workers that each saw the session end archive it one at a time.
+        EyeTrackingSession.objects.select_for_update().get(pk=session.pk)
+        columns = session_columns(session)
+        if not columns.size:
+            return None
+        t0, data = pack(columns)
+        archive, _ = GazeArchive.objects.update_or_create(
+            session=session,
+            defaults={
+                "format_version": ARCHIVE_VERSION,
+                "sample_count": columns.size,
+                "last_id": int(columns.id.max()),
+                "t0": t0,
+                "data": data,
+            },
+        )
+        if delete_raw:
+            GazeData.objects.filter(session=session, id__lte=archive.last_id).delete()
+    return archive
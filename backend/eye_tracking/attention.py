@@ -0,0 +1,309 @@
+"""Streaming attention score for one gaze stream.
+
+``AttentionScorer`` keeps four statistics over a sliding window of the most
+recent samples:
+
+* off-screen ratio: the share of the window's time with gaze off the screen,
+  counting gaps longer than ``MAX_GAP`` (no samples at all, e.g. the tracker
+  lost the eyes) as off-screen, including a gap that is still open: trackers
+  send nothing while the eyes are lost, so the caller passes the time since
+  the last sample as ``idle``;
+* dispersion: the RMS distance of on-screen gaze from its centroid;
+* velocity: the mean gaze speed over ``VELOCITY_STRIDE`` samples, which
+  averages tracker noise out of the sample-to-sample jitter;
+* pupil trend: the least-squares slope of pupil size over time, relative to
+  the mean size.
+
+Each statistic is a Welford-style accumulator that supports removal as well
+as addition, over preallocated storage, so a sample costs O(1) with no
+allocation however large the window. ``score()`` folds the statistics into a
+0-1 value: the on-screen share, scaled by how close dispersion and velocity
+are to the ranges seen while reading and by how steady the pupil is.
+
+Times are in seconds and coordinates in screen pixels; normalised points
+(both coordinates within 0-1) are scaled by ``SCREEN_WIDTH`` x ``SCREEN_HEIGHT``.
+"""
+import math
+from array import array
+from .events import MAX_GAP
+
+ATTENTION_WINDOW = 240
+VELOCITY_STRIDE = 12
+SCREEN_WIDTH = 1920.0
+SCREEN_HEIGHT = 1080.0
+# A single sample never stands for more than this much time, however long
+# the gap before it.
+MAX_SPAN = 2.0
+# Running sums are rebuilt from the stored samples this often (in pushes) so
+# floating-point error from add/subtract pairs cannot accumulate.
+RESUM_INTERVAL = 4096
+# Window dispersion (px) and mean speed (px/s) of someone reading a page.
+# Less means staring, more means scanning the screen.
+READING_DISPERSION = (20.0, 400.0)
+READING_VELOCITY = (100.0, 1500.0)
+# Relative pupil shrinkage per second at which the pupil term reaches zero.
+PUPIL_DECLINE = 0.05
+DISPERSION_WEIGHT = 0.4
+VELOCITY_WEIGHT = 0.4
+PUPIL_WEIGHT = 0.2
+# Fewer on-screen samples than this leave dispersion and velocity neutral.
+MIN_SAMPLES = 10
+
+NAN = float("nan")
+
+
+def _band(value, low, high):
+    """1 within ``[low, high]``, falling off in proportion outside it."""
+    if value < low:
+        return value / low
+    if value > high:
+        return high / value
+    return 1.0
+
+
+class _RunningMean:
+    """Mean and sum of squared deviations of a window of values."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self.mean = self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        self.n -= 1
+        if self.n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return max(self.m2, 0.0) / self.n if self.n else 0.0
+
+
+class _RunningSlope:
+    """Least-squares slope of ``y`` over ``t`` for a window of points."""
+
+    __slots__ = ("n", "mean_t", "mean_y", "m2_t", "c_ty")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self.mean_t = self.mean_y = self.m2_t = self.c_ty = 0.0
+
+    def add(self, t, y):
+        self.n += 1
+        dt = t - self.mean_t
+        self.mean_t += dt / self.n
+        self.mean_y += (y - self.mean_y) / self.n
+        self.m2_t += dt * (t - self.mean_t)
+        self.c_ty += dt * (y - self.mean_y)
+
+    def remove(self, t, y):
+        self.n -= 1
+        if self.n == 0:
+            self.clear()
+            return
+        old_t = self.mean_t
+        dy = y - self.mean_y
+        self.mean_t -= (t - old_t) / self.n
+        self.mean_y -= dy / self.n
+        dt = t - self.mean_t
+        self.m2_t -= dt * (t - old_t)
+        self.c_ty -= dt * dy
+
+    @property
+    def slope(self):
+        return self.c_ty / self.m2_t if self.n > 1 and self.m2_t > 0 else 0.0
+
+
+class AttentionScorer:
+    """Sliding-window attention statistics of the last ``capacity`` samples.
+
+    Off-screen points and missing pupils are stored as NaN and left out of
+    the statistics they would distort.
+    """
+
+    __slots__ = (
+        "capacity", "xs", "ys", "ts", "pupils", "speeds", "spans", "aways",
+        "head", "count", "t0", "last_t", "last_on_screen",
+        "x", "y", "velocity", "pupil", "span_sum", "away_sum", "pushes_since_resum",
+    )
+
+    def __init__(self, capacity=ATTENTION_WINDOW):
+        self.capacity = capacity
+        self.xs = array("d", bytes(8 * capacity))
+        self.ys = array("d", bytes(8 * capacity))
+        self.ts = array("d", bytes(8 * capacity))
+        self.pupils = array("d", bytes(8 * capacity))
+        self.speeds = array("d", bytes(8 * capacity))
+        self.spans = array("d", bytes(8 * capacity))
+        self.aways = array("d", bytes(8 * capacity))
+        self.x = _RunningMean()
+        self.y = _RunningMean()
+        self.velocity = _RunningMean()
+        self.pupil = _RunningSlope()
+        self.reset()
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        """Forget the window, e.g. when the stream switches session."""
+        self.head = self.count = 0
+        self.t0 = None
+        self.last_t = 0.0
+        self.last_on_screen = False
+        self.x.clear()
+        self.y.clear()
+        self.velocity.clear()
+        self.pupil.clear()
+        self.span_sum = self.away_sum = 0.0
+        self.pushes_since_resum = 0
+
+    def push(self, t, x, y, pupil):
+        if 0 <= x <= 1 and 0 <= y <= 1:
+            x *= SCREEN_WIDTH
+            y *= SCREEN_HEIGHT
+        if self.t0 is None:
+            # Relative times keep the slope accumulators well conditioned.
+            self.t0 = t
+            span = 0.0
+        else:
+            span = min(max(t - self.t0 - self.last_t, 0.0), MAX_SPAN)
+        t -= self.t0
+        on_screen = 0 <= x <= SCREEN_WIDTH and 0 <= y <= SCREEN_HEIGHT
+        away = span if not on_screen or span > MAX_GAP else 0.0
+        if not (pupil and pupil > 0):
+            pupil = NAN
+        self.last_t = t
+        self.last_on_screen = on_screen
+        if not on_screen:
+            x = y = NAN
+
+        i = self.head
+        speed = NAN
+        if self.count >= VELOCITY_STRIDE:
+            j = i - VELOCITY_STRIDE
+            if j < 0:
+                j += self.capacity
+            elapsed = t - self.ts[j]
+            # Off-screen endpoints give NaN; strides across a long gap are skipped.
+            if 0 < elapsed <= MAX_GAP * 2:
+                speed = math.hypot(x - self.xs[j], y - self.ys[j]) / elapsed
+        if self.count == self.capacity:
+            self.evict(i)
+        else:
+            self.count += 1
+        self.xs[i] = x
+        self.ys[i] = y
+        self.ts[i] = t
+        self.pupils[i] = pupil
+        self.speeds[i] = speed
+        self.spans[i] = span
+        self.aways[i] = away
+        self.include(i)
+        self.head = i + 1 if i + 1 < self.capacity else 0
+
+        self.pushes_since_resum += 1
+        if self.pushes_since_resum >= RESUM_INTERVAL:
+            self.resum()
+
+    def include(self, i):
+        x = self.xs[i]
+        if x == x:
+            self.x.add(x)
+            self.y.add(self.ys[i])
+        speed = self.speeds[i]
+        if speed == speed:
+            self.velocity.add(speed)
+        pupil = self.pupils[i]
+        if pupil == pupil:
+            self.pupil.add(self.ts[i], pupil)
+        self.span_sum += self.spans[i]
+        self.away_sum += self.aways[i]
+
+    def evict(self, i):
+        x = self.xs[i]
+        if x == x:
+            self.x.remove(x)
+            self.y.remove(self.ys[i])
+        speed = self.speeds[i]
+        if speed == speed:
+            self.velocity.remove(speed)
+        pupil = self.pupils[i]
+        if pupil == pupil:
+            self.pupil.remove(self.ts[i], pupil)
+        self.span_sum -= self.spans[i]
+        self.away_sum -= self.aways[i]
+
+    def resum(self):
+        """Rebuild the accumulators from the stored samples so rounding error
+        from add/remove pairs cannot build up."""
+        self.x.clear()
+        self.y.clear()
+        self.velocity.clear()
+        self.pupil.clear()
+        self.span_sum = self.away_sum = 0.0
+        start = self.head if self.count == self.capacity else 0
+        for k in range(self.count):
+            self.include((start + k) % self.capacity)
+        self.pushes_since_resum = 0
+
+    def off_screen_ratio(self, idle=0.0):
+        """Share of the window's time away, ``idle`` seconds after its last sample."""
+        if idle <= MAX_GAP:
+            idle = 0.0
+        span = self.span_sum + idle
+        if span > 0:
+            return min((self.away_sum + idle) / span, 1.0)
+        return 0.0 if self.last_on_screen or not self.count else 1.0
+
+    @property
+    def dispersion(self):
+        return math.sqrt(self.x.variance + self.y.variance)
+
+    @property
+    def mean_velocity(self):
+        return self.velocity.mean
+
+    @property
+    def pupil_trend(self):
+        """Pupil size change per second as a fraction of the mean size."""
+        mean = self.pupil.mean_y
+        return self.pupil.slope / mean if mean > 0 else 0.0
+
+    def score(self, idle=0.0):
+        """0-1 score; with no samples for ``idle`` s it decays towards 0."""
+        if not self.count:
+            return 0.0
+        dispersion = _band(self.dispersion, *READING_DISPERSION) if self.x.n >= MIN_SAMPLES else 1.0
+        velocity = _band(self.mean_velocity, *READING_VELOCITY) if self.velocity.n >= MIN_SAMPLES else 1.0
+        pupil = min(max(1.0 + self.pupil_trend / PUPIL_DECLINE, 0.0), 1.0)
+        engagement = DISPERSION_WEIGHT * dispersion + VELOCITY_WEIGHT * velocity + PUPIL_WEIGHT * pupil
+        return (1.0 - self.off_screen_ratio(idle)) * engagement
+
+    def summary(self, idle=0.0):
+        """The score and the statistics behind it, for broadcasting."""
+        return {
+            "score": round(self.score(idle), 3),
+            "off_screen_ratio": round(self.off_screen_ratio(idle), 3),
+            "dispersion": round(self.dispersion, 1),
+            "velocity": round(self.mean_velocity, 1),
+            "pupil_trend": round(self.pupil_trend, 4),
+            "samples": self.count,
+        }
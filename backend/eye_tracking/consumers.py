@@ -1,19 +1,39 @@
+import asyncio
 import logging
 import time
 import math
 import random
-import asyncio
+import re
+from datetime import datetime, timezone
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import EyeTrackingSession, GazeData
+from django.conf import settings
+from . import metrics
+from .aoi import AOIIndex, load_session_index
+from .attention import AttentionScorer
+from .events import Fixation, IDTDetector
+from .protocol import COORDINATE_SPACES, DEFAULT_SPACE, RECORD_FIELDS, FrameError, decode_frame
+from .scheduler import ticker, writer_pool
 
 logger = logging.getLogger("django")
 
-GAZE_HISTORY_SIZE = 50
-FIXATION_THRESHOLD = 80
+# Attention scores are sent every scheduler.ATTENTION_INTERVAL.
+# An alert fires once the score has stayed below the threshold this long.
+ATTENTION_THRESHOLD = 0.35
 LOST_FOCUS_THRESHOLD = 3
 ALERT_COOLDOWN = 10
 
+# clock.sync probes set a connection's clock offset. Samples may lower it by
+# at most this many seconds to follow drift between the two clocks; samples
+# from further ahead than that are rejected.
+CLOCK_DRIFT_LIMIT = 0.5
+
+# Sources that send no session_id share this group with unscoped viewers.
+LEGACY_GROUP = "eye_tracking"
+# Those sources hear about every session starting and ending, since their
+# samples go to whichever session is the newest open one.
+LEGACY_COLLECTOR_GROUP = "gaze_collector"
+GROUP_NAME_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
 ALERT_MESSAGES = [
     "👀 Feeling distracted? Take a breath and dive back in for fresh discoveries!",
     "✨ Your focus matters—re-center now to unlock new insights!",
@@ -31,26 +51,66 @@ ALERT_MESSAGES = [
 def choose_alert_message():
     return random.choice(ALERT_MESSAGES)
 
+
+# Sender times beyond this many seconds (some 3000 years) are rejected, so
+# adding the clock offset to one keeps sub-millisecond precision.
+MAX_SENDER_TIME = 1e11
+
+
+def finite_time(value):
+    """``value`` as float seconds, or None unless it is a plausible time."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if abs(value) < MAX_SENDER_TIME else None
+
+
+def is_finite(value):
+    if not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def session_group(session_id):
+    """Group of the viewers watching one session's gaze stream and alerts."""
+    if not session_id or session_id == "unknown":
+        return LEGACY_GROUP
+    return f"eye_tracking.{GROUP_NAME_UNSAFE.sub('_', session_id)[:80]}"
+
+
+def collector_group(session_id):
+    """Group of the collectors feeding one session, for lifecycle events."""
+    if not session_id or session_id == "unknown":
+        return LEGACY_COLLECTOR_GROUP
+    return f"gaze_collector.{GROUP_NAME_UNSAFE.sub('_', session_id)[:80]}"
+
+
 class EyeTrackingConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
+        session_id = self.scope["url_route"]["kwargs"].get("session_id")
+        self.group_name = session_group(session_id)
         await self.accept()
-        await self.channel_layer.group_add("eye_tracking", self.channel_name)
-        logger.info("Front-end client connected to EyeTrackingConsumer.")
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        logger.info(f"Front-end client connected to EyeTrackingConsumer ({self.group_name}).")
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("eye_tracking", self.channel_name)
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
         logger.info("Front-end client disconnected from EyeTrackingConsumer.")
 
     async def receive_json(self, content):
         if content.get("type") == "eye.data":
             payload = content.get("payload", {})
             await self.channel_layer.group_send(
-                "eye_tracking", {"type": "broadcast.gaze", "data": payload}
+                self.group_name, {"type": "broadcast.gaze", "data": payload}
             )
         elif content.get("type") == "eye.alert":
             msg = content.get("message", "Attention alert!")
             await self.channel_layer.group_send(
-                "eye_tracking", {"type": "broadcast.alert", "message": msg}
+                self.group_name, {"type": "broadcast.alert", "message": msg}
             )
 
     async def broadcast_gaze(self, event):
@@ -59,51 +119,112 @@ class EyeTrackingConsumer(AsyncJsonWebsocketConsumer):
     async def broadcast_alert(self, event):
         await self.send_json({"type": "eye.alert", "message": event["message"]})
 
+    async def broadcast_attention(self, event):
+        await self.send_json({"type": "eye.attention", "payload": event["data"]})
+
 
 class GazeCollectorConsumer(AsyncJsonWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.latest_gaze = None
-        self.last_broadcasted_gaze = None
-        self.gaze_history = []
-        self.last_reading_timestamp = time.time()
+        self.fixations = IDTDetector()
+        self.attention = AttentionScorer()
+        # Server time the last sample arrived; None until the session has one.
+        self.last_sample_at = None
+        self.distracted_since = None
         self.last_alert_time = 0
+        # Sender time of the last stored sample.
         self.last_save_time = 0
-        self.broadcast_interval = 0.05
-        self.save_queue = asyncio.Queue(maxsize=200)
-        self.save_workers = []
+        self.session_id = None
+        self.viewer_group = LEGACY_GROUP
+        self.areas = AOIIndex()
+        # Coordinate space of the samples being fed to the fixation detector.
+        self.space = DEFAULT_SPACE
+        self.counters = metrics.IngestCounters("collector")
+        # Server time - sender time: maps the sender's clock onto ours for the
+        # timestamps we store. The smallest offset of the clock.sync probes a
+        # sender sends at connect, before any backlog is replayed, narrowed by
+        # at most CLOCK_DRIFT_LIMIT by samples; without probes, samples are
+        # stamped on arrival.
+        self.probe_offset = None
+        self.clock_offset = None
+        # Acks waiting for the samples before a sender's sync marker to be written.
+        self.pending_acks = set()
 
     async def connect(self):
-        await self.channel_layer.group_add("eye_tracking", self.channel_name)
+        # Broadcasting and persistence are shared by all collectors in the
+        # process (see eye_tracking.scheduler) rather than run per connection.
         await self.accept()
+        session_id = self.scope["url_route"]["kwargs"].get("session_id")
+        if session_id:
+            await self.bind_session(session_id)
+        else:
+            await self.channel_layer.group_add(LEGACY_COLLECTOR_GROUP, self.channel_name)
+        # Taken last: disconnect is not called for a connect that raised, so
+        # nothing would give these back.
+        ticker.acquire()
+        ticker.scorers.add(self)
+        writer_pool.acquire()
+        metrics.collectors.add(self)
         logger.info("Tracking source connected to GazeCollectorConsumer.")
-        self.loop_task = asyncio.create_task(self.periodic_broadcast())
-        for _ in range(3):
-            worker = asyncio.create_task(self.save_worker())
-            self.save_workers.append(worker)
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("eye_tracking", self.channel_name)
-        if hasattr(self, "loop_task"):
-            self.loop_task.cancel()
-            try: await self.loop_task
-            except asyncio.CancelledError: pass
-        for worker in self.save_workers:
-            worker.cancel()
-            try: await worker
-            except asyncio.CancelledError: pass
+        for task in self.pending_acks:
+            task.cancel()
+        metrics.collectors.discard(self)
+        ticker.scorers.discard(self)
+        try:
+            await self.channel_layer.group_discard(collector_group(self.session_id), self.channel_name)
+            self.flush_gaze_events()
+            await writer_pool.flush_session(self.session_id or "unknown")
+        finally:
+            # the writers and ticker are shared; never leak this connection's use
+            await writer_pool.release()
+            await ticker.release()
         logger.info("Tracking source disconnected.")
 
-    async def periodic_broadcast(self):
-        while True:
-            await asyncio.sleep(self.broadcast_interval)
-            if self.latest_gaze and self.latest_gaze != self.last_broadcasted_gaze:
-                await self.channel_layer.group_send(
-                    "eye_tracking", {"type": "broadcast.gaze", "data": self.latest_gaze}
-                )
-                self.last_broadcasted_gaze = self.latest_gaze
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        # Binary frames carry packed sample batches; text frames stay JSON.
+        if bytes_data is not None:
+            await self.receive_frame(bytes_data)
+        else:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
+    async def receive_frame(self, bytes_data):
+        try:
+            session_id, source, space, t0, records = decode_frame(bytes_data)
+        except (FrameError, UnicodeDecodeError) as e:
+            logger.warning(f"Invalid gaze frame received: {e}")
+            return
+
+        session_id = session_id or self.session_id or "unknown"
+        source = source or "unknown"
+        for i in range(0, len(records), RECORD_FIELDS):
+            t = t0 + records[i]
+            gaze_x = records[i + 1]
+            gaze_y = records[i + 2]
+            if finite_time(t) is None or not (math.isfinite(gaze_x) and math.isfinite(gaze_y)):
+                continue
+            pupil_diameter = records[i + 3]
+            if not math.isfinite(pupil_diameter):
+                pupil_diameter = None
+            await self.ingest(session_id, gaze_x, gaze_y, pupil_diameter, source, t, space)
 
     async def receive_json(self, content):
+        if content.get("type") == "eye.data.batch":
+            await self.receive_batch(content.get("payload", {}))
+            return
+        if content.get("type") == "clock.sync":
+            sender_time = finite_time(content.get("t"))
+            if sender_time is None:
+                logger.warning("Invalid clock.sync message received.")
+            else:
+                self.observe_probe(sender_time, time.time())
+            return
+        if content.get("type") == "sync":
+            task = asyncio.create_task(self.acknowledge(content.get("seq")))
+            self.pending_acks.add(task)
+            task.add_done_callback(self.pending_acks.discard)
+            return
         if content.get("type") != "eye.data":
             return
 
@@ -112,83 +233,218 @@ class GazeCollectorConsumer(AsyncJsonWebsocketConsumer):
         gaze_y = payload.get("gaze_y")
         pupil_diameter = payload.get("pupil_diameter", 0.0)
         source = payload.get("source", "unknown")
-        session_id = payload.get("session_id", "unknown")
+        space = payload.get("space", DEFAULT_SPACE)
+        session_id = payload.get("session_id") or self.session_id or "unknown"
 
-        if (
-            gaze_x is None or gaze_y is None or
-            (isinstance(gaze_x, float) and math.isnan(gaze_x)) or
-            (isinstance(gaze_y, float) and math.isnan(gaze_y))
-        ):
+        # Capture time on the sender's clock; senders without one are stamped
+        # on arrival, mapped onto whatever clock the connection already uses.
+        if payload.get("t") is None:
+            sample_time = time.time() - (self.clock_offset or 0.0)
+        else:
+            sample_time = finite_time(payload["t"])
+        if (sample_time is None or not is_finite(gaze_x) or not is_finite(gaze_y)
+                or space not in COORDINATE_SPACES):
             logger.warning("Invalid gaze data received.")
             return
+        if not is_finite(pupil_diameter):
+            pupil_diameter = None
+        await self.ingest(session_id, gaze_x, gaze_y, pupil_diameter, source, sample_time, space)
+
+    async def receive_batch(self, payload):
+        """Unpack an ``eye.data.batch`` message of ``[t, x, y, pupil]`` samples."""
+        session_id = payload.get("session_id") or self.session_id or "unknown"
+        source = payload.get("source", "unknown")
+        space = payload.get("space", DEFAULT_SPACE)
+        if space not in COORDINATE_SPACES:
+            logger.warning(f"Unknown coordinate space {space!r} in batch.")
+            return
+        for sample in payload.get("samples", []):
+            try:
+                t, gaze_x, gaze_y, pupil_diameter = sample
+            except (TypeError, ValueError):
+                logger.warning("Invalid gaze sample in batch.")
+                continue
+            t = finite_time(t)
+            if t is None or not is_finite(gaze_x) or not is_finite(gaze_y):
+                continue
+            if not is_finite(pupil_diameter):
+                pupil_diameter = None
+            await self.ingest(session_id, gaze_x, gaze_y, pupil_diameter, source, t, space)
+
+    async def ingest(self, session_id, gaze_x, gaze_y, pupil_diameter, source, sample_time, space=DEFAULT_SPACE):
+        """Broadcast, persist and score one validated sample.
+
+        ``sample_time`` is the capture time in seconds on the sender's clock and
+        paces persistence, so a batch of samples is not throttled to one.
+        ``space`` is the coordinate space of ``gaze_x`` and ``gaze_y``.
+        """
+        now = time.time()
+        if not self.observe_sample(sample_time, now):
+            self.counters.incr("rejected")
+            return
+        if session_id != self.session_id and session_id != "unknown":
+            self.flush_gaze_events()
+            await self.bind_session(session_id)
+        if space != self.space:
+            # A fixation never mixes coordinate spaces.
+            self.flush_gaze_events()
+            self.space = space
 
-        self.latest_gaze = {
+        ticker.publish(self.viewer_group, {
             "gaze_x": gaze_x,
             "gaze_y": gaze_y,
             "pupil_diameter": pupil_diameter,
             "source": source,
+            "space": space,
             "session_id": session_id,
-        }
+        })
 
-        now = time.time()
-        if now - self.last_save_time >= 0.1 and not self.save_queue.full():
-            await self.save_queue.put((gaze_x, gaze_y, pupil_diameter, source))
-            self.last_save_time = now
+        self.counters.incr("received")
+        # A sender clock that went backwards, e.g. replaying a backlog after a
+        # restart, restarts the throttle rather than stalling it.
+        if 0 <= sample_time - self.last_save_time < settings.GAZE_SAVE_INTERVAL:
+            self.counters.incr("throttled")
+        elif writer_pool.gaze.add(session_id, self.wall_time(sample_time), gaze_x, gaze_y, pupil_diameter):
+            self.last_save_time = sample_time
+        else:
+            self.counters.incr("dropped")
+
+        for event in self.fixations.update(sample_time, gaze_x, gaze_y, pupil_diameter):
+            self.handle_gaze_event(event)
+
+        self.attention.push(sample_time, gaze_x, gaze_y, pupil_diameter)
+        self.last_sample_at = now
 
-        self.gaze_history.append((gaze_x, gaze_y, now))
-        self.gaze_history = self.gaze_history[-GAZE_HISTORY_SIZE:]
+    async def acknowledge(self, seq):
+        """Answer a sender's sync marker once everything before it is stored.
 
-        if self.detect_fixation(gaze_x, gaze_y):
-            logger.debug("Fixation detected.")
-        elif now - self.last_reading_timestamp > LOST_FOCUS_THRESHOLD:
+        Messages are handled in order, so every sample sent before the marker
+        is already buffered; the ack goes out after the writer flushed them,
+        and only then may the sender forget them. If a write failed the
+        connection is closed instead, and the sender replays what it has not
+        had acknowledged.
+        """
+        if await writer_pool.gaze.persisted(self.session_id or "unknown"):
+            await self.send_json({"type": "ack", "seq": seq})
+        else:
+            logger.warning(f"Samples before sync {seq} were not stored; closing so the sender replays them.")
+            await self.close(code=1011)
+
+    async def score_attention(self, now):
+        """Send the attention score to viewers; alert once it stays low.
+
+        Called by the ticker at a fixed rate rather than per sample: trackers
+        send nothing while they have lost the eyes, and the score must still
+        fall then. Time without samples counts as looking away.
+        """
+        if self.last_sample_at is None:
+            return
+        attention = self.attention.summary(idle=now - self.last_sample_at)
+        ticker.publish(
+            self.viewer_group, {**attention, "session_id": self.session_id or "unknown"}, "broadcast.attention"
+        )
+
+        if attention["score"] >= ATTENTION_THRESHOLD:
+            self.distracted_since = None
+        elif self.distracted_since is None:
+            self.distracted_since = now
+        elif now - self.distracted_since > LOST_FOCUS_THRESHOLD:
             if now - self.last_alert_time > ALERT_COOLDOWN:
                 msg = choose_alert_message()
-                logger.warning(f"Attention lost: {msg}")
+                logger.warning(f"Attention lost (score {attention['score']}): {msg}")
                 await self.channel_layer.group_send(
-                    "eye_tracking", {"type": "broadcast.alert", "message": msg}
+                    self.viewer_group, {"type": "broadcast.alert", "message": msg}
                 )
                 self.last_alert_time = now
 
-    def detect_fixation(self, gaze_x, gaze_y):
-        if len(self.gaze_history) >= GAZE_HISTORY_SIZE:
-            prev_x, prev_y, _ = self.gaze_history[0]
-            distance = ((gaze_x - prev_x) ** 2 + (gaze_y - prev_y) ** 2) ** 0.5
-            if distance < FIXATION_THRESHOLD:
-                self.last_reading_timestamp = time.time()
-                return True
-        return False
+    def handle_gaze_event(self, event):
+        if not isinstance(event, Fixation):
+            logger.debug(f"Saccade of {event.amplitude:.0f} px.")
+            return
+        logger.debug(f"Fixation at ({event.x:.0f}, {event.y:.0f}) for {event.duration * 1000:.0f} ms.")
+        session_key = self.session_id or "unknown"
+        writer_pool.fixations.add(
+            session_key,
+            self.wall_time(event.start), self.wall_time(event.end),
+            event.x, event.y, event.dispersion, event.pupil,
+        )
+        area = self.areas.locate(*self.areas.to_viewport(event.x, event.y, self.space))
+        if area is not None:
+            writer_pool.dwell.add(session_key, self.wall_time(event.end), area, event.duration)
 
-    async def broadcast_gaze(self, event):
-        await self.send_json({"type": "eye.data", "payload": event["data"]})
+    def observe_probe(self, sender_time, now):
+        """Narrow the clock offset with a clock.sync probe that just arrived.
 
-    async def broadcast_alert(self, event):
-        await self.send_json({"type": "eye.alert", "message": event["message"]})
+        The probe with the least transit delay gives the tightest bound, so
+        the offset only ever shrinks.
+        """
+        offset = now - sender_time
+        if self.probe_offset is None or offset < self.probe_offset:
+            self.probe_offset = offset
+            self.clock_offset = offset if self.clock_offset is None else min(self.clock_offset, offset)
 
-    @database_sync_to_async
-    def get_active_session(self):
-        return EyeTrackingSession.objects.filter(end_time__isnull=True).order_by("-start_time").first()
+    def observe_sample(self, sample_time, now):
+        """Follow clock drift with a sample; False if its time is implausible.
 
-    async def async_save_gaze_data(self, gaze_x, gaze_y, pupil_diameter, source):
-        session = await self.get_active_session()
-        if not session or session.end_time:
-            return
-        await self.save_gaze_data(session, gaze_x, gaze_y, pupil_diameter)
-
-    @database_sync_to_async
-    def save_gaze_data(self, session, gaze_x, gaze_y, pupil_diameter):
-        GazeData.objects.create(
-            session=session,
-            gaze_x=gaze_x,
-            gaze_y=gaze_y,
-            pupil_diameter=pupil_diameter,
-        )
+        A sample can only be replayed late, never arrive before it was
+        captured, so one that maps further than CLOCK_DRIFT_LIMIT into the
+        future is rejected rather than allowed to shift the offset.
+        """
+        offset = now - sample_time
+        if self.probe_offset is None:
+            # No probes: stamp on arrival.
+            self.clock_offset = offset
+        elif offset < self.clock_offset:
+            if offset < self.probe_offset - CLOCK_DRIFT_LIMIT:
+                return False
+            self.clock_offset = offset
+        return True
 
-    async def save_worker(self):
-        while True:
-            gaze_data = await self.save_queue.get()
-            try:
-                await self.async_save_gaze_data(*gaze_data)
-            except Exception as e:
-                logger.exception(f"Error saving gaze data: {e}")
-            finally:
-                self.save_queue.task_done()
+    def wall_time(self, sample_time):
+        """Server wall-clock datetime of a time on the sender's clock."""
+        return datetime.fromtimestamp(sample_time + self.clock_offset, tz=timezone.utc)
+
+    def metrics(self):
+        return {
+            "channel_name": getattr(self, "channel_name", None),
+            "session_id": self.session_id,
+            "attention": round(self.attention.score(
+                time.time() - self.last_sample_at if self.last_sample_at is not None else 0.0
+            ), 3),
+            "clock_offset": self.clock_offset,
+            **self.counters.as_dict(),
+        }
+
+    def flush_gaze_events(self):
+        """Close the open fixation, e.g. before the stream switches session."""
+        for event in self.fixations.flush():
+            self.handle_gaze_event(event)
+
+    async def bind_session(self, session_id):
+        """Publish to this session's viewers and listen for its lifecycle events."""
+        await self.channel_layer.group_discard(collector_group(self.session_id), self.channel_name)
+        self.session_id = session_id
+        self.viewer_group = session_group(session_id)
+        self.attention.reset()
+        self.last_sample_at = self.distracted_since = None
+        await self.channel_layer.group_add(collector_group(session_id), self.channel_name)
+        session_pk = await writer_pool.resolve_session(session_id)
+        self.areas = await load_session_index(session_pk) if session_pk else AOIIndex()
+
+    async def areas_updated(self, event):
+        # The page re-registered its section boxes, e.g. after scrolling.
+        if event["session_id"] == self.session_id:
+            self.areas = await load_session_index(event["session_pk"])
+
+    async def session_ended(self, event):
+        session_key = event["session_id"]
+        # A legacy source hears of every session ending; its samples may have
+        # been going to this one.
+        if session_key == self.session_id or self.session_id is None:
+            self.flush_gaze_events()
+        await writer_pool.end_session(session_key, event["session_pk"])
+
+    async def session_started(self, event):
+        # Legacy samples go to the newest open session, so stop treating
+        # "no open session" as the answer.
+        writer_pool.retry_session("unknown")
@@ -0,0 +1,83 @@
+"""Reduce a gaze series to a few hundred points for charting.
+
+Both functions take the time column and one or more value columns of equal
+length (e.g. gaze x and y) and return sorted indices of the samples to keep,
+always including the first and last.
+"""
+import numpy as np
+
+
+def _normalised(t, series):
+    """Columns scaled to [0, 1] so seconds and pixels weigh equally."""
+    columns = []
+    for values in (t, *series):
+        values = np.asarray(values, dtype=np.float64)
+        span = values.max() - values.min()
+        columns.append((values - values.min()) / span if span > 0 else np.zeros_like(values))
+    return np.column_stack(columns)
+
+
+def lttb(t, series, max_points):
+    """Largest-triangle-three-buckets over several series at once.
+
+    The middle samples are split into ``max_points - 2`` buckets; from each,
+    the sample forming the largest triangle with the previously kept sample
+    and the mean of the next bucket is kept. Areas are measured in the
+    normalised (t, *series) space, so a spike in any series is preserved.
+    """
+    n = len(t)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max(max_points, 1)])
+
+    points = _normalised(t, series)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    previous = points[0]
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            following = points[hi:edges[i + 2]].mean(axis=0)
+        else:
+            following = points[-1]
+        ab = points[lo:hi] - previous
+        ac = following - previous
+        # Squared triangle area (up to a constant) via Lagrange's identity.
+        areas = np.einsum("ij,ij->i", ab, ab) * ac.dot(ac) - (ab @ ac) ** 2
+        k = lo + int(np.argmax(areas))
+        keep[i + 1] = k
+        previous = points[k]
+    return keep
+
+
+def minmax(t, series, max_points):
+    """Keep each bucket's minimum and maximum of every series.
+
+    Cheaper than LTTB and guarantees every extreme survives; the number of
+    buckets is chosen so at most ``max_points`` samples are kept. When
+    ``max_points`` cannot hold the first and last samples plus one bucket,
+    LTTB picks the samples instead.
+    """
+    n = len(t)
+    if max_points >= n:
+        return np.arange(n)
+    per_bucket = 2 * len(series)
+    if max_points - 2 < per_bucket:
+        return lttb(t, series, max_points)
+    buckets = (max_points - 2) // per_bucket
+    bucket = (np.arange(n) * buckets) // n
+    firsts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    lasts = np.append(firsts[1:], n) - 1
+    keep = [np.array([0, n - 1])]
+    for values in series:
+        values = np.asarray(values, dtype=np.float64)
+        # Sorting by (bucket, value) puts each bucket's min first and max last.
+        order = np.lexsort((values, bucket))
+        keep.extend((order[firsts], order[lasts]))
+    return np.unique(np.concatenate(keep))
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
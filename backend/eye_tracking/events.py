@@ -0,0 +1,501 @@
+"""Fixation and saccade detection for gaze streams.
+
+Two classic algorithms are provided, each in a streaming form that consumes
+one sample at a time and a NumPy batch form for reprocessing stored sessions:
+
+* I-DT (dispersion threshold): a fixation is a run of samples lasting at
+  least ``min_duration`` whose dispersion, ``(max x - min x) + (max y - min y)``,
+  stays within ``dispersion``.
+* I-VT (velocity threshold): samples moving slower than ``velocity`` belong to
+  fixations, faster ones to saccades.
+
+Times are in seconds, coordinates in screen pixels. A gap between samples
+longer than ``max_gap`` closes whatever event is open.
+"""
+import math
+from collections import deque, namedtuple
+import numpy as np
+
+IDT_DISPERSION = 100.0
+IDT_MIN_DURATION = 0.1
+IVT_VELOCITY = 1000.0
+IVT_MIN_DURATION = 0.06
+MAX_GAP = 0.25
+
+NO_EVENTS = ()
+
+
+class Fixation(namedtuple("Fixation", "start end x y dispersion pupil")):
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class Saccade(namedtuple("Saccade", "start end amplitude peak_velocity")):
+    """For I-DT, which has no per-sample velocity, ``peak_velocity`` is the mean
+    speed from the last sample of one fixation to the first of the next."""
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+FIXATION_DTYPE = np.dtype([
+    ("start", "f8"), ("end", "f8"), ("x", "f8"), ("y", "f8"), ("dispersion", "f8"), ("pupil", "f8"),
+])
+SACCADE_DTYPE = np.dtype([
+    ("start", "f8"), ("end", "f8"), ("amplitude", "f8"), ("peak_velocity", "f8"),
+])
+
+
+class _FixationAccumulator:
+    """Running bounds and sums of the samples in the current fixation."""
+
+    __slots__ = (
+        "start", "end", "n", "sum_x", "sum_y", "sum_p", "n_p",
+        "min_x", "max_x", "min_y", "max_y", "first_x", "first_y", "last_x", "last_y",
+    )
+
+    def reset(self, t, x, y, pupil):
+        self.start = self.end = t
+        self.first_x = self.last_x = x
+        self.first_y = self.last_y = y
+        self.n = 1
+        self.sum_x = x
+        self.sum_y = y
+        self.sum_p = 0.0
+        self.n_p = 0
+        self.min_x = self.max_x = x
+        self.min_y = self.max_y = y
+        self.add_pupil(pupil)
+
+    def add(self, t, x, y, pupil):
+        self.end = t
+        self.last_x = x
+        self.last_y = y
+        self.n += 1
+        self.sum_x += x
+        self.sum_y += y
+        if x < self.min_x:
+            self.min_x = x
+        elif x > self.max_x:
+            self.max_x = x
+        if y < self.min_y:
+            self.min_y = y
+        elif y > self.max_y:
+            self.max_y = y
+        self.add_pupil(pupil)
+
+    def add_pupil(self, pupil):
+        if pupil is not None and pupil == pupil and pupil > 0:
+            self.sum_p += pupil
+            self.n_p += 1
+
+    def dispersion_with(self, x, y):
+        return (max(self.max_x, x) - min(self.min_x, x)) + (max(self.max_y, y) - min(self.min_y, y))
+
+    def to_event(self):
+        return Fixation(
+            self.start, self.end, self.sum_x / self.n, self.sum_y / self.n,
+            (self.max_x - self.min_x) + (self.max_y - self.min_y),
+            self.sum_p / self.n_p if self.n_p else None,
+        )
+
+
+class IDTDetector:
+    """Streaming I-DT.
+
+    Candidate samples sit in a window spanning ``min_duration``; monotonic
+    deques track its extrema so each sample is added and evicted in amortised
+    O(1). Once the window's dispersion is within the threshold a fixation
+    starts and grows until a sample would push it past the threshold.
+    ``update`` returns the events completed by that sample, usually none.
+    """
+
+    def __init__(self, dispersion=IDT_DISPERSION, min_duration=IDT_MIN_DURATION, max_gap=MAX_GAP):
+        self.dispersion = dispersion
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+        self.window = deque()
+        self.min_x = deque()
+        self.max_x = deque()
+        self.min_y = deque()
+        self.max_y = deque()
+        self.seq = 0
+        self.last_t = None
+        self.in_fixation = False
+        self.fixation = _FixationAccumulator()
+        self.last_exit = None
+
+    def update(self, t, x, y, pupil=None):
+        events = NO_EVENTS
+        if self.last_t is not None and t - self.last_t > self.max_gap:
+            events = self.flush()
+            self.last_exit = None
+        self.last_t = t
+
+        if self.in_fixation:
+            if self.fixation.dispersion_with(x, y) <= self.dispersion:
+                self.fixation.add(t, x, y, pupil)
+                return events
+            events += self.end_fixation()
+
+        self.push(t, x, y, pupil)
+        window = self.window
+        while len(window) > 1 and t - window[0][1] >= self.min_duration:
+            if self.window_dispersion() <= self.dispersion:
+                return events + self.start_fixation()
+            self.evict()
+        return events
+
+    def flush(self):
+        """Close any open fixation and forget candidate samples."""
+        events = self.end_fixation() if self.in_fixation else NO_EVENTS
+        self.clear_window()
+        return events
+
+    def push(self, t, x, y, pupil):
+        seq = self.seq
+        self.seq += 1
+        self.window.append((seq, t, x, y, pupil))
+        # Monotonic deques: the front always holds the window's extremum.
+        min_x, max_x, min_y, max_y = self.min_x, self.max_x, self.min_y, self.max_y
+        while min_x and min_x[-1][1] >= x:
+            min_x.pop()
+        min_x.append((seq, x))
+        while max_x and max_x[-1][1] <= x:
+            max_x.pop()
+        max_x.append((seq, x))
+        while min_y and min_y[-1][1] >= y:
+            min_y.pop()
+        min_y.append((seq, y))
+        while max_y and max_y[-1][1] <= y:
+            max_y.pop()
+        max_y.append((seq, y))
+
+    def evict(self):
+        seq = self.window.popleft()[0]
+        for extrema in (self.min_x, self.max_x, self.min_y, self.max_y):
+            if extrema[0][0] == seq:
+                extrema.popleft()
+
+    def window_dispersion(self):
+        return (self.max_x[0][1] - self.min_x[0][1]) + (self.max_y[0][1] - self.min_y[0][1])
+
+    def clear_window(self):
+        self.window.clear()
+        for extrema in (self.min_x, self.max_x, self.min_y, self.max_y):
+            extrema.clear()
+
+    def start_fixation(self):
+        samples = iter(self.window)
+        _, t, x, y, pupil = next(samples)
+        self.fixation.reset(t, x, y, pupil)
+        for _, t, x, y, pupil in samples:
+            self.fixation.add(t, x, y, pupil)
+        self.clear_window()
+        self.in_fixation = True
+
+        if self.last_exit is None:
+            return NO_EVENTS
+        exit_t, exit_x, exit_y = self.last_exit
+        start = self.fixation.start
+        amplitude = math.hypot(self.fixation.first_x - exit_x, self.fixation.first_y - exit_y)
+        duration = start - exit_t
+        return (Saccade(exit_t, start, amplitude, amplitude / duration if duration > 0 else 0.0),)
+
+    def end_fixation(self):
+        self.in_fixation = False
+        fixation = self.fixation
+        self.last_exit = (fixation.end, fixation.last_x, fixation.last_y)
+        return (fixation.to_event(),)
+
+
+class IVTDetector:
+    """Streaming I-VT.
+
+    Each sample is labelled by the speed of the movement that reached it.
+    Runs of slow samples lasting ``min_duration`` become fixations; runs of
+    fast samples become saccades. Work per sample is O(1).
+    """
+
+    def __init__(self, velocity=IVT_VELOCITY, min_duration=IVT_MIN_DURATION, max_gap=MAX_GAP):
+        self.velocity = velocity
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+        self.prev = None
+        self.in_fixation = False
+        self.in_saccade = False
+        self.fixation = _FixationAccumulator()
+        self.saccade_start = None
+        self.saccade_origin = None
+        self.saccade_end = None
+        self.saccade_peak = 0.0
+
+    def update(self, t, x, y, pupil=None):
+        prev = self.prev
+        self.prev = (t, x, y)
+        if prev is None:
+            self.fixation.reset(t, x, y, pupil)
+            self.in_fixation = True
+            return NO_EVENTS
+
+        prev_t, prev_x, prev_y = prev
+        dt = t - prev_t
+        if dt > self.max_gap:
+            events = self.flush()
+            self.prev = (t, x, y)
+            self.fixation.reset(t, x, y, pupil)
+            self.in_fixation = True
+            return events
+        if dt <= 0:
+            return NO_EVENTS
+
+        speed = math.hypot(x - prev_x, y - prev_y) / dt
+        if speed < self.velocity:
+            if self.in_fixation:
+                self.fixation.add(t, x, y, pupil)
+                return NO_EVENTS
+            events = self.end_saccade()
+            self.fixation.reset(t, x, y, pupil)
+            self.in_fixation = True
+            return events
+
+        if self.in_saccade:
+            self.saccade_end = (t, x, y)
+            if speed > self.saccade_peak:
+                self.saccade_peak = speed
+            return NO_EVENTS
+        events = self.end_fixation()
+        self.in_saccade = True
+        self.saccade_start = prev_t
+        self.saccade_origin = (prev_x, prev_y)
+        self.saccade_end = (t, x, y)
+        self.saccade_peak = speed
+        return events
+
+    def flush(self):
+        """Close whichever event is open."""
+        if self.in_fixation:
+            events = self.end_fixation()
+        elif self.in_saccade:
+            events = self.end_saccade()
+        else:
+            events = NO_EVENTS
+        self.prev = None
+        return events
+
+    def end_fixation(self):
+        self.in_fixation = False
+        if self.fixation.end - self.fixation.start < self.min_duration:
+            return NO_EVENTS
+        return (self.fixation.to_event(),)
+
+    def end_saccade(self):
+        self.in_saccade = False
+        end_t, end_x, end_y = self.saccade_end
+        origin_x, origin_y = self.saccade_origin
+        amplitude = math.hypot(end_x - origin_x, end_y - origin_y)
+        return (Saccade(self.saccade_start, end_t, amplitude, self.saccade_peak),)
+
+
+def _as_columns(t, x, y, pupil):
+    t = np.asarray(t, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    pupil = np.full(t.shape, np.nan) if pupil is None else np.asarray(pupil, dtype=np.float64)
+    valid = np.isfinite(t) & np.isfinite(x) & np.isfinite(y)
+    if not valid.all():
+        t, x, y, pupil = t[valid], x[valid], y[valid], pupil[valid]
+    pupil = np.where(pupil > 0, pupil, np.nan)
+    return t, x, y, pupil
+
+
+def _segment_stats(t, x, y, pupil, starts, ends):
+    """Fixation records for the inclusive sample ranges ``starts[k]..ends[k]``."""
+    fixations = np.empty(len(starts), dtype=FIXATION_DTYPE)
+    if not len(starts):
+        return fixations
+    counts = ends - starts + 1
+    # Pairs of (start, end + 1) boundaries; reduceat's even results are the segments.
+    bounds = np.column_stack([starts, ends + 1]).ravel()
+
+    def reduce(ufunc, values):
+        return ufunc.reduceat(np.append(values, values[-1]), bounds)[::2]
+
+    has_pupil = ~np.isnan(pupil)
+    pupil_counts = reduce(np.add, has_pupil.astype(np.int64))
+    pupil_sums = reduce(np.add, np.where(has_pupil, pupil, 0.0))
+
+    fixations["start"] = t[starts]
+    fixations["end"] = t[ends]
+    fixations["x"] = reduce(np.add, x) / counts
+    fixations["y"] = reduce(np.add, y) / counts
+    fixations["dispersion"] = (
+        reduce(np.maximum, x) - reduce(np.minimum, x) + reduce(np.maximum, y) - reduce(np.minimum, y)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fixations["pupil"] = np.where(pupil_counts > 0, pupil_sums / pupil_counts, np.nan)
+    return fixations
+
+
+def _saccades_between(t, x, y, starts, ends, max_gap):
+    """I-DT saccades: the jumps from each fixation's last sample to the next's first."""
+    if len(starts) < 2:
+        return np.empty(0, dtype=SACCADE_DTYPE)
+    exits, entries = ends[:-1], starts[1:]
+    duration = t[entries] - t[exits]
+    # A data gap between two fixations splits the recording, not a saccade.
+    keep = duration <= max_gap
+    exits, entries, duration = exits[keep], entries[keep], duration[keep]
+    saccades = np.empty(len(exits), dtype=SACCADE_DTYPE)
+    saccades["start"] = t[exits]
+    saccades["end"] = t[entries]
+    saccades["amplitude"] = np.hypot(x[entries] - x[exits], y[entries] - y[exits])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        saccades["peak_velocity"] = np.where(duration > 0, saccades["amplitude"] / duration, 0.0)
+    return saccades
+
+
+def _sparse_table(values, levels, ufunc):
+    table = [values]
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        prev = table[-1]
+        table.append(ufunc(prev[:-half], prev[half:]))
+    return table
+
+
+def _range_query(table, ufunc, lo, hi):
+    """Vectorised ufunc over inclusive ranges ``lo..hi`` using a sparse table."""
+    length = hi - lo + 1
+    level = np.floor(np.log2(length)).astype(np.int64)
+    result = np.empty(len(lo))
+    for k in np.unique(level):
+        sel = level == k
+        row = table[k]
+        result[sel] = ufunc(row[lo[sel]], row[hi[sel] - (1 << k) + 1])
+    return result
+
+
+def detect_idt(t, x, y, pupil=None, dispersion=IDT_DISPERSION, min_duration=IDT_MIN_DURATION,
+               max_gap=MAX_GAP):
+    """Batch I-DT over sample columns.
+
+    The dispersion of every minimum-duration window is computed at once with
+    sparse-table range queries, so Python only loops once per fixation while
+    extending it. Returns ``(fixations, saccades)`` structured arrays with
+    ``FIXATION_DTYPE`` and ``SACCADE_DTYPE``.
+    """
+    t, x, y, pupil = _as_columns(t, x, y, pupil)
+    n = len(t)
+    if n < 2:
+        return np.empty(0, dtype=FIXATION_DTYPE), np.empty(0, dtype=SACCADE_DTYPE)
+
+    # Index of the first sample after each gap, and of the next gap at or after i.
+    gap_after = np.flatnonzero(np.diff(t) > max_gap) + 1
+    next_gap = np.append(gap_after, n)[np.searchsorted(gap_after, np.arange(n), side="right")]
+
+    # Smallest window starting at i that spans min_duration and has no gap.
+    window_end = np.searchsorted(t, t + min_duration, side="left")
+    usable = (window_end < next_gap) & (window_end < n)
+    lo = np.flatnonzero(usable)
+    hi = window_end[lo]
+
+    starts, ends = [], []
+    if len(lo):
+        levels = int(np.floor(np.log2((hi - lo + 1).max()))) + 1
+        tables = {
+            name: _sparse_table(values, levels, ufunc)
+            for name, values, ufunc in (
+                ("min_x", x, np.minimum), ("max_x", x, np.maximum),
+                ("min_y", y, np.minimum), ("max_y", y, np.maximum),
+            )
+        }
+        window_dispersion = (
+            _range_query(tables["max_x"], np.maximum, lo, hi) - _range_query(tables["min_x"], np.minimum, lo, hi)
+            + _range_query(tables["max_y"], np.maximum, lo, hi) - _range_query(tables["min_y"], np.minimum, lo, hi)
+        )
+        candidates = lo[window_dispersion <= dispersion]
+
+        i = 0
+        while True:
+            k = np.searchsorted(candidates, i)
+            if k == len(candidates):
+                break
+            start = candidates[k]
+            end = _extend_fixation(x, y, start, window_end[start], next_gap[start], dispersion)
+            starts.append(start)
+            ends.append(end)
+            i = end + 1
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    return _segment_stats(t, x, y, pupil, starts, ends), _saccades_between(t, x, y, starts, ends, max_gap)
+
+
+def _extend_fixation(x, y, start, first_end, limit, dispersion):
+    """Last index a fixation beginning at ``start`` can reach before ``limit``."""
+    chunk = max(64, 2 * (first_end - start + 1))
+    stop = start
+    while True:
+        stop = min(limit, start + chunk)
+        xs = x[start:stop]
+        ys = y[start:stop]
+        spread = (np.maximum.accumulate(xs) - np.minimum.accumulate(xs)
+                  + np.maximum.accumulate(ys) - np.minimum.accumulate(ys))
+        over = np.flatnonzero(spread > dispersion)
+        if len(over):
+            return start + over[0] - 1
+        if stop == limit:
+            return stop - 1
+        chunk *= 4
+
+
+def detect_ivt(t, x, y, pupil=None, velocity=IVT_VELOCITY, min_duration=IVT_MIN_DURATION, max_gap=MAX_GAP):
+    """Batch I-VT over sample columns, fully vectorised.
+
+    Returns ``(fixations, saccades)`` structured arrays with ``FIXATION_DTYPE``
+    and ``SACCADE_DTYPE``.
+    """
+    t, x, y, pupil = _as_columns(t, x, y, pupil)
+    n = len(t)
+    if n < 2:
+        return np.empty(0, dtype=FIXATION_DTYPE), np.empty(0, dtype=SACCADE_DTYPE)
+
+    dt = np.diff(t)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        speed = np.hypot(np.diff(x), np.diff(y)) / dt
+    gap = dt > max_gap
+    speed[gap | (dt <= 0)] = 0.0
+
+    # Each sample takes the label of the movement that reached it; the first
+    # sample of the recording and of each post-gap segment counts as fixation.
+    slow = np.empty(n, dtype=bool)
+    slow[0] = True
+    slow[1:] = (speed < velocity) | gap
+
+    # Runs break where the label flips or a gap starts a new segment.
+    breaks = np.flatnonzero((slow[1:] != slow[:-1]) | gap) + 1
+    run_starts = np.concatenate(([0], breaks))
+    run_ends = np.concatenate((breaks - 1, [n - 1]))
+    run_slow = slow[run_starts]
+
+    fix = run_slow & (t[run_ends] - t[run_starts] >= min_duration)
+    fixations = _segment_stats(t, x, y, pupil, run_starts[fix], run_ends[fix])
+
+    sac_starts = run_starts[~run_slow]
+    sac_ends = run_ends[~run_slow]
+    saccades = np.empty(len(sac_starts), dtype=SACCADE_DTYPE)
+    if len(sac_starts):
+        # The movement into a saccade's first sample starts at the sample before it.
+        origin = sac_starts - 1
+        saccades["start"] = t[origin]
+        saccades["end"] = t[sac_ends]
+        saccades["amplitude"] = np.hypot(x[sac_ends] - x[origin], y[sac_ends] - y[origin])
+        peak = np.maximum.reduceat(np.append(speed, 0.0), np.column_stack([origin, sac_ends]).ravel())[::2]
+        saccades["peak_velocity"] = peak
+    return fixations, saccades
@@ -0,0 +1,96 @@
+"""Chunked, time-ordered iteration over a session's samples for exports.
+
+Rows are ``(id, timestamp, gaze_x, gaze_y, pupil_diameter)`` tuples with the
+timestamp as an ISO 8601 UTC string, read ``EXPORT_CHUNK_SIZE`` at a time so
+memory does not grow with the length of the session. Every chunk of table
+rows is its own keyset query, so no database cursor stays open between
+chunks and async views can fetch them one ``sync_to_async`` call at a time.
+"""
+import heapq
+from datetime import timezone
+from itertools import islice
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from .archive import iter_unpacked
+from .models import GazeArchive, GazeData
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ("id", "timestamp", "gaze_x", "gaze_y", "pupil_diameter")
+# Decimal places kept for x, y and pupil when they come from NumPy columns.
+VALUE_DECIMALS = 4
+
+
+def format_timestamp(value):
+    """ISO 8601 with microseconds and a ``Z`` suffix, so strings sort by time."""
+    return f"{value.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%S.%f}Z"
+
+
+def raw_rows(session, after_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    rows = GazeData.objects.filter(session=session)
+    if after_id is not None:
+        rows = rows.filter(id__gt=after_id)
+    rows = rows.order_by("timestamp", "id").values_list(
+        "id", "timestamp", "gaze_x", "gaze_y", "pupil_diameter"
+    )
+    chunk = list(rows[:chunk_size])
+    while chunk:
+        for row_id, timestamp, gaze_x, gaze_y, pupil in chunk:
+            yield row_id, format_timestamp(timestamp), gaze_x, gaze_y, pupil
+        if len(chunk) < chunk_size:
+            return
+        last_id, last_timestamp = chunk[-1][:2]
+        chunk = list(rows.filter(
+            Q(timestamp__gt=last_timestamp) | Q(timestamp=last_timestamp, id__gt=last_id)
+        )[:chunk_size])
+
+
+def column_rows(columns):
+    """Row tuples for a ``GazeColumns`` slice."""
+    timestamps = np.datetime_as_string(
+        np.round(columns.t * 1e6).astype("datetime64[us]"), unit="us"
+    )
+    # Archived values are float32; rounding hides the noise of widening them.
+    return zip(
+        columns.id.tolist(),
+        [f"{timestamp}Z" for timestamp in timestamps.tolist()],
+        np.round(np.asarray(columns.x, dtype=np.float64), VALUE_DECIMALS).tolist(),
+        np.round(np.asarray(columns.y, dtype=np.float64), VALUE_DECIMALS).tolist(),
+        [None if pupil != pupil else pupil
+         for pupil in np.round(np.asarray(columns.pupil, dtype=np.float64), VALUE_DECIMALS).tolist()],
+    )
+
+
+def archived_rows(archive, chunk_size=EXPORT_CHUNK_SIZE):
+    for chunk in iter_unpacked(archive, chunk_size):
+        yield from column_rows(chunk)
+
+
+def iter_samples(session, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every sample of ``session`` in time order, archived or not."""
+    archive = GazeArchive.objects.filter(session=session).first()
+    if archive is None:
+        yield from raw_rows(session, chunk_size=chunk_size)
+        return
+    # Rows written after the archive are usually later, but merge to be sure.
+    yield from heapq.merge(
+        archived_rows(archive, chunk_size),
+        raw_rows(session, after_id=archive.last_id, chunk_size=chunk_size),
+        key=lambda row: (row[1], row[0]),
+    )
+
+
+def iter_sample_chunks(session, chunk_size=EXPORT_CHUNK_SIZE):
+    """``iter_samples`` grouped into lists of up to ``chunk_size`` rows."""
+    samples = iter_samples(session, chunk_size)
+    while chunk := list(islice(samples, chunk_size)):
+        yield chunk
+
+
+async def aiter_sample_chunks(session, chunk_size=EXPORT_CHUNK_SIZE):
+    """``iter_sample_chunks`` for async views, reading each chunk in a
+    ``sync_to_async`` call so only one chunk is held at a time."""
+    chunks = iter_sample_chunks(session, chunk_size)
+    read = sync_to_async(next)
+    while (chunk := await read(chunks, None)) is not None:
+        yield chunk
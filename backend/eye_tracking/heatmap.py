@@ -0,0 +1,100 @@
+"""Per-session gaze heatmaps, binned with NumPy and kept in Django's cache.
+
+A cached entry holds the raw bin counts for one session and grid together
+with the id of the newest sample counted (its watermark). While a session
+is live, each request bins only the samples written since the watermark
+and stores the updated counts. With several workers writing, rows need not
+commit in id order, so one can appear below the watermark after it moved
+past; each request therefore also counts the session's samples and bins
+the session afresh when the entry has fewer. Once a session ended more
+than ``FINAL_AFTER`` ago, no more samples can arrive, so its entry is
+served without touching GazeData. Blurring is applied to the counts per
+request.
+"""
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+from django.core.cache import cache
+from django.utils.timezone import now
+from numpy.lib.stride_tricks import sliding_window_view
+from .archive import session_columns, session_sample_count
+from .models import GazeData
+
+LIVE_CACHE_TIMEOUT = 3600
+# Collectors flush what they buffered within a moment of a session stopping.
+FINAL_AFTER = timedelta(seconds=30)
+
+Grid = namedtuple("Grid", "cols rows width height")
+HeatmapCounts = namedtuple("HeatmapCounts", "counts watermark samples final")
+
+
+def cache_key(session, grid):
+    return f"gaze_heatmap:{session.pk}:{grid.cols}x{grid.rows}:{grid.width:g}x{grid.height:g}"
+
+
+def bin_counts(grid, x, y):
+    """Counts of ``(x, y)`` per cell as a ``rows x cols`` matrix; samples
+    outside the ``width x height`` area are ignored."""
+    counts, _, _ = np.histogram2d(
+        y, x, bins=(grid.rows, grid.cols), range=((0, grid.height), (0, grid.width))
+    )
+    return counts
+
+
+def is_final(session):
+    return session.end_time is not None and now() - session.end_time > FINAL_AFTER
+
+
+def session_counts(session, grid):
+    """The session's ``HeatmapCounts``, from the cache where possible."""
+    key = cache_key(session, grid)
+    entry = cache.get(key)
+    if entry is not None and entry.final:
+        return entry
+
+    if entry is not None:
+        # Counted before reading the new rows: rows committed in between only
+        # make the entry look ahead, so falling short means a row was missed.
+        total = session_sample_count(session)
+        new_rows = list(
+            GazeData.objects.filter(session=session, id__gt=entry.watermark)
+            .values_list("id", "gaze_x", "gaze_y")
+        )
+        if entry.samples + len(new_rows) < total:
+            entry = None
+        elif not new_rows and entry.final == is_final(session):
+            return entry
+
+    if entry is None:
+        columns = session_columns(session)
+        counts = bin_counts(grid, columns.x, columns.y)
+        watermark = int(columns.id.max()) if columns.size else 0
+        samples = columns.size
+    else:
+        counts = entry.counts
+        watermark = entry.watermark
+        samples = entry.samples
+        if new_rows:
+            ids, x, y = (np.array(column, dtype=np.float64) for column in zip(*new_rows))
+            counts = counts + bin_counts(grid, x, y)
+            watermark = int(ids.max())
+            samples += len(new_rows)
+
+    final = is_final(session)
+    entry = HeatmapCounts(counts, watermark, samples, final)
+    cache.set(key, entry, None if final else LIVE_CACHE_TIMEOUT)
+    return entry
+
+
+def gaussian_blur(matrix, sigma):
+    """Separable Gaussian blur; cells beyond the edges count as empty."""
+    if sigma <= 0:
+        return matrix
+    radius = max(int(np.ceil(3 * sigma)), 1)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+    padded = np.pad(matrix, ((0, 0), (radius, radius)))
+    matrix = sliding_window_view(padded, kernel.size, axis=1) @ kernel
+    padded = np.pad(matrix, ((radius, radius), (0, 0)))
+    return sliding_window_view(padded, kernel.size, axis=0) @ kernel
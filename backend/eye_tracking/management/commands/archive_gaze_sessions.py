@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from eye_tracking.archive import archive_session
+from eye_tracking.models import EyeTrackingSession
+
+
+class Command(BaseCommand):
+    help = "Pack finished sessions' GazeData into columnar GazeArchive blobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", nargs="+", help="Session ids to archive (default: ended sessions with unarchived samples).")
+        parser.add_argument("--delete-raw", action="store_true", help="Delete GazeData rows once archived.")
+
+    def handle(self, *args, **options):
+        sessions = EyeTrackingSession.objects.order_by("pk")
+        if options["session"]:
+            sessions = sessions.filter(session_id__in=options["session"])
+        else:
+            sessions = sessions.filter(end_time__isnull=False).filter(
+                Q(archive__isnull=True, gazedata__isnull=False) |
+                Q(gazedata__id__gt=F("archive__last_id"))
+            ).distinct()
+
+        total_samples = total_bytes = 0
+        for session in sessions:
+            archive = archive_session(session, delete_raw=options["delete_raw"])
+            if archive is None:
+                continue
+            size = len(archive.data)
+            total_samples += archive.sample_count
+            total_bytes += size
+            self.stdout.write(
+                f"{session.session_id}: {archive.sample_count} samples, {size} bytes "
+                f"({size / archive.sample_count:.1f} bytes/sample)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total_samples} samples into {total_bytes} bytes."
+        ))
@@ -0,0 +1,65 @@
+import math
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from eye_tracking.archive import session_columns
+from eye_tracking.events import IDT_DISPERSION, IDT_MIN_DURATION, MAX_GAP, detect_idt
+from eye_tracking.models import EyeTrackingSession, Fixation
+
+
+def fixation_rows(session, fixations):
+    return [
+        Fixation(
+            session=session,
+            start_time=datetime.fromtimestamp(f["start"], tz=timezone.utc),
+            end_time=datetime.fromtimestamp(f["end"], tz=timezone.utc),
+            x=float(f["x"]),
+            y=float(f["y"]),
+            dispersion=float(f["dispersion"]),
+            pupil_diameter=None if math.isnan(f["pupil"]) else float(f["pupil"]),
+        )
+        for f in fixations
+    ]
+
+
+class Command(BaseCommand):
+    help = "Detect fixations (I-DT) in stored gaze samples and save them as Fixation rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", nargs="+", help="Session ids to process (default: ended sessions without fixations).")
+        parser.add_argument("--replace", action="store_true", help="Delete a session's existing fixations first.")
+        parser.add_argument("--dispersion", type=float, default=IDT_DISPERSION)
+        parser.add_argument("--min-duration", type=float, default=IDT_MIN_DURATION)
+        parser.add_argument("--max-gap", type=float, default=MAX_GAP)
+
+    def handle(self, *args, **options):
+        sessions = EyeTrackingSession.objects.order_by("pk")
+        if options["session"]:
+            sessions = sessions.filter(session_id__in=options["session"])
+        else:
+            # Open sessions are filled online by the collector.
+            sessions = sessions.filter(end_time__isnull=False)
+        if not options["replace"]:
+            sessions = sessions.filter(fixations__isnull=True)
+
+        total_samples = total_fixations = 0
+        for session in sessions.distinct():
+            columns = session_columns(session)
+            fixations, _ = detect_idt(
+                columns.t, columns.x, columns.y, columns.pupil,
+                dispersion=options["dispersion"],
+                min_duration=options["min_duration"],
+                max_gap=options["max_gap"],
+            )
+            with transaction.atomic():
+                if options["replace"]:
+                    session.fixations.all().delete()
+                Fixation.objects.bulk_create(fixation_rows(session, fixations), batch_size=1000)
+
+            total_samples += columns.size
+            total_fixations += len(fixations)
+            self.stdout.write(f"{session.session_id}: {columns.size} samples -> {len(fixations)} fixations")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {total_fixations} fixations from {total_samples} samples."
+        ))
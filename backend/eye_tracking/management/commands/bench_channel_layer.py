@@ -0,0 +1,181 @@
+import asyncio
+import json
+import multiprocessing
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from eye_tracking.pubsub_server import PubSubServer
+
+LAYERS = {
+    "pubsub": "channels_redis.pubsub.RedisPubSubChannelLayer",
+    "core": "channels_redis.core.RedisChannelLayer",
+}
+# Spelled out rather than built with consumers.session_group: the spawned
+# workers import this module without setting Django up.
+GROUP = "eye_tracking.bench_channel_layer"
+
+
+def make_layer(kind, url):
+    return import_string(LAYERS[kind])(hosts=[url])
+
+
+async def close_layer(layer):
+    # The core layer's flush() deletes every key under its prefix, which would
+    # disturb a shared Redis; only drop the connections.
+    if hasattr(layer, "close_pools"):
+        await layer.close_pools()
+    else:
+        await layer.flush()
+
+
+def serve_standin(ports):
+    async def serve():
+        server = PubSubServer(port=0)
+        await server.start()
+        ports.put(server.port)
+        await server.server.serve_forever()
+    asyncio.run(serve())
+
+
+def run_worker(kind, url, viewers, ready, results):
+    """One ASGI worker's worth of viewers, all in the benchmark group."""
+    async def receive():
+        layer = make_layer(kind, url)
+        channels = [await layer.new_channel() for _ in range(viewers)]
+        for channel in channels:
+            await layer.group_add(GROUP, channel)
+        ready.put(True)
+        latencies = []
+        received = []
+
+        async def drain(channel):
+            while True:
+                message = await layer.receive(channel)
+                if message["type"] == "bench.done":
+                    return
+                now = time.time()
+                latencies.append(now - message["sent"])
+                received.append(now)
+
+        await asyncio.gather(*(drain(channel) for channel in channels))
+        for channel in channels:
+            await layer.group_discard(GROUP, channel)
+        await close_layer(layer)
+        results.put({
+            "latencies": latencies,
+            "last": max(received, default=0.0),
+        })
+    asyncio.run(receive())
+
+
+async def publish(kind, url, messages, rate):
+    layer = make_layer(kind, url)
+    payload = {"gaze_x": 0.5, "gaze_y": 0.5, "pupil_diameter": 3.0, "source": "bench"}
+    started = time.time()
+    for i in range(messages):
+        if rate:
+            delay = started + i / rate - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await layer.group_send(GROUP, {"type": "bench.gaze", "sent": time.time(), "data": payload})
+    # Pub/sub keeps per-connection order, so this arrives after every sample.
+    await layer.group_send(GROUP, {"type": "bench.done"})
+    await close_layer(layer)
+    return started
+
+
+def run_phase(context, kind, url, workers, viewers, messages, rate):
+    ready = context.Queue()
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(kind, url, viewers, ready, results), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=60)
+    # SUBSCRIBE is sent without waiting for its confirmation; let it land.
+    time.sleep(0.2)
+
+    started = asyncio.run(publish(kind, url, messages, rate))
+    reports = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join(timeout=10)
+
+    latencies = np.array([latency for report in reports for latency in report["latencies"]]) * 1000
+    expected = messages * workers * viewers
+    last = max(report["last"] for report in reports)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (0, 0, 0)
+    return {
+        "layer": kind,
+        "workers": workers,
+        "viewers": workers * viewers,
+        "rate": rate or "max",
+        "messages": messages,
+        "delivered": int(latencies.size),
+        "delivered_ratio": round(latencies.size / expected, 4),
+        "deliveries_per_second": round(latencies.size / (last - started), 1) if last > started else 0.0,
+        "latency_ms_p50": round(float(p50), 3),
+        "latency_ms_p95": round(float(p95), 3),
+        "latency_ms_p99": round(float(p99), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cross-process group broadcast latency and throughput of the Redis channel layers. "
+        "Each worker process holds --viewers channels in one group; the command publishes to it "
+        "at --rate messages/s and then as fast as it can."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layer", choices=sorted(LAYERS), default="pubsub")
+        parser.add_argument(
+            "--redis-url", help="Redis to test against; by default an in-process pub/sub stand-in is started."
+        )
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+        parser.add_argument("--viewers", type=int, default=10, help="Channels in the group per worker.")
+        parser.add_argument("--messages", type=int, default=2000, help="Broadcasts per phase.")
+        parser.add_argument("--rate", type=float, default=200.0, help="Broadcasts/s in the paced phase.")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        kind = options["layer"]
+        url = options["redis_url"]
+        context = multiprocessing.get_context("spawn")
+        standin = None
+        if url is None:
+            if kind != "pubsub":
+                raise CommandError("The core layer runs Lua scripts the stand-in lacks; pass --redis-url.")
+            ports = context.Queue()
+            standin = context.Process(target=serve_standin, args=(ports,), daemon=True)
+            standin.start()
+            url = f"redis://127.0.0.1:{ports.get(timeout=30)}/0"
+
+        results = []
+        try:
+            for workers in options["workers"]:
+                for rate in (options["rate"], 0):
+                    results.append(run_phase(
+                        context, kind, url, workers, options["viewers"], options["messages"], rate
+                    ))
+        finally:
+            if standin is not None:
+                standin.terminate()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'layer':<8}{'workers':>8}{'viewers':>8}{'rate':>7}{'delivered':>11}"
+            f"{'per sec':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['layer']:<8}{r['workers']:>8}{r['viewers']:>8}{str(r['rate']):>7}"
+                f"{r['delivered_ratio']:>11.2%}{r['deliveries_per_second']:>10.0f}"
+                f"{r['latency_ms_p50']:>9.2f}{r['latency_ms_p95']:>9.2f}{r['latency_ms_p99']:>9.2f}"
+            )
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import time
+import numpy as np
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from eye_tracking import metrics
+from eye_tracking.models import EyeTrackingSession, GazeData
+
+BENCH_EMAIL = "bench-consumers@localhost"
+SOURCE = "bench"
+
+
+def totals(label, name):
+    return metrics.process_totals.get(label, {}).get(name, 0)
+
+
+@database_sync_to_async
+def create_sessions(level, count):
+    User = get_user_model()
+    user = User.objects.filter(email=BENCH_EMAIL).first() or User.objects.create_user(
+        BENCH_EMAIL, first_name="Bench", last_name="Consumers"
+    )
+    sessions = EyeTrackingSession.objects.bulk_create(
+        [EyeTrackingSession(user=user, session_id=f"bench_{level}_{i}") for i in range(count)]
+    )
+    return [session.session_id for session in sessions]
+
+
+@database_sync_to_async
+def delete_sessions(session_ids):
+    EyeTrackingSession.objects.filter(session_id__in=session_ids).delete()
+
+
+@database_sync_to_async
+def count_rows(session_ids):
+    return GazeData.objects.filter(session__session_id__in=session_ids).count()
+
+
+async def wait_until(predicate, timeout, interval=0.005):
+    """Poll ``predicate``; returns the monotonic time it held, or None on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return time.monotonic()
+        await asyncio.sleep(interval)
+    return None
+
+
+async def send_samples(source, session_id, options, started_at, sent_at):
+    """Stream ``--samples`` samples in ``--batch``-sized messages; the pupil field
+    carries the sample number so broadcasts can be matched to their send."""
+    batch, rate = options["batch"], options["rate"]
+    for seq in range(0, options["samples"], batch):
+        count = min(batch, options["samples"] - seq)
+        if rate:
+            delay = started_at + (seq + count) / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # Sender timestamps stay 1/120 s apart so GAZE_SAVE_INTERVAL applies
+        # the same way whatever the send rate.
+        samples = [[(seq + k) / 120.0, 500.0 + (seq + k) % 50, 400.0, float(seq + k)] for k in range(count)]
+        sent_at[seq + count - 1] = time.monotonic()
+        await source.send_json_to({
+            "type": "eye.data.batch",
+            "payload": {"session_id": session_id, "source": SOURCE, "samples": samples},
+        })
+        await asyncio.sleep(0)
+
+
+async def watch_viewer(viewer, sent_at, latencies, done):
+    # Read the output queue directly: a receive timeout on the communicator
+    # would cancel the consumer.
+    while not done.is_set():
+        try:
+            message = await asyncio.wait_for(viewer.output_queue.get(), 0.1)
+        except asyncio.TimeoutError:
+            continue
+        received = time.monotonic()
+        if message.get("type") != "websocket.send" or "text" not in message:
+            continue
+        payload = json.loads(message["text"]).get("payload", {})
+        seq = payload.get("pupil_diameter")
+        if seq is None:
+            continue
+        sent = sent_at.get(int(seq))
+        if sent is not None:
+            latencies.append(received - sent)
+
+
+async def run_level(application, collectors, options):
+    session_ids = await create_sessions(collectors, collectors)
+    viewers = [WebsocketCommunicator(application, f"/ws/eye-tracking/{sid}/") for sid in session_ids]
+    sources = [WebsocketCommunicator(application, f"/ws/gaze-collector/{sid}/") for sid in session_ids]
+    for communicator in viewers + sources:
+        connected, _ = await communicator.connect()
+        assert connected, "consumer refused the connection"
+
+    received_before = totals("collector", "received")
+    throttled_before = totals("collector", "throttled")
+    persisted_before = totals("gaze samples", "persisted")
+    dropped_before = totals("gaze samples", "dropped")
+    expected = collectors * options["samples"]
+    sent_at = [{} for _ in session_ids]
+    latencies = []
+    done = asyncio.Event()
+    watchers = [
+        asyncio.create_task(watch_viewer(viewer, sent, latencies, done))
+        for viewer, sent in zip(viewers, sent_at)
+    ]
+
+    started = time.monotonic()
+    await asyncio.gather(*(
+        send_samples(source, sid, options, started, sent)
+        for source, sid, sent in zip(sources, session_ids, sent_at)
+    ))
+
+    def received():
+        return totals("collector", "received") - received_before
+
+    def written():
+        # Every sample not skipped by the save interval is persisted or dropped.
+        saved = received() - (totals("collector", "throttled") - throttled_before)
+        handled = totals("gaze samples", "persisted") - persisted_before
+        return handled + totals("gaze samples", "dropped") - dropped_before >= saved
+
+    ingested = await wait_until(lambda: received() >= expected, 60)
+    persisted = await wait_until(written, 60)
+    # Let the last tick's broadcast arrive before the viewers stop reading.
+    await asyncio.sleep(0.1)
+    done.set()
+    await asyncio.gather(*watchers)
+    for communicator in sources + viewers:
+        await communicator.disconnect()
+
+    rows = await count_rows(session_ids)
+    await delete_sessions(session_ids)
+    latency_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99]) if latency_ms.size else (0, 0, 0)
+    ingest_seconds = (ingested or time.monotonic()) - started
+    persist_seconds = (persisted or time.monotonic()) - started
+    return {
+        "collectors": collectors,
+        "samples": expected,
+        "batch": options["batch"],
+        "rate": options["rate"] or "max",
+        "save_interval": options["save_interval"],
+        "ingest_seconds": round(ingest_seconds, 4),
+        "samples_per_second": round(expected / ingest_seconds, 1),
+        "broadcasts": int(latency_ms.size),
+        "latency_ms_p50": round(float(p50), 3),
+        "latency_ms_p95": round(float(p95), 3),
+        "latency_ms_p99": round(float(p99), 3),
+        "rows": rows,
+        "rows_dropped": totals("gaze samples", "dropped") - dropped_before,
+        "rows_per_second": round(rows / persist_seconds, 1),
+        "timed_out": ingested is None or persisted is None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark GazeCollectorConsumer and EyeTrackingConsumer in-process with channels' "
+        "WebsocketCommunicator on a throwaway test database: samples/s ingested, send-to-viewer "
+        "broadcast latency and GazeData rows/s for each number of concurrent collectors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collectors", type=int, nargs="+", default=[1, 4, 16, 64])
+        parser.add_argument("--samples", type=int, default=1200, help="Samples per collector.")
+        parser.add_argument("--batch", type=int, default=6, help="Samples per eye.data.batch message.")
+        parser.add_argument("--rate", type=float, default=0.0, help="Samples/s per collector; 0 sends flat out.")
+        parser.add_argument(
+            "--save-interval", type=float, default=0.0,
+            help="GAZE_SAVE_INTERVAL for the run; the default 0 persists every sample.",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        # Imported here: the routing pulls in the consumers, which need apps loaded.
+        from biasbracker_server.asgi import application
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = []
+        try:
+            with override_settings(GAZE_SAVE_INTERVAL=options["save_interval"]):
+                for collectors in options["collectors"]:
+                    results.append(asyncio.run(run_level(application, collectors, options)))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'collectors':>10}{'samples':>9}{'samples/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'rows':>8}{'rows/s':>9}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['collectors']:>10}{r['samples']:>9}{r['samples_per_second']:>11.0f}"
+                f"{r['latency_ms_p50']:>9.2f}{r['latency_ms_p95']:>9.2f}{r['latency_ms_p99']:>9.2f}"
+                f"{r['rows']:>8}{r['rows_per_second']:>9.0f}"
+                + ("  (timed out)" if r["timed_out"] else "")
+            )
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+from eye_tracking.consumers import LEGACY_GROUP, session_group
+
+
+class CountingChannelLayer(InMemoryChannelLayer):
+    """In-memory layer that counts deliveries per channel instead of queueing them."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delivered = Counter()
+
+    async def send(self, channel, message):
+        self.delivered[channel] += 1
+
+
+async def run_fanout(sessions, viewers, frames, scoped):
+    layer = CountingChannelLayer()
+    for s in range(sessions):
+        group = session_group(f"bench_{s}") if scoped else LEGACY_GROUP
+        for v in range(viewers):
+            await layer.group_add(group, f"viewer.{s}.{v}")
+
+    started = time.perf_counter()
+    for _ in range(frames):
+        for s in range(sessions):
+            group = session_group(f"bench_{s}") if scoped else LEGACY_GROUP
+            await layer.group_send(group, {"type": "broadcast.gaze", "data": {"gaze_x": 0, "gaze_y": 0}})
+    elapsed = time.perf_counter() - started
+
+    connections = sessions * viewers
+    deliveries = sum(layer.delivered.values())
+    return {
+        "routing": "per-session" if scoped else "global",
+        "sessions": sessions,
+        "viewers": connections,
+        "frames_per_session": frames,
+        "deliveries": deliveries,
+        "deliveries_per_viewer": deliveries / connections,
+        "group_send_seconds": round(elapsed, 4),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare viewer message volume for global vs per-session gaze broadcast groups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+        parser.add_argument("--viewers", type=int, default=1, help="Viewers per session.")
+        parser.add_argument("--frames", type=int, default=200, help="Broadcasts per session (20 Hz = 10 s).")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        results = []
+        for sessions in options["sessions"]:
+            for scoped in (False, True):
+                results.append(asyncio.run(
+                    run_fanout(sessions, options["viewers"], options["frames"], scoped)
+                ))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'routing':<12}{'sessions':>9}{'viewers':>9}{'msgs/viewer':>13}{'deliveries':>12}{'seconds':>10}")
+        for r in results:
+            self.stdout.write(
+                f"{r['routing']:<12}{r['sessions']:>9}{r['viewers']:>9}"
+                f"{r['deliveries_per_viewer']:>13.0f}{r['deliveries']:>12}{r['group_send_seconds']:>10.4f}"
+            )
@@ -0,0 +1,88 @@
+import json
+import math
+import random
+import time
+from django.core.management.base import BaseCommand
+from eye_tracking.attention import AttentionScorer
+from eye_tracking.events import IDTDetector
+
+RATE = 120.0
+# The original consumer's window and fixation radius.
+LIST_WINDOW = 50
+FIXATION_THRESHOLD = 80
+
+
+def make_samples(count):
+    """Fixations of 0.1-0.5 s with a few pixels of jitter, joined by jumps."""
+    rng = random.Random(42)
+    samples = []
+    cx = cy = 0.0
+    remaining = 0
+    for i in range(count):
+        if remaining == 0:
+            cx, cy = rng.uniform(0, 1920), rng.uniform(0, 1080)
+            remaining = rng.randint(12, 60)
+        remaining -= 1
+        samples.append((i / RATE, cx + rng.uniform(-5, 5), cy + rng.uniform(-5, 5), 3.0 + rng.uniform(-0.1, 0.1)))
+    return samples
+
+
+def run_list_slice(samples, window):
+    """The previous consumer path: append, re-slice, compare against element 0,
+    plus the centroid and dispersion a score over the window needs."""
+    history = []
+    started = time.perf_counter()
+    for t, x, y, _ in samples:
+        history.append((x, y, t))
+        history = history[-window:]
+        if len(history) >= window:
+            prev_x, prev_y, _ = history[0]
+            ((x - prev_x) ** 2 + (y - prev_y) ** 2) ** 0.5 < FIXATION_THRESHOLD
+            mean_x = sum(p[0] for p in history) / window
+            mean_y = sum(p[1] for p in history) / window
+            math.sqrt(sum((p[0] - mean_x) ** 2 + (p[1] - mean_y) ** 2 for p in history) / window)
+    return time.perf_counter() - started
+
+
+def run_streaming(samples, window):
+    """The current consumer path: I-DT over ``window`` samples' worth of time
+    and the attention statistics over ``window`` samples."""
+    detector = IDTDetector(min_duration=window / RATE)
+    scorer = AttentionScorer(window)
+    started = time.perf_counter()
+    for t, x, y, pupil in samples:
+        detector.update(t, x, y, pupil)
+        scorer.push(t, x, y, pupil)
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Measure per-sample gaze-history cost: list slicing vs the streaming detector and scorer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=100_000)
+        parser.add_argument(
+            "--windows", type=int, nargs="+", default=[LIST_WINDOW, 240, 1000],
+            help="Window sizes in samples (240 is 2 s at 120 Hz).",
+        )
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        samples = make_samples(options["samples"])
+        results = []
+        for window in options["windows"]:
+            for name, run in (("list_slice", run_list_slice), ("streaming", run_streaming)):
+                seconds = run(samples, window)
+                results.append({
+                    "impl": name,
+                    "window": window,
+                    "seconds": round(seconds, 4),
+                    "samples_per_second": round(len(samples) / seconds),
+                })
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'impl':<12}{'window':>8}{'samples/s':>14}")
+        for r in results:
+            self.stdout.write(f"{r['impl']:<12}{r['window']:>8}{r['samples_per_second']:>14,}")
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from websockets.asyncio.client import connect
+from eye_tracking.models import EyeTrackingSession, Fixation, GazeData
+from eye_tracking.protocol import encode_frame
+
+SOURCE = "loadgen"
+LOADGEN_EMAIL = "gaze-loadgen@localhost"
+# Samples per simulated fixation before the gaze jumps elsewhere.
+FIXATION_SAMPLES = 15
+
+
+def simulated_samples(rng, seq, count, now, rate, target):
+    """``count`` samples ending at ``now``, dwelling on ``target`` and jumping
+    every FIXATION_SAMPLES. The pupil field carries the sample's sequence
+    number, so a viewer can tell which send a broadcast came from."""
+    samples = []
+    for k in range(count):
+        if (seq + k) % FIXATION_SAMPLES == 0:
+            target = (rng.uniform(100, 1820), rng.uniform(100, 980))
+        samples.append((
+            now - (count - 1 - k) / rate,
+            target[0] + rng.gauss(0, 8), target[1] + rng.gauss(0, 8), float(seq + k),
+        ))
+    return samples, target
+
+
+async def run_collector(ws, session_id, index, options, deadline, sent_at, stats):
+    rng = random.Random(index)
+    rate, batch = options["rate"], options["batch"]
+    interval = batch / rate
+    seq = 0
+    target = (960.0, 540.0)
+    next_send = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            now = time.time()
+            samples, target = simulated_samples(rng, seq, batch, now, rate, target)
+            seq += batch
+            # Only the last sample of a batch is live when the ticker broadcasts.
+            sent_at[session_id][seq - 1] = now
+            if options["binary"]:
+                await ws.send(encode_frame(session_id, SOURCE, samples))
+            else:
+                await ws.send(json.dumps({
+                    "type": "eye.data.batch",
+                    "payload": {"session_id": session_id, "source": SOURCE, "samples": samples},
+                }))
+            stats["frames"] += 1
+            stats["samples"] += batch
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+    except Exception:
+        stats["collector_errors"] += 1
+    finally:
+        await ws.close()
+
+
+async def run_viewer(ws, session_id, until, sent_at, latencies, stats):
+    try:
+        while (timeout := until - time.monotonic()) > 0:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout)
+            except asyncio.TimeoutError:
+                break
+            received = time.time()
+            data = json.loads(message)
+            if data.get("type") != "eye.data":
+                continue
+            stats["viewer_messages"] += 1
+            sent = sent_at[session_id].get(int(data["payload"].get("pupil_diameter") or -1))
+            if sent is None:
+                stats["unmatched"] += 1
+            else:
+                latencies.append(received - sent)
+    except Exception:
+        stats["viewer_errors"] += 1
+    finally:
+        await ws.close()
+
+
+async def open_all(urls):
+    results = await asyncio.gather(*(connect(url, max_size=None) for url in urls), return_exceptions=True)
+    return [None if isinstance(result, BaseException) else result for result in results]
+
+
+async def run_stage(options, session_ids, viewers):
+    url = options["url"].rstrip("/")
+    stats = Counter()
+    sent_at = defaultdict(dict)
+    latencies = []
+
+    viewer_sessions = [session_ids[i % len(session_ids)] for i in range(viewers)]
+    viewer_sockets = await open_all(f"{url}/ws/eye-tracking/{sid}/" for sid in viewer_sessions)
+    collector_sockets = await open_all(f"{url}/ws/gaze-collector/{sid}/" for sid in session_ids)
+    stats["connect_errors"] = sum(ws is None for ws in viewer_sockets + collector_sockets)
+
+    started = time.monotonic()
+    deadline = started + options["duration"]
+    tasks = [
+        run_collector(ws, sid, i, options, deadline, sent_at, stats)
+        for i, (ws, sid) in enumerate(zip(collector_sockets, session_ids)) if ws is not None
+    ] + [
+        run_viewer(ws, sid, deadline + options["settle"], sent_at, latencies, stats)
+        for ws, sid in zip(viewer_sockets, viewer_sessions) if ws is not None
+    ]
+    await asyncio.gather(*tasks)
+    return stats, latencies, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with simulated collectors and viewers over real websockets, and "
+        "report throughput, broadcast latency and persisted rows. Run it with the server's "
+        "settings so it can create the sessions and count their rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="ws://localhost:8000", help="Server base URL.")
+        parser.add_argument("--collectors", type=int, nargs="+", default=[10], help="Collectors per stage.")
+        parser.add_argument("--viewers", type=int, help="Viewers per stage (default: one per collector).")
+        parser.add_argument("--rate", type=float, default=60.0, help="Samples/s per collector.")
+        parser.add_argument("--batch", type=int, default=6, help="Samples per message.")
+        parser.add_argument("--binary", action="store_true", help="Send binary frames instead of JSON.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of sending per stage.")
+        parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait for broadcasts and flushes.")
+        parser.add_argument("--keep", action="store_true", help="Keep the sessions and rows created.")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = User.objects.filter(email=LOADGEN_EMAIL).first() or User.objects.create_user(
+            LOADGEN_EMAIL, first_name="Gaze", last_name="Loadgen"
+        )
+        results = []
+        for collectors in options["collectors"]:
+            viewers = collectors if options["viewers"] is None else options["viewers"]
+            prefix = f"loadgen_{int(time.time() * 1000)}"
+            sessions = EyeTrackingSession.objects.bulk_create(
+                [EyeTrackingSession(user=user, session_id=f"{prefix}_{i}") for i in range(collectors)]
+            )
+            session_ids = [session.session_id for session in sessions]
+            stats, latencies, elapsed = asyncio.run(run_stage(options, session_ids, viewers))
+            time.sleep(options["settle"])
+
+            sessions = EyeTrackingSession.objects.filter(session_id__startswith=f"{prefix}_")
+            rows = GazeData.objects.filter(session__in=sessions).count()
+            fixations = Fixation.objects.filter(session__in=sessions).count()
+            if not options["keep"]:
+                sessions.delete()
+
+            interval = settings.GAZE_SAVE_INTERVAL
+            expected = stats["samples"] if interval <= 0 else min(
+                stats["samples"], int(collectors * options["duration"] / interval)
+            )
+            latency_ms = np.array(latencies) * 1000
+            p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99]) if latency_ms.size else (0, 0, 0)
+            duration = options["duration"]
+            results.append({
+                "collectors": collectors,
+                "viewers": viewers,
+                "rate": options["rate"],
+                "batch": options["batch"],
+                "encoding": "binary" if options["binary"] else "json",
+                "seconds": round(elapsed, 2),
+                "messages_sent_per_second": round(stats["frames"] / duration, 1),
+                "samples_sent_per_second": round(stats["samples"] / duration, 1),
+                "viewer_messages_per_second": round(stats["viewer_messages"] / duration, 1),
+                "latency_ms_p50": round(float(p50), 2),
+                "latency_ms_p95": round(float(p95), 2),
+                "latency_ms_p99": round(float(p99), 2),
+                "latency_ms_max": round(float(latency_ms.max()), 2) if latency_ms.size else 0.0,
+                "rows_persisted": rows,
+                "rows_expected": expected,
+                "fixations_persisted": fixations,
+                "unmatched_broadcasts": stats["unmatched"],
+                "errors": stats["connect_errors"] + stats["collector_errors"] + stats["viewer_errors"],
+            })
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'collectors':>10}{'viewers':>8}{'sent/s':>9}{'viewer/s':>9}{'p50 ms':>8}{'p95 ms':>8}"
+            f"{'p99 ms':>8}{'rows':>8}{'expected':>9}{'errors':>7}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['collectors']:>10}{r['viewers']:>8}{r['samples_sent_per_second']:>9.0f}"
+                f"{r['viewer_messages_per_second']:>9.0f}{r['latency_ms_p50']:>8.1f}{r['latency_ms_p95']:>8.1f}"
+                f"{r['latency_ms_p99']:>8.1f}{r['rows_persisted']:>8}{r['rows_expected']:>9}{r['errors']:>7}"
+            )
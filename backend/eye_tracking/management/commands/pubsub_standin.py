@@ -0,0 +1,22 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from eye_tracking.pubsub_server import PubSubServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local Redis pub/sub stand-in so several ASGI workers can share channel groups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=6379)
+
+    def handle(self, *args, **options):
+        server = PubSubServer(options["host"], options["port"])
+        self.stdout.write(
+            f"Serving pub/sub on {options['host']}:{options['port']}; start workers with "
+            f"CHANNEL_LAYER_URL=redis://{options['host']}:{options['port']}/0"
+        )
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,48 @@
+"""Ingestion counters, kept per collector connection and summed per process.
+
+Collectors count the samples they receive, the ones skipped by
+``GAZE_SAVE_INTERVAL`` and the ones their writer refused; writers count the
+rows they accept, drop, spill and persist and their buffer high-water mark.
+``snapshot()`` reports the process totals, the live writers and every live
+connection for the metrics endpoint. With several ASGI workers each process
+keeps its own numbers.
+"""
+import os
+import weakref
+from collections import Counter
+
+process_totals = {}
+collectors = weakref.WeakSet()
+writers = weakref.WeakSet()
+
+
+class IngestCounters:
+    """Named counters that also add to this process's totals for ``label``."""
+
+    def __init__(self, label):
+        self.label = label
+        self.counts = Counter()
+        self.high_water = 0
+        self.totals = process_totals.setdefault(label, Counter())
+
+    def incr(self, name, count=1):
+        self.counts[name] += count
+        self.totals[name] += count
+
+    def observe_depth(self, depth):
+        if depth > self.high_water:
+            self.high_water = depth
+            self.totals["high_water"] = max(self.totals["high_water"], depth)
+
+    def as_dict(self):
+        return {**self.counts, "high_water": self.high_water}
+
+
+def snapshot():
+    return {
+        "pid": os.getpid(),
+        "connections": len(collectors),
+        "totals": {label: dict(totals) for label, totals in process_totals.items()},
+        "writers": [writer.metrics() for writer in list(writers)],
+        "collectors": [collector.metrics() for collector in list(collectors)],
+    }
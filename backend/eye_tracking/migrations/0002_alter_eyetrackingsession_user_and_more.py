@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eye_tracking', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eyetrackingsession',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eyetrack', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='gazedata',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='Fixation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('x', models.FloatField()),
+                ('y', models.FloatField()),
+                ('dispersion', models.FloatField()),
+                ('pupil_diameter', models.FloatField(blank=True, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fixations', to='eye_tracking.eyetrackingsession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session', 'start_time'], name='eye_trackin_session_35c375_idx')],
+            },
+        ),
+    ]
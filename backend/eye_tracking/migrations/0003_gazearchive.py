@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eye_tracking', '0002_alter_eyetrackingsession_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GazeArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format_version', models.PositiveSmallIntegerField(default=1)),
+                ('sample_count', models.PositiveIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('t0', models.FloatField(help_text='Epoch seconds that the packed sample times are relative to.')),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='eye_tracking.eyetrackingsession')),
+            ],
+        ),
+    ]
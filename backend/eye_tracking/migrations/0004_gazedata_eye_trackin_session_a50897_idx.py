@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eye_tracking', '0003_gazearchive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gazedata',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='eye_trackin_session_a50897_idx'),
+        ),
+    ]
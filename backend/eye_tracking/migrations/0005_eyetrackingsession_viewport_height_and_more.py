@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eye_tracking', '0004_gazedata_eye_trackin_session_a50897_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eyetrackingsession',
+            name='viewport_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eyetrackingsession',
+            name='viewport_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='AreaOfInterest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('left', models.FloatField()),
+                ('top', models.FloatField()),
+                ('right', models.FloatField()),
+                ('bottom', models.FloatField()),
+                ('dwell_time', models.FloatField(default=0.0, help_text='Seconds of fixation inside the area.')),
+                ('fixation_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='areas', to='eye_tracking.eyetrackingsession')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'key'), name='unique_session_aoi_key')],
+            },
+        ),
+    ]
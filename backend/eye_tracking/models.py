@@ -12,6 +12,9 @@ class EyeTrackingSession(models.Model):
     session_id = models.CharField(max_length=255, unique=True)
     start_time = models.DateTimeField(default=now)
     end_time = models.DateTimeField(null=True, blank=True)
+    # Viewport the page's areas of interest were measured in, in CSS pixels.
+    viewport_width = models.PositiveIntegerField(null=True, blank=True)
+    viewport_height = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"Session {self.session_id} - {self.user.username}"
@@ -21,7 +24,76 @@ class GazeData(models.Model):
     gaze_x = models.FloatField()
     gaze_y = models.FloatField()
     pupil_diameter = models.FloatField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=now)
+
+    class Meta:
+        # Serves time-ordered reads and keyset pagination per session.
+        indexes = [models.Index(fields=["session", "timestamp", "id"])]
 
     def __str__(self):
         return f"Gaze Data {self.session.session_id} at {self.timestamp}"
+
+
+class Fixation(models.Model):
+    """A detected fixation; far fewer rows than the GazeData it summarises."""
+    session = models.ForeignKey(EyeTrackingSession, on_delete=models.CASCADE, related_name="fixations")
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    x = models.FloatField()
+    y = models.FloatField()
+    dispersion = models.FloatField()
+    pupil_diameter = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["session", "start_time"])]
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    def __str__(self):
+        return f"Fixation {self.session.session_id} at {self.start_time}"
+
+
+class GazeArchive(models.Model):
+    """A finished session's GazeData packed into one compressed columnar blob.
+
+    See ``eye_tracking.archive`` for the layout. GazeData rows with ids up to
+    ``last_id`` are in the blob and may have been deleted from the hot table.
+    """
+    session = models.OneToOneField(EyeTrackingSession, on_delete=models.CASCADE, related_name="archive")
+    format_version = models.PositiveSmallIntegerField(default=1)
+    sample_count = models.PositiveIntegerField()
+    last_id = models.BigIntegerField()
+    t0 = models.FloatField(help_text="Epoch seconds that the packed sample times are relative to.")
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Gaze archive {self.session.session_id} ({self.sample_count} samples)"
+
+
+class AreaOfInterest(models.Model):
+    """A rendered section of the article being read, e.g. ``title``,
+    ``introduction``, ``section-2`` or ``conclusion``.
+
+    The box is in viewport pixels and is re-registered as the page scrolls;
+    ``dwell_time`` and ``fixation_count`` accumulate the fixations that landed
+    in it as they are detected.
+    """
+    session = models.ForeignKey(EyeTrackingSession, on_delete=models.CASCADE, related_name="areas")
+    key = models.CharField(max_length=64)
+    label = models.CharField(max_length=255, blank=True)
+    left = models.FloatField()
+    top = models.FloatField()
+    right = models.FloatField()
+    bottom = models.FloatField()
+    dwell_time = models.FloatField(default=0.0, help_text="Seconds of fixation inside the area.")
+    fixation_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["session", "key"], name="unique_session_aoi_key")]
+
+    def __str__(self):
+        return f"AOI {self.key} of {self.session.session_id}"
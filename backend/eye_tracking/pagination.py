@@ -0,0 +1,66 @@
+"""Keyset pagination over a session's samples, newest first.
+
+A cursor encodes the ``(timestamp, id)`` of the last row of a page; the next
+page holds the rows strictly before it in that order. Unlike OFFSET paging
+this stays a single index range scan however deep the page is, and pages
+do not shift while new samples are appended.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+MAX_PAGE_SIZE = 5000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(micros, row_id):
+    return base64.urlsafe_b64encode(f"{micros}:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the ``(microseconds since epoch, id)`` a cursor points at."""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        micros, row_id = decoded.split(":")
+        return int(micros), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor.") from e
+
+
+def queryset_page(queryset, cursor, limit):
+    """Page a GazeData queryset; returns ``(rows, next_cursor)``."""
+    queryset = queryset.order_by("-timestamp", "-id")
+    if cursor is not None:
+        micros, row_id = cursor
+        timestamp = EPOCH + timedelta(microseconds=micros)
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=row_id))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor((last.timestamp - EPOCH) // ONE_MICROSECOND, last.id)
+
+
+def columns_page(columns, cursor, limit):
+    """Page ``GazeColumns`` sorted by ``(t, id)``; returns ``(page, next_cursor)``
+    with the page newest first."""
+    micros = np.round(columns.t * 1e6).astype(np.int64)
+    end = columns.size
+    if cursor is not None:
+        cursor_micros, cursor_id = cursor
+        lo = int(np.searchsorted(micros, cursor_micros, side="left"))
+        hi = int(np.searchsorted(micros, cursor_micros, side="right"))
+        end = lo + int(np.searchsorted(columns.id[lo:hi], cursor_id, side="left"))
+    start = max(end - limit, 0)
+    page = columns.take(np.arange(end - 1, start - 1, -1))
+    if start == 0:
+        return page, None
+    return page, encode_cursor(int(micros[start]), int(columns.id[start]))
@@ -0,0 +1,92 @@
+"""Binary batch frames accepted on /ws/gaze-collector/ next to JSON messages.
+
+A frame is a fixed little-endian header, two short UTF-8 strings and a packed
+array of ``(t, x, y, pupil)`` records:
+
+    magic    2s   b"GZ"
+    version  B    FRAME_VERSION
+    flags    B    FLAG_FLOAT64 set: records are float64, otherwise float32;
+                  SPACE_MASK bits: the coordinate space of x and y
+    count    H    number of records
+    t0       d    base time in seconds; each record's t is an offset from it
+    sid_len  B    byte length of the session id
+    src_len  B    byte length of the source name
+    session id, source, then count * 4 floats
+
+The Tobii companion is deployed on its own and carries a copy of
+``encode_frame`` (``tobii_client/gaze_frame.py``) with the same signature
+and output; tests check that both round-trip through ``decode_frame``.
+"""
+import math
+import struct
+import sys
+from array import array
+
+FRAME_MAGIC = b"GZ"
+FRAME_VERSION = 1
+FLAG_FLOAT64 = 0x01
+HEADER = struct.Struct("<2sBBHdBB")
+RECORD_FIELDS = 4
+
+# What gaze x and y are measured in: "screen" pixels (the Tobii companion),
+# "viewport" CSS pixels of the article page (the webcam tracker) or
+# "normalised" fractions of the screen. Samples that do not say are in
+# DEFAULT_SPACE; frames from before spaces existed carry 0, i.e. screen.
+COORDINATE_SPACES = ("screen", "viewport", "normalised")
+DEFAULT_SPACE = "screen"
+SPACE_SHIFT = 1
+SPACE_MASK = 0x06
+
+
+class FrameError(ValueError):
+    pass
+
+
+def decode_frame(data):
+    """Decode a frame in one pass.
+
+    Returns ``(session_id, source, space, t0, records)`` where ``records`` is
+    a flat ``array`` of ``t, x, y, pupil`` values, ``t`` relative to ``t0``.
+    """
+    if len(data) < HEADER.size:
+        raise FrameError("Frame is shorter than its header.")
+    magic, version, flags, count, t0, sid_len, src_len = HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise FrameError(f"Unsupported frame {magic!r} v{version}.")
+    space = (flags & SPACE_MASK) >> SPACE_SHIFT
+    if space >= len(COORDINATE_SPACES):
+        raise FrameError(f"Unknown coordinate space {space}.")
+
+    view = memoryview(data)
+    offset = HEADER.size
+    session_id = bytes(view[offset:offset + sid_len]).decode("utf-8")
+    offset += sid_len
+    source = bytes(view[offset:offset + src_len]).decode("utf-8")
+    offset += src_len
+
+    records = array("d" if flags & FLAG_FLOAT64 else "f")
+    if len(view) - offset != count * RECORD_FIELDS * records.itemsize:
+        raise FrameError(f"Frame body does not hold {count} records.")
+    records.frombytes(view[offset:])
+    if sys.byteorder == "big":
+        records.byteswap()
+    return session_id, source, COORDINATE_SPACES[space], t0, records
+
+
+def encode_frame(session_id, source, samples, double=False, space=DEFAULT_SPACE):
+    """Pack ``(t, x, y, pupil)`` samples, with absolute ``t``, into a frame.
+
+    ``t0`` is the first sample's time; a missing pupil is sent as NaN. Same
+    signature and output as the companion's encoder.
+    """
+    t0 = samples[0][0] if samples else 0.0
+    records = array("d" if double else "f")
+    for t, x, y, pupil in samples:
+        records.extend((t - t0, x, y, math.nan if pupil is None else pupil))
+    if sys.byteorder == "big":
+        records.byteswap()
+    sid = session_id.encode("utf-8")
+    src = source.encode("utf-8")
+    flags = (FLAG_FLOAT64 if double else 0) | COORDINATE_SPACES.index(space) << SPACE_SHIFT
+    header = HEADER.pack(FRAME_MAGIC, FRAME_VERSION, flags, len(samples), t0, len(sid), len(src))
+    return header + sid + src + records.tobytes()
@@ -0,0 +1,126 @@
+"""A minimal in-process stand-in for Redis pub/sub.
+
+``PubSubServer`` speaks just enough of the Redis protocol (RESP2) for
+``channels_redis.pubsub.RedisPubSubChannelLayer``: PING, SUBSCRIBE,
+UNSUBSCRIBE and PUBLISH, plus the handshake commands redis-py sends on
+connect. It lets several ASGI workers, or the ``bench_channel_layer``
+command, share group broadcasts on a machine without a Redis server. It
+keeps nothing but subscriptions in memory; use real Redis in production.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger("django")
+
+
+def encode_bulk(value):
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def encode_array(*items):
+    parts = [b"*%d\r\n" % len(items)]
+    for item in items:
+        parts.append(b":%d\r\n" % item if isinstance(item, int) else encode_bulk(item))
+    return b"".join(parts)
+
+
+async def read_command(reader):
+    """Next command as a list of byte strings, or None at end of stream."""
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, e.g. typed into telnet or redis-cli's PING.
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        if not header.startswith(b"$"):
+            raise ValueError("Expected a bulk string.")
+        args.append((await reader.readexactly(int(header[1:]) + 2))[:-2])
+    return args
+
+
+class PubSubServer:
+    """Routes PUBLISHed messages to the connections SUBSCRIBEd to a channel."""
+
+    def __init__(self, host="127.0.0.1", port=6379):
+        self.host = host
+        self.port = port
+        self.subscribers = {}
+        self.server = None
+        self.published = 0
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        # Port 0 picks a free port; report the one actually bound.
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Pub/sub stand-in listening on {self.url}.")
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle(self, reader, writer):
+        subscribed = set()
+        try:
+            while (command := await read_command(reader)) is not None:
+                if not command:
+                    continue
+                name = command[0].upper()
+                if name == b"PUBLISH" and len(command) == 3:
+                    writer.write(b":%d\r\n" % self.publish(command[1], command[2]))
+                elif name == b"SUBSCRIBE":
+                    for channel in command[1:]:
+                        self.subscribers.setdefault(channel, set()).add(writer)
+                        subscribed.add(channel)
+                        writer.write(encode_array(b"subscribe", channel, len(subscribed)))
+                elif name == b"UNSUBSCRIBE":
+                    for channel in command[1:] or list(subscribed):
+                        self.unsubscribe(channel, writer)
+                        subscribed.discard(channel)
+                        writer.write(encode_array(b"unsubscribe", channel, len(subscribed)))
+                elif name == b"PING":
+                    if subscribed:
+                        writer.write(encode_array(b"pong", command[1] if len(command) > 1 else b""))
+                    else:
+                        writer.write(encode_bulk(command[1]) if len(command) > 1 else b"+PONG\r\n")
+                elif name in (b"CLIENT", b"SELECT", b"QUIT"):
+                    writer.write(b"+OK\r\n")
+                    if name == b"QUIT":
+                        break
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % command[0])
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.debug(f"Pub/sub stand-in client dropped: {e}")
+        finally:
+            for channel in subscribed:
+                self.unsubscribe(channel, writer)
+            writer.close()
+
+    def publish(self, channel, message):
+        writers = self.subscribers.get(channel, ())
+        if writers:
+            payload = encode_array(b"message", channel, message)
+            for writer in writers:
+                writer.write(payload)
+        self.published += 1
+        return len(writers)
+
+    def unsubscribe(self, channel, writer):
+        writers = self.subscribers.get(channel)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self.subscribers[channel]
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON object per line; ``render_rows`` serialises a chunk of tuples."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def header(self, fields):
+        return b""
+
+    def render_rows(self, fields, rows):
+        return "".join(
+            json.dumps(dict(zip(fields, row)), separators=(",", ":")) + "\n" for row in rows
+        ).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in items).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma-separated rows under a header line; missing values are empty."""
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def header(self, fields):
+        return self.render_rows(None, [fields])
+
+    def render_rows(self, fields, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        if not items:
+            return b""
+        fields = list(items[0])
+        return self.header(fields) + self.render_rows(fields, ([item.get(f) for f in fields] for item in items))
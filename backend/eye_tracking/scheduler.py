@@ -0,0 +1,202 @@
+"""Process-wide broadcast ticker and gaze writer pool.
+
+Collectors used to run their own 20 Hz broadcast loop and their own writer
+tasks, so event-loop wakeups grew with every connection. Instead, collectors
+hand the latest sample per viewer group to ``ticker``, which sends every
+group that changed once per tick, and buffer rows in ``writer_pool``, whose
+three writers are shared by all connections in the process. Both start
+with the first collector and stop after the last one disconnects. The
+ticker also asks each collector for its attention score every
+``ATTENTION_INTERVAL``, whether or not samples are arriving.
+"""
+import asyncio
+import logging
+import time
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from .archive import archive_session
+from .models import EyeTrackingSession
+from .writer import DwellWriter, FixationWriter, GazeBatchWriter
+
+logger = logging.getLogger("django")
+
+BROADCAST_INTERVAL = 0.05
+# Seconds between attention scores sent to each session's viewers.
+ATTENTION_INTERVAL = 0.25
+SESSION_RETRY_INTERVAL = 5
+
+
+class BroadcastTicker:
+    """Sends the latest message of each type to each changed viewer group
+    every ``interval``."""
+
+    def __init__(self, interval=BROADCAST_INTERVAL, attention_interval=ATTENTION_INTERVAL):
+        self.interval = interval
+        self.attention_interval = attention_interval
+        self.latest = {}
+        # collectors whose score_attention(now) is called every attention_interval
+        self.scorers = set()
+        self.last_scored = 0.0
+        self.users = 0
+        self.task = None
+        self.ticks = 0
+        self.broadcasts = 0
+
+    def acquire(self):
+        self.users += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def release(self):
+        self.users -= 1
+        if self.users <= 0 and self.task is not None:
+            self.users = 0
+            self.task.cancel()
+            try: await self.task
+            except asyncio.CancelledError: pass
+            self.task = None
+            self.latest.clear()
+            self.scorers.clear()
+
+    def publish(self, group, payload, message_type="broadcast.gaze"):
+        self.latest[group, message_type] = payload
+
+    async def run(self):
+        layer = get_channel_layer()
+        while True:
+            await asyncio.sleep(self.interval)
+            self.ticks += 1
+            now = time.time()
+            if now - self.last_scored >= self.attention_interval:
+                self.last_scored = now
+                for scorer in list(self.scorers):
+                    try:
+                        await scorer.score_attention(now)
+                    except Exception as e:
+                        logger.exception(f"Error scoring attention: {e}")
+            if not self.latest:
+                continue
+            changed, self.latest = self.latest, {}
+            for (group, message_type), payload in changed.items():
+                try:
+                    await layer.group_send(group, {"type": message_type, "data": payload})
+                except Exception as e:
+                    logger.exception(f"Error broadcasting gaze to {group}: {e}")
+            self.broadcasts += len(changed)
+
+
+class WriterPool:
+    """The gaze, fixation and AOI dwell writers shared by a process's collectors.
+
+    Buffers are keyed by payload session_id, so rows from every connection
+    to one session are batched together. The session_id -> pk mapping is
+    cached here too; misses are retried after SESSION_RETRY_INTERVAL so a
+    collector that connects before its session exists is picked up later.
+    """
+
+    def __init__(self):
+        self.users = 0
+        self.session_cache = {}
+        self.gaze = self.fixations = self.dwell = None
+        # session pk -> task archiving it (GAZE_ARCHIVE_ON_STOP)
+        self.archiving = {}
+
+    @property
+    def writers(self):
+        return tuple(writer for writer in (self.gaze, self.fixations, self.dwell) if writer is not None)
+
+    def acquire(self):
+        self.users += 1
+        if self.gaze is None:
+            max_pending = settings.GAZE_WRITER_MAX_PENDING
+            self.gaze = GazeBatchWriter(self.resolve_session, max_pending=max_pending)
+            self.fixations = FixationWriter(self.resolve_session, max_pending=max_pending)
+            self.dwell = DwellWriter(self.resolve_session, max_pending=max_pending)
+            for writer in self.writers:
+                writer.start()
+
+    async def release(self):
+        self.users -= 1
+        if self.users <= 0 and self.gaze is not None:
+            self.users = 0
+            writers = self.writers
+            self.gaze = self.fixations = self.dwell = None
+            for writer in writers:
+                await writer.close()
+            self.session_cache.clear()
+            if self.archiving:
+                await asyncio.wait(list(self.archiving.values()))
+
+    async def flush_session(self, session_key):
+        for writer in self.writers:
+            await writer.flush_session(session_key)
+
+    async def end_session(self, session_key, session_pk):
+        # Write out what was captured before the stop; the writers leave out
+        # rows captured after it.
+        resolved_at = time.monotonic()
+        self.session_cache[session_key] = (session_pk, resolved_at)
+        await self.flush_session(session_key)
+        # Other keys cached for this session ("unknown", which legacy clients
+        # send, maps to the newest open one) are flushed while they still map
+        # to it, then forgotten so their next rows resolve afresh.
+        aliases = [key for key, (pk, _) in self.session_cache.items() if pk == session_pk and key != session_key]
+        for key in aliases:
+            self.session_cache[key] = (session_pk, resolved_at)
+            await self.flush_session(key)
+            self.session_cache.pop(key, None)
+        if settings.GAZE_ARCHIVE_ON_STOP and session_pk not in self.archiving:
+            # In the background, so the collector keeps reading meanwhile.
+            task = asyncio.create_task(self.archive(session_pk))
+            self.archiving[session_pk] = task
+            task.add_done_callback(lambda _: self.archiving.pop(session_pk, None))
+
+    async def archive(self, session_pk):
+        """Pack an ended session once this process has written its rows.
+
+        Rows written later (by other workers, or a backlog replayed after the
+        stop) stay in GazeData and are merged on read until the session is
+        archived again, e.g. by ``manage.py archive_gaze_sessions``.
+        """
+        try:
+            await database_sync_to_async(self.archive_ended_session)(session_pk)
+        except Exception as e:
+            logger.exception(f"Error archiving session {session_pk}: {e}")
+
+    @staticmethod
+    def archive_ended_session(session_pk):
+        session = EyeTrackingSession.objects.filter(pk=session_pk).first()
+        if session is not None:
+            archive_session(session, delete_raw=settings.GAZE_ARCHIVE_DELETE_RAW)
+
+    def retry_session(self, session_key):
+        """Drop a cached miss so the key is looked up again on its next rows."""
+        cached = self.session_cache.get(session_key)
+        if cached is not None and cached[0] is None:
+            del self.session_cache[session_key]
+
+    async def resolve_session(self, session_key):
+        """Map a payload session_id to a session pk, or None."""
+        cached = self.session_cache.get(session_key)
+        if cached is not None:
+            session_pk, resolved_at = cached
+            if session_pk is not None or time.monotonic() - resolved_at < SESSION_RETRY_INTERVAL:
+                return session_pk
+        session_pk = await self.lookup_session(session_key)
+        self.session_cache[session_key] = (session_pk, time.monotonic())
+        return session_pk
+
+    @database_sync_to_async
+    def lookup_session(self, session_key):
+        if session_key == "unknown":
+            # Legacy clients send no session_id; attach to the newest open session.
+            sessions = EyeTrackingSession.objects.filter(end_time__isnull=True).order_by("-start_time")
+        else:
+            # Ended sessions too: a backlog replayed after the stop was captured before it.
+            sessions = EyeTrackingSession.objects.filter(session_id=session_key)
+        return sessions.values_list("pk", flat=True).first()
+
+
+ticker = BroadcastTicker()
+writer_pool = WriterPool()
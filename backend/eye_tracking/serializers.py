@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import EyeTrackingSession, GazeData
+from .models import AreaOfInterest, EyeTrackingSession, GazeData
+
+MAX_AREAS = 200
 
 class EyeTrackingSessionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,3 +12,30 @@ class GazeDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = GazeData
         fields = '__all__'
+
+class AreaOfInterestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AreaOfInterest
+        fields = ['key', 'label', 'left', 'top', 'right', 'bottom', 'dwell_time', 'fixation_count', 'updated_at']
+        read_only_fields = ['dwell_time', 'fixation_count', 'updated_at']
+        # Uniqueness per session is handled by the upsert in the view.
+        validators = []
+
+    def validate(self, data):
+        if data['right'] <= data['left'] or data['bottom'] <= data['top']:
+            raise serializers.ValidationError("An area needs right > left and bottom > top.")
+        return data
+
+class ViewportSerializer(serializers.Serializer):
+    width = serializers.IntegerField(min_value=1)
+    height = serializers.IntegerField(min_value=1)
+
+class AreaRegistrationSerializer(serializers.Serializer):
+    viewport = ViewportSerializer()
+    areas = AreaOfInterestSerializer(many=True, max_length=MAX_AREAS)
+
+    def validate_areas(self, areas):
+        keys = [area['key'] for area in areas]
+        if len(set(keys)) != len(keys):
+            raise serializers.ValidationError("Area keys must be unique.")
+        return areas
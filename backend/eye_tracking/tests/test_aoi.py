@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+from eye_tracking.aoi import AOIIndex, Box
+
+# A 1280x720 viewport: a title bar over two side-by-side sections.
+BOXES = [
+    Box("title", 0, 0, 1280, 100),
+    Box("left", 0, 100, 640, 720),
+    Box("right", 640, 100, 1280, 720),
+    Box("quote", 700, 300, 900, 400),
+]
+
+
+class AOIIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AOIIndex(BOXES, width=1280, height=720)
+
+    def test_smallest_box_wins(self):
+        self.assertEqual(self.index.locate(10, 10), "title")
+        self.assertEqual(self.index.locate(320, 400), "left")
+        self.assertEqual(self.index.locate(1000, 600), "right")
+        self.assertEqual(self.index.locate(800, 350), "quote")
+        self.assertIsNone(self.index.locate(1300, 10))
+
+    def test_points_are_brought_into_the_viewport(self):
+        index = self.index
+        # the right-hand section's centre, as each sender would report it
+        self.assertEqual(index.to_viewport(960, 410, "viewport"), (960, 410))
+        self.assertEqual(index.to_viewport(1440, 615, "screen"), (960, 410))
+        self.assertEqual(index.to_viewport(0.75, 0.5, "normalised"), (960, 360))
+        self.assertEqual(index.locate(*index.to_viewport(1440, 615, "screen")), "right")
+        # a viewport point near the corner is not mistaken for a fraction
+        self.assertEqual(index.locate(*index.to_viewport(1, 1, "viewport")), "title")
+
+    def test_screen_pixels_without_a_viewport(self):
+        index = AOIIndex(BOXES)
+        self.assertEqual(index.to_viewport(1440, 615, "screen"), (1440, 615))
+        self.assertEqual(index.to_viewport(0.5, 0.5, "normalised"), (960, 540))
@@ -0,0 +1,77 @@
+import math
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from django.test import TestCase
+from users.models import UserAccount
+from eye_tracking.archive import archive_session, iter_unpacked, pack, raw_columns, session_columns, unpack
+from eye_tracking.models import EyeTrackingSession, GazeArchive, GazeData
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def gaze_rows(session, count, start=START):
+    return GazeData.objects.bulk_create(
+        GazeData(
+            session=session, timestamp=start + timedelta(microseconds=16667 * i),
+            gaze_x=100.5 + i, gaze_y=200.25 - i, pupil_diameter=None if i % 5 == 0 else 3.0 + i / 100,
+        )
+        for i in range(count)
+    )
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = UserAccount.objects.create_user(email="archivist@example.com", password="x")
+        cls.session = EyeTrackingSession.objects.create(user=user, session_id="archive-1")
+        gaze_rows(cls.session, 1000)
+
+    def assertSameColumns(self, actual, expected):
+        self.assertEqual(actual.id.tolist(), expected.id.tolist())
+        np.testing.assert_allclose(actual.t, expected.t, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(actual.x, expected.x, rtol=1e-6)
+        np.testing.assert_allclose(actual.y, expected.y, rtol=1e-6)
+        np.testing.assert_allclose(actual.pupil, expected.pupil, rtol=1e-6)
+
+    def test_pack_round_trip(self):
+        columns = raw_columns(self.session)
+        t0, data = pack(columns)
+        archive = GazeArchive(sample_count=columns.size, t0=t0, data=data)
+        unpacked = unpack(archive)
+        self.assertSameColumns(unpacked, columns)
+        self.assertTrue(np.isnan(unpacked.pupil[::5]).all())
+        for chunk_size in (1, 333, 5000):
+            with self.subTest(chunk_size=chunk_size):
+                chunks = list(iter_unpacked(archive, chunk_size))
+                self.assertEqual(len(chunks), math.ceil(columns.size / chunk_size))
+                self.assertSameColumns(
+                    type(columns)(*(np.concatenate(parts) for parts in zip(*chunks))), columns
+                )
+
+    def test_unknown_version_is_rejected(self):
+        t0, data = pack(raw_columns(self.session))
+        with self.assertRaises(ValueError):
+            unpack(GazeArchive(format_version=99, sample_count=1000, t0=t0, data=data))
+
+    def test_rows_written_after_archiving_are_merged(self):
+        before = raw_columns(self.session)
+        archive = archive_session(self.session, delete_raw=True)
+        self.assertEqual(archive.sample_count, before.size)
+        self.assertFalse(GazeData.objects.filter(session=self.session).exists())
+        self.assertSameColumns(session_columns(self.session), before)
+
+        # a backlog replayed after the stop, captured between archived samples
+        late = gaze_rows(self.session, 10, start=START + timedelta(microseconds=8000))
+        merged = session_columns(self.session)
+        self.assertEqual(merged.size, before.size + len(late))
+        self.assertTrue((np.diff(merged.t) >= 0).all())
+        self.assertEqual(sorted(merged.id.tolist()), sorted(before.id.tolist() + [row.id for row in late]))
+
+        rearchived = archive_session(self.session, delete_raw=True)
+        self.assertEqual(rearchived.pk, archive.pk)
+        self.assertEqual(rearchived.sample_count, merged.size)
+        self.assertSameColumns(session_columns(self.session), merged)
+
+    def test_empty_session_is_not_archived(self):
+        empty = EyeTrackingSession.objects.create(user=self.session.user, session_id="archive-empty")
+        self.assertIsNone(archive_session(empty))
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import AccessToken
+from biasbracker_server.asgi import application
+from users.models import UserAccount
+from eye_tracking import consumers
+from eye_tracking.models import EyeTrackingSession, Fixation, GazeArchive, GazeData
+from eye_tracking.protocol import encode_frame
+from eye_tracking.scheduler import ticker, writer_pool
+
+
+async def next_message(communicator, timeout=2.0):
+    """The next JSON message sent to ``communicator``, or None on timeout.
+
+    Reads the output queue directly: a receive timeout on the communicator
+    would cancel the consumer.
+    """
+    try:
+        message = await asyncio.wait_for(communicator.output_queue.get(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    return json.loads(message["text"]) if "text" in message else message
+
+
+def reading_samples(count, t0=1000.0, rate=60.0):
+    """Gaze sweeping along a line of text at reading speed."""
+    return [[t0 + i / rate, 400.0 + (i % 30) * 20.0, 500.0 + (i // 30) * 30.0, 3.0] for i in range(count)]
+
+
+def fixating_samples(points, t0=1000.0, rate=60.0, per_point=30):
+    """Gaze resting on each point for ``per_point`` samples, with no pupil."""
+    return [
+        (t0 + (k * per_point + i) / rate, x + i % 3, y - i % 2, None)
+        for k, (x, y) in enumerate(points) for i in range(per_point)
+    ]
+
+
+class ConsumerTestCase(TransactionTestCase):
+    session_id = "consumer-1"
+
+    def setUp(self):
+        user = UserAccount.objects.create_user(email="collector@example.com", password="x")
+        self.session = EyeTrackingSession.objects.create(user=user, session_id=self.session_id)
+
+    @asynccontextmanager
+    async def connected(self, path):
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        try:
+            yield communicator
+        finally:
+            await communicator.disconnect()
+
+    def collector(self):
+        return self.connected(f"/ws/gaze-collector/{self.session_id}/")
+
+    def viewer(self):
+        return self.connected(f"/ws/eye-tracking/{self.session_id}/")
+
+    async def send_batch(self, collector, samples):
+        await collector.send_json_to({
+            "type": "eye.data.batch",
+            "payload": {"session_id": self.session_id, "source": "test", "samples": samples},
+        })
+
+    @database_sync_to_async
+    def stored_samples(self):
+        return GazeData.objects.filter(session=self.session).count()
+
+    @database_sync_to_async
+    def stored_times(self):
+        return [
+            timestamp.timestamp()
+            for timestamp in GazeData.objects.filter(session=self.session).values_list("timestamp", flat=True)
+        ]
+
+    async def stored_after_sync(self, collector, seq=1):
+        await collector.send_json_to({"type": "sync", "seq": seq})
+        self.assertEqual(await next_message(collector), {"type": "ack", "seq": seq})
+        return await self.stored_times()
+
+
+class AttentionTests(ConsumerTestCase):
+    @mock.patch.object(ticker, "attention_interval", 0.1)
+    @mock.patch.object(consumers, "LOST_FOCUS_THRESHOLD", 0.5)
+    async def test_score_decays_and_alerts_while_no_samples_arrive(self):
+        async with self.viewer() as viewer, self.collector() as collector:
+            await self.send_batch(collector, reading_samples(60))
+
+            # The tracker lost the eyes and sends nothing from here on.
+            scores = []
+            alerted = False
+            while not alerted:
+                message = await next_message(viewer)
+                self.assertIsNotNone(message, f"no attention message or alert after scores {scores}")
+                if message["type"] == "eye.attention":
+                    scores.append(message["payload"]["score"])
+                alerted = message["type"] == "eye.alert"
+        self.assertGreater(len(scores), 3)
+        self.assertGreater(scores[0], consumers.ATTENTION_THRESHOLD)
+        self.assertLess(scores[-1], consumers.ATTENTION_THRESHOLD)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class BroadcastTests(ConsumerTestCase):
+    async def test_viewers_only_get_their_own_session(self):
+        other = await database_sync_to_async(EyeTrackingSession.objects.create)(
+            user=self.session.user, session_id="consumer-2"
+        )
+        async with self.viewer() as viewer, \
+                self.connected(f"/ws/eye-tracking/{other.session_id}/") as other_viewer, \
+                self.collector() as collector:
+            samples = reading_samples(10)
+            await self.send_batch(collector, samples)
+            message = await next_message(viewer)
+            self.assertEqual(message["type"], "eye.data")
+            # the ticker sends the latest sample, not every one
+            self.assertEqual(message["payload"]["session_id"], self.session_id)
+            self.assertEqual(
+                [message["payload"]["gaze_x"], message["payload"]["gaze_y"]], samples[-1][1:3]
+            )
+            self.assertIsNone(await next_message(other_viewer, timeout=0.5))
+
+    async def test_viewers_relay_alerts_to_each_other(self):
+        async with self.viewer() as viewer, self.viewer() as other_viewer:
+            await viewer.send_json_to({"type": "eye.alert", "message": "Look here"})
+            for communicator in (viewer, other_viewer):
+                self.assertEqual(await next_message(communicator), {"type": "eye.alert", "message": "Look here"})
+
+
+@override_settings(GAZE_SAVE_INTERVAL=0)
+class PersistenceTests(ConsumerTestCase):
+    async def test_binary_frames_and_their_fixations_are_stored(self):
+        samples = fixating_samples([(500.0, 400.0), (900.0, 420.0), (300.0, 700.0)])
+        async with self.collector() as collector:
+            await collector.send_json_to({"type": "clock.sync", "t": samples[-1][0]})
+            for i in range(0, len(samples), 6):
+                await collector.send_to(bytes_data=encode_frame(self.session_id, "tobii", samples[i:i + 6]))
+            stored = await self.stored_after_sync(collector)
+        self.assertEqual(len(stored), len(samples))
+        # the last fixation is closed and written on disconnect
+        fixations = await database_sync_to_async(list)(
+            Fixation.objects.filter(session=self.session).order_by("start_time").values_list("x", "y")
+        )
+        self.assertEqual(len(fixations), 3)
+        for (x, y), (fx, fy) in zip(fixations, [(501.0, 399.5), (901.0, 419.5), (301.0, 699.5)]):
+            self.assertAlmostEqual(x, fx, delta=1)
+            self.assertAlmostEqual(y, fy, delta=1)
+
+
+@override_settings(GAZE_SAVE_INTERVAL=0)
+class AcknowledgementTests(ConsumerTestCase):
+    async def test_ack_is_sent_once_samples_are_stored(self):
+        async with self.collector() as collector:
+            await self.send_batch(collector, reading_samples(30))
+            await collector.send_json_to({"type": "sync", "seq": 1})
+            self.assertEqual(await next_message(collector), {"type": "ack", "seq": 1})
+            self.assertEqual(await self.stored_samples(), 30)
+
+    async def test_backlog_replayed_after_the_session_ended_is_stored(self):
+        ended = time.time()
+        self.session.end_time = now()
+        await database_sync_to_async(self.session.save)()
+        async with self.collector() as collector:
+            await collector.send_json_to({"type": "clock.sync", "t": time.time()})
+            # captured just before the stop, then a second after it
+            await self.send_batch(collector, reading_samples(60, t0=ended - 1.5))
+            await self.send_batch(collector, reading_samples(60, t0=ended + 1.0))
+            await collector.send_json_to({"type": "sync", "seq": 7})
+            self.assertEqual(await next_message(collector), {"type": "ack", "seq": 7})
+        self.assertEqual(await self.stored_samples(), 60)
+
+
+class ClockTests(ConsumerTestCase):
+    @override_settings(GAZE_SAVE_INTERVAL=0)
+    async def test_future_dated_sample_neither_shifts_the_clock_nor_is_stored(self):
+        async with self.collector() as collector:
+            probed = time.time()
+            await collector.send_json_to({"type": "clock.sync", "t": 100.0})
+            # a spooled sample from another clock, then ten seconds of backlog
+            await self.send_batch(collector, [[5000.0, 1.0, 1.0, 3.0]] + reading_samples(600, t0=90.0))
+            stored = await self.stored_after_sync(collector)
+        self.assertEqual(len(stored), 600)
+        self.assertAlmostEqual(min(stored), probed - 10.0, delta=0.5)
+        self.assertAlmostEqual(max(stored), probed, delta=0.5)
+
+    @override_settings(GAZE_SAVE_INTERVAL=0)
+    async def test_non_finite_and_absurd_values_are_rejected(self):
+        async with self.collector() as collector:
+            for t in (math.inf, math.nan, "nan", 10 ** 400):
+                await collector.send_json_to({"type": "clock.sync", "t": t})
+            await collector.send_json_to({"type": "clock.sync", "t": 1000.0})
+            await collector.send_json_to({
+                "type": "eye.data",
+                "payload": {"session_id": self.session_id, "gaze_x": 1.0, "gaze_y": 1.0, "t": math.nan},
+            })
+            await collector.send_json_to({
+                "type": "eye.data",
+                "payload": {"session_id": self.session_id, "gaze_x": 10 ** 400, "gaze_y": 1.0, "t": 999.0},
+            })
+            await self.send_batch(collector, [
+                [math.inf, 1.0, 1.0, 3.0], [1e300, 1.0, 1.0, 3.0], [999.0, math.nan, 1.0, 3.0],
+            ])
+            await collector.send_to(bytes_data=encode_frame(self.session_id, "test", [(math.inf, 1.0, 1.0, 3.0)]))
+            await self.send_batch(collector, reading_samples(10, t0=999.0))
+            stored = await self.stored_after_sync(collector)
+        self.assertEqual(len(stored), 10)
+        # the connection's share of the writers and ticker was released
+        self.assertEqual(writer_pool.users, 0)
+        self.assertEqual(ticker.users, 0)
+
+    async def test_replay_from_an_earlier_time_is_not_throttled_away(self):
+        async with self.collector() as collector:
+            await collector.send_json_to({"type": "clock.sync", "t": 1000.0})
+            await self.send_batch(collector, reading_samples(60, t0=998.0))
+            # a backlog captured before the live samples above
+            await self.send_batch(collector, reading_samples(60, t0=990.0))
+            stored = await self.stored_after_sync(collector)
+        live = [t for t in stored if t > max(stored) - 1.5]
+        self.assertGreaterEqual(len(live), 9)
+        self.assertGreaterEqual(len(stored) - len(live), 9)
+
+
+@override_settings(GAZE_SAVE_INTERVAL=0)
+class SessionLifecycleTests(ConsumerTestCase):
+    async def post(self, path):
+        token = AccessToken.for_user(self.session.user)
+        response = await AsyncClient().post(f"/api/eye-track/{path}", headers={"authorization": f"Bearer {token}"})
+        self.assertLess(response.status_code, 300)
+        return response
+
+    async def send_legacy_batch(self, collector, samples):
+        await collector.send_json_to({"type": "eye.data.batch", "payload": {"source": "test", "samples": samples}})
+
+    async def test_legacy_samples_follow_the_session_started_after_a_stop(self):
+        async with self.connected("/ws/gaze-collector/") as collector:
+            await collector.send_json_to({"type": "clock.sync", "t": time.time()})
+            await self.send_legacy_batch(collector, reading_samples(30, t0=time.time() - 1.0))
+            await self.stored_after_sync(collector)
+            await self.post(f"sessions/stop/{self.session_id}/")
+            # the tracker keeps sending between the stop and the next start
+            await asyncio.sleep(0.5)
+            await self.send_legacy_batch(collector, reading_samples(30, t0=time.time() - 0.5))
+            await self.stored_after_sync(collector, seq=2)
+            started = (await self.post("sessions/start/")).json()["session_id"]
+            await self.send_legacy_batch(collector, reading_samples(30, t0=time.time() - 0.5))
+            await self.stored_after_sync(collector, seq=3)
+        self.assertEqual(await self.stored_samples(), 30)
+        self.assertEqual(
+            await database_sync_to_async(GazeData.objects.filter(session__session_id=started).count)(), 30
+        )
+
+    @override_settings(GAZE_ARCHIVE_ON_STOP=True)
+    async def test_stop_archives_the_final_batch(self):
+        async with self.collector() as collector:
+            await collector.send_json_to({"type": "clock.sync", "t": time.time()})
+            await self.send_batch(collector, reading_samples(30, t0=time.time() - 1.0))
+            # still buffered in the writer when the stop arrives
+            await self.post(f"sessions/stop/{self.session_id}/")
+            archive = None
+            for _ in range(20):
+                await asyncio.sleep(0.1)
+                archive = await database_sync_to_async(GazeArchive.objects.filter(session=self.session).first)()
+                if archive is not None:
+                    break
+        self.assertIsNotNone(archive)
+        self.assertEqual(archive.sample_count, 30)
+
+    async def test_failed_connect_takes_no_share_of_the_writers(self):
+        with mock.patch.object(consumers, "load_session_index", side_effect=RuntimeError("database down")):
+            communicator = WebsocketCommunicator(application, f"/ws/gaze-collector/{self.session_id}/")
+            await communicator.connect()
+            with self.assertRaises(RuntimeError):
+                await communicator.wait()
+        self.assertEqual(writer_pool.users, 0)
+        self.assertEqual(ticker.users, 0)
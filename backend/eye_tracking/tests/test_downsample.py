@@ -0,0 +1,33 @@
+import numpy as np
+from django.test import SimpleTestCase
+from eye_tracking.downsample import DOWNSAMPLERS, minmax
+
+
+def gaze_series(count=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(count) / 60.0
+    x = np.cumsum(rng.normal(0, 5, count))
+    y = np.cumsum(rng.normal(0, 5, count))
+    return t, (x, y)
+
+
+class DownsampleTests(SimpleTestCase):
+    def test_never_more_than_max_points(self):
+        t, series = gaze_series()
+        for name, downsample in DOWNSAMPLERS.items():
+            # minmax keeps 4 samples per bucket for two series, plus first and last
+            for max_points in (1, 2, 3, 5, 6, 9, 10, 500, 999, 1000, 2000):
+                with self.subTest(method=name, max_points=max_points):
+                    keep = downsample(t, series, max_points)
+                    self.assertLessEqual(len(keep), max_points)
+                    self.assertEqual(keep.tolist(), sorted(set(keep.tolist())))
+                    self.assertEqual(keep[0], 0)
+                    if max_points >= 2:
+                        self.assertEqual(keep[-1], len(t) - 1)
+
+    def test_minmax_keeps_every_extreme(self):
+        t, (x, y) = gaze_series()
+        keep = minmax(t, (x, y), 100)
+        for values in (x, y):
+            self.assertIn(int(np.argmin(values)), keep)
+            self.assertIn(int(np.argmax(values)), keep)
@@ -0,0 +1,110 @@
+import numpy as np
+from django.test import SimpleTestCase
+from eye_tracking.events import (
+    MAX_GAP, Fixation, IDTDetector, IVTDetector, Saccade, detect_idt, detect_ivt,
+)
+
+RATE = 60.0
+# (x, y) of each fixation; consecutive targets are hundreds of pixels apart
+TARGETS = [(200.0, 300.0), (700.0, 320.0), (1200.0, 800.0), (400.0, 900.0)]
+
+
+def scan_path(fixation_time=0.3, saccade_samples=3, gap_before=None, seed=0):
+    """Samples fixating each target with a few pixels of jitter, joined by saccades.
+
+    ``gap_before`` is the index of a target preceded by a tracking gap instead
+    of a saccade.
+    """
+    rng = np.random.default_rng(seed)
+    t, x, y = [], [], []
+    now = 0.0
+    for k, (tx, ty) in enumerate(TARGETS):
+        if k:
+            if k == gap_before:
+                now += MAX_GAP * 2
+            else:
+                px, py = TARGETS[k - 1]
+                for step in range(1, saccade_samples + 1):
+                    now += 1 / RATE
+                    share = step / (saccade_samples + 1)
+                    t.append(now)
+                    x.append(px + (tx - px) * share)
+                    y.append(py + (ty - py) * share)
+        for _ in range(int(fixation_time * RATE)):
+            now += 1 / RATE
+            t.append(now)
+            x.append(tx + rng.uniform(-4, 4))
+            y.append(ty + rng.uniform(-4, 4))
+    pupil = np.full(len(t), 3.0)
+    return np.array(t), np.array(x), np.array(y), pupil
+
+
+def stream(detector, t, x, y, pupil):
+    events = []
+    for sample in zip(t, x, y, pupil):
+        events.extend(detector.update(*sample))
+    events.extend(detector.flush())
+    return events
+
+
+class DetectorTests(SimpleTestCase):
+    def assertFindsTargets(self, centers):
+        self.assertEqual(len(centers), len(TARGETS))
+        for (x, y), (tx, ty) in zip(centers, TARGETS):
+            self.assertAlmostEqual(x, tx, delta=3)
+            self.assertAlmostEqual(y, ty, delta=3)
+
+    def test_streaming_detectors_find_each_fixation_and_the_saccades_between(self):
+        for detector in (IDTDetector(), IVTDetector()):
+            with self.subTest(detector=type(detector).__name__):
+                events = stream(detector, *scan_path())
+                fixations = [event for event in events if isinstance(event, Fixation)]
+                saccades = [event for event in events if isinstance(event, Saccade)]
+                self.assertFindsTargets([(fixation.x, fixation.y) for fixation in fixations])
+                self.assertEqual(len(saccades), len(TARGETS) - 1)
+                for fixation in fixations:
+                    self.assertGreater(fixation.duration, 0.2)
+                    self.assertEqual(fixation.pupil, 3.0)
+                for saccade, (a, b) in zip(saccades, zip(TARGETS, TARGETS[1:])):
+                    self.assertAlmostEqual(saccade.amplitude, np.hypot(b[0] - a[0], b[1] - a[1]), delta=40)
+
+    def test_batch_detectors_match_the_streaming_ones(self):
+        for detector, detect in ((IDTDetector(), detect_idt), (IVTDetector(), detect_ivt)):
+            with self.subTest(detector=type(detector).__name__):
+                samples = scan_path()
+                fixations, saccades = detect(*samples)
+                events = stream(detector, *samples)
+                streamed = [event for event in events if isinstance(event, Fixation)]
+                self.assertEqual(len(fixations), len(streamed))
+                for batch, single in zip(fixations, streamed):
+                    self.assertAlmostEqual(batch["start"], single.start)
+                    self.assertAlmostEqual(batch["end"], single.end)
+                    self.assertAlmostEqual(batch["x"], single.x)
+                    self.assertAlmostEqual(batch["y"], single.y)
+                    self.assertAlmostEqual(batch["dispersion"], single.dispersion)
+                self.assertEqual(len(saccades), sum(isinstance(event, Saccade) for event in events))
+
+    def test_gap_closes_the_fixation_without_a_saccade(self):
+        samples = scan_path(gap_before=2)
+        for detector, detect in ((IDTDetector(), detect_idt), (IVTDetector(), detect_ivt)):
+            with self.subTest(detector=type(detector).__name__):
+                fixations, saccades = detect(*samples)
+                self.assertFindsTargets(fixations[["x", "y"]].tolist())
+                self.assertEqual(len(saccades), len(TARGETS) - 2)
+                events = stream(detector, *samples)
+                self.assertEqual(sum(isinstance(event, Saccade) for event in events), len(TARGETS) - 2)
+
+    def test_glances_shorter_than_the_minimum_duration_are_not_fixations(self):
+        for detector, detect in ((IDTDetector(), detect_idt), (IVTDetector(), detect_ivt)):
+            with self.subTest(detector=type(detector).__name__):
+                samples = scan_path(fixation_time=0.05)
+                fixations, _ = detect(*samples)
+                self.assertEqual(len(fixations), 0)
+                self.assertFalse(any(isinstance(event, Fixation) for event in stream(detector, *samples)))
+
+    def test_non_finite_samples_are_skipped_in_batch(self):
+        t, x, y, pupil = scan_path()
+        x[10] = np.nan
+        y[60] = np.inf
+        fixations, _ = detect_idt(t, x, y, pupil)
+        self.assertFindsTargets(fixations[["x", "y"]].tolist())
@@ -0,0 +1,71 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.test import AsyncClient, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import UserAccount
+from eye_tracking.export import EXPORT_CHUNK_SIZE, format_timestamp
+from eye_tracking.models import EyeTrackingSession, GazeData
+
+# Several chunks, with timestamps shared across chunk boundaries.
+SAMPLES = EXPORT_CHUNK_SIZE * 3 + 1000
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class ExportGazeDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserAccount.objects.create_user(email="reader@example.com", password="x")
+        UserAccount.objects.create_user(email="other@example.com", password="x")
+        cls.session = EyeTrackingSession.objects.create(user=cls.user, session_id="export-1")
+        GazeData.objects.bulk_create(
+            GazeData(
+                session=cls.session, timestamp=START + timedelta(milliseconds=i // 3),
+                gaze_x=float(i), gaze_y=float(-i), pupil_diameter=3.0,
+            )
+            for i in range(SAMPLES)
+        )
+
+    def setUp(self):
+        self.url = f"/api/eye-track/sessions/{self.session.session_id}/gaze/export/"
+
+    def export(self, user=None, **kwargs):
+        token = AccessToken.for_user(user or self.user)
+        headers = {"authorization": f"Bearer {token}", **kwargs.pop("headers", {})}
+        return AsyncClient().get(self.url, kwargs, headers=headers)
+
+    async def test_streams_chunks_as_they_are_read(self):
+        response = await self.export(format="ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        body = aiter(response.streaming_content)
+        with mock.patch("eye_tracking.export.format_timestamp", wraps=format_timestamp) as formatted:
+            self.assertEqual(formatted.call_count, 0)
+            await anext(body)  # empty NDJSON header
+            first = await anext(body)
+            # Only the chunk being sent has been read from the database.
+            self.assertEqual(formatted.call_count, EXPORT_CHUNK_SIZE)
+        self.assertEqual(len(first.splitlines()), EXPORT_CHUNK_SIZE)
+
+        lines = first.splitlines()
+        async for chunk in body:
+            lines += chunk.splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["gaze_x"] for row in rows], [float(i) for i in range(SAMPLES)])
+        self.assertEqual(len({row["id"] for row in rows}), SAMPLES)
+
+    async def test_gzip(self):
+        response = await self.export(format="csv", headers={"accept-encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(lines[0], "id,timestamp,gaze_x,gaze_y,pupil_diameter")
+        self.assertEqual(len(lines), SAMPLES + 1)
+        self.assertEqual(lines[1].split(",")[1:], ["2026-01-01T00:00:00.000000Z", "0.0", "0.0", "3.0"])
+
+    async def test_other_users_session_is_not_found(self):
+        other = await UserAccount.objects.filter(email="other@example.com").afirst()
+        response = await self.export(other)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+from django.core.cache import cache
+from django.test import TestCase
+from users.models import UserAccount
+from eye_tracking.heatmap import Grid, session_counts
+from eye_tracking.models import EyeTrackingSession, GazeData
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+GRID = Grid(cols=4, rows=2, width=1920, height=1080)
+
+
+class HeatmapCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = UserAccount.objects.create_user(email="heatmap@example.com", password="x")
+        cls.session = EyeTrackingSession.objects.create(user=user, session_id="heatmap-1")
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def sample(self, x, y, **kwargs):
+        return GazeData.objects.create(session=self.session, timestamp=START, gaze_x=x, gaze_y=y, **kwargs)
+
+    def test_new_samples_are_added_to_the_cached_counts(self):
+        self.sample(100, 100)
+        self.assertEqual(session_counts(self.session, GRID).counts.sum(), 1)
+        self.sample(1800, 1000)
+        entry = session_counts(self.session, GRID)
+        self.assertEqual(entry.samples, 2)
+        self.assertEqual((entry.counts[0, 0], entry.counts[1, 3]), (1, 1))
+
+    def test_a_row_committed_below_the_watermark_is_counted(self):
+        first = self.sample(100, 100)
+        # another worker's transaction took the next id but commits later
+        late_id = first.id + 1
+        self.sample(1800, 1000, id=late_id + 1)
+        self.assertEqual(session_counts(self.session, GRID).samples, 2)
+        self.sample(1000, 100, id=late_id)
+        entry = session_counts(self.session, GRID)
+        self.assertEqual(entry.samples, 3)
+        self.assertEqual(entry.counts[0, 2], 1)
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from users.models import UserAccount
+from eye_tracking.archive import raw_columns
+from eye_tracking.models import EyeTrackingSession, GazeData
+from eye_tracking.pagination import InvalidCursor, columns_page, decode_cursor, encode_cursor, queryset_page
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+SAMPLES = 50
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = UserAccount.objects.create_user(email="pager@example.com", password="x")
+        cls.session = EyeTrackingSession.objects.create(user=user, session_id="pages-1")
+        # pairs of samples share a timestamp, so pages must break ties by id
+        GazeData.objects.bulk_create(
+            GazeData(session=cls.session, timestamp=START + timedelta(milliseconds=i // 2), gaze_x=i, gaze_y=i)
+            for i in range(SAMPLES)
+        )
+        cls.newest_first = list(
+            GazeData.objects.filter(session=cls.session).order_by("-timestamp", "-id").values_list("id", flat=True)
+        )
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(1767225600000123, 42)), (1767225600000123, 42))
+        for cursor in ("", "not a cursor", encode_cursor(1, 2)[:-2] + "!!"):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_queryset_pages_cover_every_row_once(self):
+        queryset = GazeData.objects.filter(session=self.session)
+        for limit in (1, 7, SAMPLES, SAMPLES + 1):
+            with self.subTest(limit=limit):
+                ids, cursor = [], None
+                while True:
+                    rows, next_cursor = queryset_page(queryset, cursor and decode_cursor(cursor), limit)
+                    self.assertLessEqual(len(rows), limit)
+                    ids.extend(row.id for row in rows)
+                    if next_cursor is None:
+                        break
+                    cursor = next_cursor
+                self.assertEqual(ids, self.newest_first)
+
+    def test_pages_do_not_shift_when_samples_are_appended(self):
+        queryset = GazeData.objects.filter(session=self.session)
+        first, cursor = queryset_page(queryset, None, 10)
+        GazeData.objects.create(session=self.session, timestamp=START + timedelta(seconds=1), gaze_x=0, gaze_y=0)
+        second, _ = queryset_page(queryset, decode_cursor(cursor), 10)
+        self.assertEqual([row.id for row in first + second], self.newest_first[:20])
+
+    def test_columns_pages_match_queryset_pages(self):
+        columns = raw_columns(self.session)
+        queryset = GazeData.objects.filter(session=self.session)
+        cursor = None
+        while True:
+            decoded = cursor and decode_cursor(cursor)
+            page, cursor = columns_page(columns, decoded, 7)
+            rows, row_cursor = queryset_page(queryset, decoded, 7)
+            self.assertEqual(page.id.tolist(), [row.id for row in rows])
+            self.assertEqual(cursor, row_cursor)
+            if cursor is None:
+                break
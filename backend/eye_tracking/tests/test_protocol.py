@@ -0,0 +1,70 @@
+import importlib.util
+import math
+from django.conf import settings
+from django.test import SimpleTestCase
+from eye_tracking.protocol import COORDINATE_SPACES, RECORD_FIELDS, SPACE_MASK, FrameError, decode_frame, encode_frame
+
+COMPANION_ENCODER = settings.BASE_DIR.parent / "tobii_client" / "gaze_frame.py"
+
+SAMPLES = [
+    (1000.0, 960.0, 540.0, 3.25),
+    (1000.0083, 961.5, 538.0, None),
+    (1000.0167, 1919.0, 0.0, 4.0),
+]
+
+
+def load_companion_encoder():
+    spec = importlib.util.spec_from_file_location("gaze_frame", COMPANION_ENCODER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.encode_frame
+
+
+class FrameRoundTripTests(SimpleTestCase):
+    def encoders(self):
+        yield "server", encode_frame
+        if COMPANION_ENCODER.exists():
+            yield "companion", load_companion_encoder()
+
+    def test_round_trip(self):
+        for name, encode in self.encoders():
+            for double in (False, True):
+                with self.subTest(encoder=name, double=double):
+                    session_id, source, space, t0, records = decode_frame(
+                        encode("sessión-1", "tobii", SAMPLES, double=double)
+                    )
+                    self.assertEqual((session_id, source, space, t0), ("sessión-1", "tobii", "screen", 1000.0))
+                    self.assertEqual(len(records), len(SAMPLES) * RECORD_FIELDS)
+                    for i, (t, x, y, pupil) in enumerate(SAMPLES):
+                        dt, rx, ry, rpupil = records[i * RECORD_FIELDS:(i + 1) * RECORD_FIELDS]
+                        self.assertAlmostEqual(t0 + dt, t, places=5)
+                        self.assertEqual((rx, ry), (x, y))
+                        if pupil is None:
+                            self.assertTrue(math.isnan(rpupil))
+                        else:
+                            self.assertEqual(rpupil, pupil)
+
+    def test_coordinate_space_round_trip(self):
+        for name, encode in self.encoders():
+            for space in COORDINATE_SPACES:
+                with self.subTest(encoder=name, space=space):
+                    self.assertEqual(decode_frame(encode("s", "webcam", SAMPLES, space=space))[2], space)
+
+    def test_encoders_agree(self):
+        if not COMPANION_ENCODER.exists():
+            self.skipTest("tobii_client is not checked out next to the backend")
+        companion = load_companion_encoder()
+        for samples in (SAMPLES, []):
+            for double in (False, True):
+                for space in COORDINATE_SPACES:
+                    self.assertEqual(
+                        encode_frame("s", "tobii", samples, double=double, space=space),
+                        companion("s", "tobii", samples, double=double, space=space),
+                    )
+
+    def test_rejects_malformed_frames(self):
+        frame = encode_frame("s", "tobii", SAMPLES)
+        unknown_space = frame[:3] + bytes([frame[3] | SPACE_MASK]) + frame[4:]
+        for data in (frame[:5], b"XX" + frame[2:], frame[:-1], frame + b"\0", unknown_space):
+            with self.assertRaises(FrameError):
+                decode_frame(data)
@@ -0,0 +1,107 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.test import SimpleTestCase
+
+COMPANION_SPOOL = settings.BASE_DIR.parent / "tobii_client" / "spool.py"
+
+
+def load_companion_spool():
+    spec = importlib.util.spec_from_file_location("spool", COMPANION_SPOOL)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def record(i):
+    return f"record {i:04d} ".encode() + b"." * 40
+
+
+class SpoolTests(SimpleTestCase):
+    # small segments, so a few dozen records span several
+    segment_size = 512
+
+    def setUp(self):
+        if not COMPANION_SPOOL.exists():
+            self.skipTest("tobii_client is not checked out next to the backend")
+        self.spool_module = load_companion_spool()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open(self):
+        spool = self.spool_module.Spool(self.directory, segment_size=self.segment_size)
+        self.addCleanup(spool.close)
+        return spool
+
+    def drain(self, spool):
+        records = []
+        while (item := spool.peek()) is not None:
+            records.append(item[0])
+        return records
+
+    def test_uncommitted_records_survive_a_crash(self):
+        spool = self.open()
+        for i in range(30):
+            spool.append(record(i), text=i % 2 == 0)
+        spool.sync()
+        for _ in range(12):
+            spool.peek()
+        spool.commit()
+        spool.peek()
+        # the process dies here: nothing is closed and one record is peeked, not committed
+
+        recovered = self.open()
+        self.assertEqual(self.drain(recovered), [record(i) for i in range(12, 30)])
+        recovered.rewind()
+        self.assertEqual(recovered.peek(), (record(12), True))
+        record_header = self.spool_module.RECORD_HEADER.size
+        self.assertEqual(recovered.pending, sum(record_header + len(record(i)) for i in range(12, 30)))
+
+    def test_torn_record_ends_the_segment(self):
+        spool = self.open()
+        for i in range(5):
+            spool.append(record(i))
+        spool.sync()
+        spool.close()
+        segment = os.path.join(self.directory, sorted(os.listdir(self.directory))[0])
+        record_header = self.spool_module.RECORD_HEADER.size
+        with open(segment, "r+b") as f:
+            # corrupt the last record's payload, as if the crash cut it short
+            f.seek(self.spool_module.SEGMENT_HEADER.size + 4 * (record_header + len(record(0))) + record_header)
+            f.write(b"\xff")
+        self.assertEqual(self.drain(self.open()), [record(i) for i in range(4)])
+
+    def test_commit_up_to_a_position(self):
+        spool = self.open()
+        for i in range(30):
+            spool.append(record(i))
+        positions = {}
+        for i in range(20):
+            spool.peek()
+            positions[i] = spool.position()
+        spool.commit(positions[14])
+        # an older position arriving late changes nothing
+        spool.commit(positions[3])
+        spool.rewind()
+        self.assertEqual(spool.peek()[0], record(15))
+        spool.close()
+        self.assertEqual(self.drain(self.open()), [record(i) for i in range(15, 30)])
+
+    def test_committed_segments_are_deleted(self):
+        spool = self.open()
+        for i in range(30):
+            spool.append(record(i))
+        self.assertGreater(len(os.listdir(self.directory)), 3)
+        self.drain(spool)
+        spool.commit()
+        self.assertEqual(spool.pending, 0)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_header_less_segments_are_ignored(self):
+        # created by a process that died before writing anything
+        open(os.path.join(self.directory, "segment-00000007.spool"), "wb").close()
+        spool = self.open()
+        spool.append(record(0))
+        self.assertEqual(self.drain(spool), [record(0)])
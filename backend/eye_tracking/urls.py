@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     StartEyeTrackingSession, StopEyeTrackingSession,
-    GetEyeTrackingSessions, GetGazeData
+    GetEyeTrackingSessions, GetGazeData, ExportGazeData, GetGazeHeatmap, AreasOfInterest, IngestMetrics
 )
 
 urlpatterns = [
@@ -9,4 +9,8 @@ urlpatterns = [
     path('sessions/stop/<str:session_id>/', StopEyeTrackingSession.as_view(), name='stop_eye_tracking'),
     path('sessions/', GetEyeTrackingSessions.as_view(), name='get_eye_tracking_sessions'),
     path('sessions/<str:session_id>/gaze/', GetGazeData.as_view(), name='get_gaze_data'),
+    path('sessions/<str:session_id>/gaze/export/', ExportGazeData.as_view(), name='export_gaze_data'),
+    path('sessions/<str:session_id>/heatmap/', GetGazeHeatmap.as_view(), name='get_gaze_heatmap'),
+    path('sessions/<str:session_id>/aois/', AreasOfInterest.as_view(), name='areas_of_interest'),
+    path('metrics/', IngestMetrics.as_view(), name='ingest_metrics'),
 ]
@@ -1,11 +1,47 @@
+import re
+from gzip import GzipFile
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.text import StreamingBuffer
 from django.utils.timezone import now
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
-from .models import EyeTrackingSession, GazeData
-from .serializers import EyeTrackingSessionSerializer, GazeDataSerializer
+from . import metrics
+from .archive import COLUMN_FIELDS, rows_to_columns, session_columns
+from .consumers import collector_group
+from .downsample import DOWNSAMPLERS
+from .export import EXPORT_FIELDS, VALUE_DECIMALS, aiter_sample_chunks, column_rows, iter_samples
+from .heatmap import Grid, gaussian_blur, session_counts
+from .models import AreaOfInterest, EyeTrackingSession, GazeArchive, GazeData
+from .pagination import MAX_PAGE_SIZE, columns_page, decode_cursor, queryset_page
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import (
+    AreaOfInterestSerializer, AreaRegistrationSerializer, EyeTrackingSessionSerializer, GazeDataSerializer
+)
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+MAX_HEATMAP_BINS = 512
+MAX_HEATMAP_SIGMA = 32
+
+
+async def acompress_sequence(sequence):
+    """Async ``django.utils.text.compress_sequence``: gzip an async iterator of
+    byte strings, yielding output as it is produced."""
+    buf = StreamingBuffer()
+    with GzipFile(mode="wb", compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        async for item in sequence:
+            zfile.write(item)
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
 
 class StartEyeTrackingSession(APIView):
     permission_classes = [IsAuthenticated]
@@ -15,6 +51,10 @@ class StartEyeTrackingSession(APIView):
         session = EyeTrackingSession.objects.create(
             user=user, session_id=f"session_{int(now().timestamp())}"
         )
+        # Legacy collectors attach to the newest open session; let them retry.
+        async_to_sync(get_channel_layer().group_send)(
+            collector_group(None), {"type": "session.started", "session_id": session.session_id}
+        )
         return Response(EyeTrackingSessionSerializer(session).data, status=status.HTTP_201_CREATED)
 
 class StopEyeTrackingSession(APIView):
@@ -24,6 +64,11 @@ class StopEyeTrackingSession(APIView):
         session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
         session.end_time = now()
         session.save()
+        # Let connected collectors flush and drop their cached session mapping;
+        # legacy ones may have been feeding this session too.
+        ended = {"type": "session.ended", "session_id": session.session_id, "session_pk": session.pk}
+        for group in (collector_group(session.session_id), collector_group(None)):
+            async_to_sync(get_channel_layer().group_send)(group, ended)
         return Response({"message": "Session ended successfully"}, status=status.HTTP_200_OK)
 
 class GetEyeTrackingSessions(APIView):
@@ -35,10 +80,241 @@ class GetEyeTrackingSessions(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class GetGazeData(APIView):
+    """A session's gaze samples, newest first.
+
+    Without parameters every sample is returned as a list. ``?limit=N`` pages
+    with a keyset cursor (pass the returned ``next`` as ``?cursor=``), and
+    ``?max_points=N`` returns the whole session downsampled to at most N
+    samples (``&downsample=lttb|minmax``, default LTTB).
+
+    ``?layout=columnar`` replaces the per-sample dicts with parallel ``t``,
+    ``x``, ``y`` and ``pupil`` arrays, ``t`` in milliseconds since the
+    session started.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, session_id):
         session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
+        params = request.query_params
+        layout = params.get("layout", "rows")
+        if layout not in ("rows", "columnar"):
+            return Response({"error": "layout must be rows or columnar"}, status=status.HTTP_400_BAD_REQUEST)
+        columnar = layout == "columnar"
+        try:
+            if "max_points" in params:
+                return self.downsampled(
+                    session, positive_int(params, "max_points"), params.get("downsample", "lttb"), columnar
+                )
+            if "limit" in params or "cursor" in params:
+                cursor = decode_cursor(params["cursor"]) if params.get("cursor") else None
+                limit = min(positive_int(params, "limit", MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+                return self.page(session, cursor, limit, columnar)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if columnar:
+            columns = session_columns(session)
+            return Response(columnar_series(session, columns.take(slice(None, None, -1))), status=status.HTTP_200_OK)
+        if GazeArchive.objects.filter(session=session).exists():
+            return Response(archived_gaze_rows(session), status=status.HTTP_200_OK)
         gaze_data = GazeData.objects.filter(session=session).order_by('-timestamp')
         serializer = GazeDataSerializer(gaze_data, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def page(self, session, cursor, limit, columnar):
+        if GazeArchive.objects.filter(session=session).exists():
+            columns, next_cursor = columns_page(session_columns(session), cursor, limit)
+            body = columnar_series(session, columns) if columnar else {"results": column_dicts(session, columns)}
+        elif columnar:
+            rows = GazeData.objects.filter(session=session).values_list(*COLUMN_FIELDS, named=True)
+            rows, next_cursor = queryset_page(rows, cursor, limit)
+            body = columnar_series(session, rows_to_columns(rows))
+        else:
+            rows, next_cursor = queryset_page(GazeData.objects.filter(session=session), cursor, limit)
+            body = {"results": GazeDataSerializer(rows, many=True).data}
+        return Response({**body, "next": next_cursor}, status=status.HTTP_200_OK)
+
+    def downsampled(self, session, max_points, method, columnar):
+        downsample = DOWNSAMPLERS.get(method)
+        if downsample is None:
+            raise ValueError(f"downsample must be one of: {', '.join(DOWNSAMPLERS)}")
+        columns = session_columns(session)
+        total = columns.size
+        if total:
+            columns = columns.take(downsample(columns.t, (columns.x, columns.y), max_points)[::-1])
+        body = columnar_series(session, columns) if columnar else {"results": column_dicts(session, columns)}
+        return Response({**body, "total": total, "downsample": method}, status=status.HTTP_200_OK)
+
+
+class GetGazeHeatmap(APIView):
+    """A session's gaze binned into a ``cols x rows`` grid over a
+    ``width x height`` pixel area, optionally Gaussian-blurred by ``sigma``
+    cells. Counts are cached per session and grid (see ``heatmap``)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
+        params = request.query_params
+        try:
+            grid = Grid(
+                min(positive_int(params, "cols", 64), MAX_HEATMAP_BINS),
+                min(positive_int(params, "rows", 36), MAX_HEATMAP_BINS),
+                positive_float(params, "width", 1920.0),
+                positive_float(params, "height", 1080.0),
+            )
+            sigma = float(params.get("sigma", 0))
+            if not 0 <= sigma <= MAX_HEATMAP_SIGMA:
+                raise ValueError(f"sigma must be between 0 and {MAX_HEATMAP_SIGMA}")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        entry = session_counts(session, grid)
+        cells = gaussian_blur(entry.counts, sigma)
+        return Response({
+            "session_id": session.session_id,
+            "cols": grid.cols,
+            "rows": grid.rows,
+            "width": grid.width,
+            "height": grid.height,
+            "sigma": sigma,
+            "samples": entry.samples,
+            "max": round(float(cells.max()), VALUE_DECIMALS) if cells.size else 0,
+            "cells": np.round(cells, VALUE_DECIMALS).tolist(),
+        }, status=status.HTTP_200_OK)
+
+
+class AreasOfInterest(APIView):
+    """The article sections on screen during a session and their dwell time.
+
+    POST registers the current boxes (``{"viewport": {"width", "height"},
+    "areas": [{"key", "label", "left", "top", "right", "bottom"}]}``, viewport
+    pixels); areas are matched by key, so re-registering after a scroll moves
+    the boxes and keeps the totals. Connected collectors reload their index.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
+        areas = AreaOfInterest.objects.filter(session=session).order_by("id")
+        data = AreaOfInterestSerializer(areas, many=True).data
+        total = sum(area["dwell_time"] for area in data)
+        for area in data:
+            area["dwell_share"] = round(area["dwell_time"] / total, VALUE_DECIMALS) if total else 0.0
+        return Response({
+            "session_id": session.session_id,
+            "viewport": {"width": session.viewport_width, "height": session.viewport_height},
+            "total_dwell_time": total,
+            "areas": data,
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request, session_id):
+        session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
+        if session.end_time is not None:
+            return Response({"error": "Session has ended"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = AreaRegistrationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        viewport = serializer.validated_data["viewport"]
+        areas = serializer.validated_data["areas"]
+        session.viewport_width = viewport["width"]
+        session.viewport_height = viewport["height"]
+        session.save(update_fields=["viewport_width", "viewport_height"])
+        AreaOfInterest.objects.bulk_create(
+            [AreaOfInterest(session=session, **area) for area in areas],
+            update_conflicts=True,
+            unique_fields=["session", "key"],
+            update_fields=["label", "left", "top", "right", "bottom", "updated_at"],
+        )
+        async_to_sync(get_channel_layer().group_send)(
+            collector_group(session.session_id),
+            {"type": "areas.updated", "session_id": session.session_id, "session_pk": session.pk},
+        )
+        return Response({"message": f"Registered {len(areas)} areas"}, status=status.HTTP_200_OK)
+
+
+class IngestMetrics(APIView):
+    """This worker's ingestion counters, process-wide and per live collector
+    connection (see ``eye_tracking.metrics``)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+def positive_int(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ""):
+        if default is None:
+            raise ValueError(f"{name} is required")
+        return default
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return int(value)
+
+
+def columnar_series(session, columns):
+    """Parallel arrays for ``columns``; ``t`` is whole milliseconds since the session start."""
+    start = session.start_time.timestamp()
+    pupil = np.round(np.asarray(columns.pupil, dtype=np.float64), VALUE_DECIMALS).tolist()
+    return {
+        "session_id": session.session_id,
+        "start_time": session.start_time,
+        "t": np.round((columns.t - start) * 1000).astype(np.int64).tolist(),
+        "x": np.round(np.asarray(columns.x, dtype=np.float64), VALUE_DECIMALS).tolist(),
+        "y": np.round(np.asarray(columns.y, dtype=np.float64), VALUE_DECIMALS).tolist(),
+        "pupil": [None if value != value else value for value in pupil],
+    }
+
+
+def positive_float(params, name, default):
+    try:
+        value = float(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a positive number")
+    if not value > 0 or value == float("inf"):
+        raise ValueError(f"{name} must be a positive number")
+    return value
+
+
+def column_dicts(session, columns):
+    return [dict(zip(EXPORT_FIELDS, row), session=session.pk) for row in column_rows(columns)]
+
+
+def archived_gaze_rows(session):
+    """GazeDataSerializer-shaped rows, newest first, for an archived session."""
+    rows = [dict(zip(EXPORT_FIELDS, row), session=session.pk) for row in iter_samples(session)]
+    rows.reverse()
+    return rows
+
+
+class ExportGazeData(APIView):
+    """Streams a session's samples as NDJSON or CSV (``?format=ndjson|csv``).
+
+    Rows are read and written a chunk at a time, so memory use does not
+    depend on the session length. The body is gzipped for clients that
+    accept it. The body is an async iterator: under ASGI Django would
+    collect a sync one into a list before sending the first byte.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, session_id):
+        session = get_object_or_404(EyeTrackingSession, session_id=session_id, user=request.user)
+        renderer = request.accepted_renderer
+
+        async def stream():
+            yield renderer.header(EXPORT_FIELDS)
+            async for rows in aiter_sample_chunks(session):
+                yield renderer.render_rows(EXPORT_FIELDS, rows)
+
+        content = stream()
+        gzipped = ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if gzipped:
+            content = acompress_sequence(content)
+        response = StreamingHttpResponse(content, content_type=f"{renderer.media_type}; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{session.session_id}.{renderer.format}"'
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import pickle
+import tempfile
+import time
+from collections import deque
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from . import metrics
+from .models import AreaOfInterest, EyeTrackingSession, Fixation, GazeData
+
+logger = logging.getLogger("django")
+
+# What ``add`` does once ``max_pending`` rows are buffered.
+DROP_NEWEST = "drop-newest"
+DROP_OLDEST = "drop-oldest"
+SPILL = "spill"
+POLICIES = (DROP_NEWEST, DROP_OLDEST, SPILL)
+
+
+class SpillFile:
+    """Append-only overflow file for rows that arrive while a writer is full.
+
+    Rows are pickled to an anonymous temporary file and read back oldest
+    first; the file is truncated whenever it has been drained.
+    """
+
+    def __init__(self, directory=None):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.read_offset = 0
+        self.count = 0
+
+    def append(self, session_key, row):
+        self.file.seek(0, 2)
+        pickle.dump((session_key, row), self.file)
+        self.count += 1
+
+    def take(self, limit):
+        self.file.seek(self.read_offset)
+        items = []
+        while self.count and len(items) < limit:
+            items.append(pickle.load(self.file))
+            self.count -= 1
+        self.read_offset = self.file.tell()
+        if not self.count:
+            self.file.seek(0)
+            self.file.truncate()
+            self.read_offset = 0
+        return items
+
+    def close(self):
+        self.file.close()
+
+
+class GazeBatchWriter:
+    """Buffers gaze samples per session and persists them with bulk_create.
+
+    A session's buffer is flushed as soon as it holds ``max_rows`` samples or
+    its oldest sample has waited ``max_latency`` seconds, whichever is first.
+    ``resolve_session`` is awaited once per flush to map the buffer key to an
+    ``EyeTrackingSession`` primary key (or ``None`` to discard the batch).
+
+    Rows are tuples of ``fields`` values for ``model``, starting with the
+    server time they were captured at; subclasses change the two to batch
+    other per-session rows. Rows captured after their session ended are left
+    out, so a backlog replayed late still lands in its session.
+
+    ``persisted`` waits until the rows added for a session so far are
+    written, for collectors to acknowledge what their sender may forget.
+
+    Once ``max_pending`` rows are buffered, ``policy`` decides: drop the new
+    row, drop the oldest buffered row, or spill rows to a temporary file
+    (under ``spill_dir``) to be buffered again once the writer catches up.
+    ``counters`` records what happened to every row.
+    """
+
+    model = GazeData
+    fields = ("timestamp", "gaze_x", "gaze_y", "pupil_diameter")
+    label = "gaze samples"
+
+    def __init__(self, resolve_session, max_rows=None, max_latency=None, max_pending=None,
+                 policy=None, spill_dir=None):
+        self.resolve_session = resolve_session
+        self.max_rows = max_rows or settings.GAZE_WRITER_MAX_ROWS
+        self.max_latency = max_latency or settings.GAZE_WRITER_MAX_LATENCY
+        self.max_pending = max_pending or self.max_rows * 4
+        self.policy = policy or settings.GAZE_WRITER_POLICY
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown writer policy {self.policy!r}; expected one of {', '.join(POLICIES)}.")
+        self.spill = SpillFile(spill_dir or settings.GAZE_WRITER_SPILL_DIR) if self.policy == SPILL else None
+        self.buffers = {}
+        self.first_added = {}
+        self.pending = 0
+        # session key -> future resolved once its buffered rows are written
+        self.written = {}
+        # session key -> such futures of the writes in progress
+        self.writing = {}
+        self.counters = metrics.IngestCounters(self.label)
+        metrics.writers.add(self)
+
+        # Flush statistics, reported at debug level per flush and on close.
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stop the flush loop and write out everything still buffered."""
+        self._closed = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+        await self.flush()
+        while self.spill is not None and self.spill.count:
+            self.refill()
+            await self.flush()
+        if self.spill is not None:
+            self.spill.close()
+        metrics.writers.discard(self)
+        counts = self.counters.as_dict()
+        logger.info(
+            f"{self.model.__name__} writer closed: {self.flushed_rows} rows in {self.flush_count} flushes, "
+            f"max flush {self.max_flush_ms:.1f} ms, {counts.get('dropped', 0)} dropped, "
+            f"{counts.get('spilled', 0)} spilled, high water {counts['high_water']}."
+        )
+
+    def add(self, session_key, *row):
+        """Buffer one row; returns False if it was dropped because the writer is full."""
+        if self.spill is not None and (self.spill.count or self.pending >= self.max_pending):
+            # Once spilling, keep spilling until the file drains so rows stay in order.
+            self.spill.append(session_key, row)
+            self.counters.incr("accepted")
+            self.counters.incr("spilled")
+            return True
+        if self.pending >= self.max_pending:
+            self.counters.incr("dropped")
+            if self.policy == DROP_NEWEST:
+                return False
+            self.drop_oldest()
+        self.counters.incr("accepted")
+        self.buffer(session_key, row)
+        return True
+
+    def buffer(self, session_key, row):
+        buffer = self.buffers.get(session_key)
+        if buffer is None:
+            buffer = self.buffers[session_key] = deque()
+            self.first_added[session_key] = time.monotonic()
+        buffer.append(row)
+        self.pending += 1
+        self.counters.observe_depth(self.pending)
+        if len(buffer) >= self.max_rows:
+            self._wakeup.set()
+
+    def drop_oldest(self):
+        session_key = min(self.first_added, key=self.first_added.get)
+        buffer = self.buffers[session_key]
+        buffer.popleft()
+        self.pending -= 1
+        if not buffer:
+            del self.buffers[session_key]
+            del self.first_added[session_key]
+            written = self.written.pop(session_key, None)
+            if written is not None:
+                written.set_result(True)
+
+    def refill(self):
+        """Move spilled rows back into the buffers, as many as fit."""
+        for session_key, row in self.spill.take(self.max_pending - self.pending):
+            self.buffer(session_key, row)
+
+    def metrics(self):
+        return {
+            "label": self.label,
+            **self.counters.as_dict(),
+            "policy": self.policy,
+            "pending": self.pending,
+            "spill_pending": self.spill.count if self.spill is not None else 0,
+            "flushes": self.flush_count,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+    async def run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_latency)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush(due_only=True)
+            if self.spill is not None and self.spill.count and self.pending < self.max_pending:
+                self.refill()
+
+    async def flush(self, due_only=False):
+        now = time.monotonic()
+        for session_key in list(self.buffers):
+            # Another task (e.g. a disconnecting collector) may have flushed
+            # this session while an earlier write was awaited.
+            rows = self.buffers.get(session_key)
+            if rows is None:
+                continue
+            if due_only and len(rows) < self.max_rows and \
+                    now - self.first_added[session_key] < self.max_latency:
+                continue
+            await self.flush_session(session_key)
+
+    async def flush_session(self, session_key):
+        rows = self.buffers.pop(session_key, None)
+        written = self.written.pop(session_key, None)
+        if not rows:
+            if written is not None:
+                written.set_result(True)
+            return
+        del self.first_added[session_key]
+        self.pending -= len(rows)
+        if written is None:
+            written = asyncio.get_running_loop().create_future()
+        writes = self.writing.setdefault(session_key, [])
+        writes.append(written)
+        ok = False
+        try:
+            ok = await self.write(session_key, rows)
+        finally:
+            writes.remove(written)
+            if not writes and self.writing.get(session_key) is writes:
+                del self.writing[session_key]
+            written.set_result(ok)
+
+    async def persisted(self, session_key):
+        """Wait until every row added for ``session_key`` so far is written.
+
+        Returns False if any of them failed to write. Rows dropped because
+        the writer was full, or left out because their session had ended,
+        count as handled.
+        """
+        while self.spill is not None and self.spill.count:
+            # Spilled rows may belong to the session; they are buffered again
+            # once the writer catches up.
+            await asyncio.sleep(self.max_latency)
+        waits = list(self.writing.get(session_key, ()))
+        if session_key in self.buffers:
+            written = self.written.get(session_key)
+            if written is None:
+                written = self.written[session_key] = asyncio.get_running_loop().create_future()
+            waits.append(written)
+        if waits:
+            # wait() rather than gather(): a cancelled waiter must not cancel the writes
+            await asyncio.wait(waits)
+        return all(written.result() for written in waits)
+
+    async def write(self, session_key, rows):
+        """Persist one session's rows; returns False if that failed."""
+        started = time.perf_counter()
+        try:
+            session_pk = await self.resolve_session(session_key)
+            if session_pk is None:
+                logger.warning(f"No session {session_key}; dropped {len(rows)} {self.label}.")
+                self.counters.incr("discarded", len(rows))
+                return True
+            kept = await self.bulk_create(session_pk, rows)
+        except Exception as e:
+            logger.exception(f"Error saving {self.label}: {e}")
+            self.counters.incr("failed", len(rows))
+            return False
+        self.counters.incr("persisted", kept)
+        if kept < len(rows):
+            logger.info(f"Dropped {len(rows) - kept} {self.label} captured after {session_key} ended.")
+            self.counters.incr("discarded", len(rows) - kept)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flush_count += 1
+        self.flushed_rows += len(rows)
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        logger.debug(f"Flushed {len(rows)} {self.label} for {session_key} in {elapsed_ms:.1f} ms.")
+        return True
+
+    @staticmethod
+    def before_end(session_pk, rows):
+        """The rows captured before the session ended, or all while it runs."""
+        end_time = EyeTrackingSession.objects.filter(pk=session_pk).values_list("end_time", flat=True).first()
+        if end_time is None:
+            return rows
+        return [row for row in rows if row[0] <= end_time]
+
+    @database_sync_to_async
+    def bulk_create(self, session_pk, rows):
+        """Insert the rows captured before the session ended; returns how many."""
+        rows = self.before_end(session_pk, rows)
+        fields = self.fields
+        self.model.objects.bulk_create(
+            [self.model(session_id=session_pk, **dict(zip(fields, row))) for row in rows],
+            batch_size=self.max_rows,
+        )
+        return len(rows)
+
+
+class FixationWriter(GazeBatchWriter):
+    """Batches detected fixations as ``Fixation`` rows."""
+
+    model = Fixation
+    fields = ("start_time", "end_time", "x", "y", "dispersion", "pupil_diameter")
+    label = "fixations"
+
+
+class DwellWriter(GazeBatchWriter):
+    """Adds fixation durations to ``AreaOfInterest`` totals.
+
+    Rows are ``(fixation end, area pk, seconds)``; a flush sums them per area
+    and issues one UPDATE per area rather than inserting anything.
+    """
+
+    model = AreaOfInterest
+    fields = ("time", "area", "duration")
+    label = "AOI dwell updates"
+
+    @database_sync_to_async
+    def bulk_create(self, session_pk, rows):
+        rows = self.before_end(session_pk, rows)
+        totals = {}
+        for _, area_pk, duration in rows:
+            dwell, count = totals.get(area_pk, (0.0, 0))
+            totals[area_pk] = (dwell + duration, count + 1)
+        with transaction.atomic():
+            for area_pk, (dwell, count) in totals.items():
+                AreaOfInterest.objects.filter(pk=area_pk, session_id=session_pk).update(
+                    dwell_time=F("dwell_time") + dwell, fixation_count=F("fixation_count") + count
+                )
+        return len(rows)
@@ -2,11 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import models
-from django.db.models import Sum, Avg, Max
+from django.db.models import Sum, Avg, Max, Count, F, Q
+from django.db.models.functions import Coalesce
 from .models import UserPoints
 from .utils import add_user_points
 from articles.models import Article, AlternativePerspective, Quiz
-from eye_tracking.models import EyeTrackingSession, GazeData
+from eye_tracking.models import EyeTrackingSession, Fixation, GazeArchive, GazeData
 
 class GetUserPoints(APIView):
     """Fetches the user's current points and badges"""
@@ -60,7 +61,12 @@ class UserAnalyticsSummaryView(APIView):
         # Eye tracking stats
         eye_sessions = EyeTrackingSession.objects.filter(user=user)
         total_sessions = eye_sessions.count()
-        total_gaze_points = GazeData.objects.filter(session__user=user).count()
+        # Samples are counted from archives plus any rows not yet archived
+        total_gaze_points = GazeData.objects.filter(session__user=user).filter(
+            Q(session__archive__isnull=True) | Q(id__gt=F('session__archive__last_id'))
+        ).count() + (GazeArchive.objects.filter(session__user=user).aggregate(
+            total=Sum('sample_count')
+        )['total'] or 0)
 
         # Average & Max session duration
         durations = eye_sessions.annotate(
@@ -73,11 +79,22 @@ class UserAnalyticsSummaryView(APIView):
         max_session_duration = durations.aggregate(max=Max('duration'))['max']
 
         # High density sessions (> 200 gaze points)
-        high_density_sessions = [
-            session.id for session in eye_sessions
-            if GazeData.objects.filter(session=session).count() > 200
-        ]
-        
+        high_density_sessions = eye_sessions.annotate(
+            gaze_points=Count('gazedata', filter=(
+                Q(archive__isnull=True) | Q(gazedata__id__gt=F('archive__last_id'))
+            )) + Coalesce('archive__sample_count', 0)
+        ).filter(gaze_points__gt=200).count()
+
+        # Fixation stats, from the detected fixations rather than raw samples
+        fixation_stats = Fixation.objects.filter(session__user=user).aggregate(
+            count=Count('id'),
+            avg_duration=Avg(models.ExpressionWrapper(
+                models.F('end_time') - models.F('start_time'),
+                output_field=models.DurationField()
+            )),
+        )
+        avg_fixation_duration = fixation_stats['avg_duration']
+
         # Latest article read
         latest_topic = article_qs.order_by('-created_at').first().topic if article_qs.exists() else "N/A"
 
@@ -97,6 +114,8 @@ class UserAnalyticsSummaryView(APIView):
             "average_article_length": round(average_article_length, 2),
             "most_common_bias": most_common_bias,
             "badge_count": badge_count,
-            "high_density_sessions": len(high_density_sessions),
+            "high_density_sessions": high_density_sessions,
+            "total_fixations": fixation_stats['count'],
+            "avg_fixation_duration_ms": round(avg_fixation_duration.total_seconds() * 1000) if avg_fixation_duration else 0,
             "latest_read_topic": latest_topic,
         })
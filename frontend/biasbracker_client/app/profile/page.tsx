@@ -103,6 +103,8 @@ const ProfilePage: React.FC = () => {
     most_common_bias,
     badge_count,
     high_density_sessions,
+    total_fixations,
+    avg_fixation_duration_ms,
     latest_read_topic,
   } = summaryData;
 
@@ -213,6 +215,8 @@ const ProfilePage: React.FC = () => {
           <MetricCard icon={<FaChartLine />} label="Avg Article Length" value={`${Math.round(average_article_length)} words`} hint="Average length in words of the articles you've read." />
           <MetricCard icon={<FaBrain />} label="Common Bias" value={most_common_bias} hint="Most frequent cognitive bias detected in your reading." />
           <MetricCard icon={<FaStream />} label="High-Density Sessions" value={high_density_sessions} hint="Sessions with over 200 gaze data points." />
+          <MetricCard icon={<FaEye />} label="Fixations" value={total_fixations} hint="Moments your gaze settled on one spot while reading." />
+          <MetricCard icon={<FaClock />} label="Avg Fixation (ms)" value={avg_fixation_duration_ms} hint="Average length of a fixation in milliseconds." />
           <MetricCard icon={<FaBook />} label="Latest Topic" value={latest_read_topic} hint="Topic of the most recently read article." />
         </div>
 
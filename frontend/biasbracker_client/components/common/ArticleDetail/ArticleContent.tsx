@@ -30,7 +30,7 @@ const ArticleContent: React.FC<ArticleContentProps> = ({
         <>
           {/* Header */}
           <header className="border-b pb-3 mb-4">
-            <h1 className="text-2xl md:text-3xl font-bold text-gray-900 text-center">
+            <h1 data-aoi="title" className="text-2xl md:text-3xl font-bold text-gray-900 text-center">
               {article.title || "No Title Available"}
             </h1>
             <p className="text-gray-500 text-xs text-center mt-1 flex flex-wrap justify-center items-center gap-2">
@@ -58,12 +58,17 @@ const ArticleContent: React.FC<ArticleContentProps> = ({
           </header>
           {/* Body */}
           <div className="flex-1 overflow-y-auto pr-2">
-            <p className="text-sm text-gray-700 leading-relaxed">
+            <p data-aoi="introduction" className="text-sm text-gray-700 leading-relaxed">
               {article.content?.introduction || "No introduction available."}
             </p>
             <div className="mt-4 space-y-4">
               {article.content?.sections?.map((section: any, idx: number) => (
-                <div key={idx} className="border-l-4 border-blue-500 pl-3">
+                <div
+                  key={idx}
+                  data-aoi={`section-${idx}`}
+                  data-aoi-label={section.heading}
+                  className="border-l-4 border-blue-500 pl-3"
+                >
                   <h3 className="text-md font-semibold text-gray-900">
                     {section.heading || "No Heading"}
                   </h3>
@@ -73,7 +78,7 @@ const ArticleContent: React.FC<ArticleContentProps> = ({
                 </div>
               ))}
             </div>
-            <p className="mt-4 text-gray-800 font-medium text-sm italic">
+            <p data-aoi="conclusion" className="mt-4 text-gray-800 font-medium text-sm italic">
               {article.content?.conclusion || "No conclusion available."}
             </p>
           </div>
@@ -16,6 +16,7 @@ import AlternativePerspectiveModal from "@/components/common/AlternativePerspect
 import QuizModal from "@/components/common/QuizModal";
 import EyeTrackingSocketListener from "@/components/common/EyeTrackingSocketListener";
 import WebcamGazeTracker from "./WebcamGazeTracker";
+import useAreasOfInterest from "@/components/hooks/useAreasOfInterest";
 
 import {
   useGenerateArticleMutation,
@@ -132,6 +133,9 @@ const ArticleDetail: React.FC<ArticleDetailProps> = ({
   const [stopEyeTrackingSession, { isLoading: isStoppingSession }] =
     useStopEyeTrackingSessionMutation();
 
+  // report where each article section is on screen while tracking
+  useAreasOfInterest(eyeTrackingSessionId, articleRef);
+
   // start reading countdown when article loads
   useEffect(() => {
     if (article && articleId) {
@@ -421,11 +425,12 @@ const handleGazeData = useCallback(
       </div>
 
       {/* Live Gaze Overlay */}
-      {liveGaze && <LiveGazeOverlay gaze={liveGaze} />}
+      {liveGaze && <LiveGazeOverlay gaze={liveGaze} sessionId={eyeTrackingSessionId} />}
 
       {/* Eye Tracking Source */}
       {trackingMethod === "tobii" && eyeTrackingSessionId && (
         <EyeTrackingSocketListener
+          sessionId={eyeTrackingSessionId}
           onGazeData={(data) => handleGazeData(data.gaze_x, data.gaze_y)}
         />
       )}
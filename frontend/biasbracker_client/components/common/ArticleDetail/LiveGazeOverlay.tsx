@@ -1,13 +1,22 @@
 import React, { useEffect, useRef, useState } from "react";
 import useWindowSize from "./useWindowSize";
 
+// Coordinate space the collector received the sample in
+type GazeSpace = "screen" | "viewport" | "normalised";
+
 interface Gaze {
   gaze_x: number;
   gaze_y: number;
+  space: GazeSpace;
   server_time?: number;
 }
 
-const LiveGazeOverlay: React.FC = () => {
+interface LiveGazeOverlayProps {
+  gaze?: { x: number; y: number } | null;
+  sessionId?: string | null;
+}
+
+const LiveGazeOverlay: React.FC<LiveGazeOverlayProps> = ({ sessionId }) => {
   const { width, height } = useWindowSize();
   const dotRef = useRef<HTMLDivElement>(null);
   const latestGaze = useRef<Gaze | null>(null);
@@ -33,7 +42,8 @@ const LiveGazeOverlay: React.FC = () => {
   useEffect(() => {
     const connectWebSocket = () => {
       try {
-        const wsUrl = `${process.env.NEXT_PUBLIC_HOST_WS}/ws/eye-tracking/`;
+        const path = sessionId ? `/ws/eye-tracking/${sessionId}/` : "/ws/eye-tracking/";
+        const wsUrl = `${process.env.NEXT_PUBLIC_HOST_WS}${path}`;
         
         if (socketRef.current?.readyState === WebSocket.OPEN) {
           return; // Already connected
@@ -61,6 +71,7 @@ const LiveGazeOverlay: React.FC = () => {
                 latestGaze.current = {
                   gaze_x: payload.gaze_x,
                   gaze_y: payload.gaze_y,
+                  space: payload.space ?? "screen",
                   client_time: clientTime
                 };
                 
@@ -119,20 +130,22 @@ const LiveGazeOverlay: React.FC = () => {
         socketRef.current.close();
       }
     };
-  }, []);
+  }, [sessionId]);
 
   // Optimized position update with no throttling or transitions
   useEffect(() => {
     // Use a simple position update without complex calculations
     const updatePosition = () => {
       if (latestGaze.current && dotRef.current) {
-        const { gaze_x, gaze_y } = latestGaze.current;
+        const { gaze_x, gaze_y, space } = latestGaze.current;
         
         // Simple, direct coordinate mapping
         let x, y;
         
-        // Values less than 1 are normalized (0-1 range)
-        if (gaze_x <= 1 && gaze_y <= 1) {
+        if (space === "viewport") {
+          x = gaze_x;
+          y = gaze_y;
+        } else if (space === "normalised") {
           x = gaze_x * width;
           y = gaze_y * height;
         } else {
@@ -8,6 +8,9 @@ import {
 } from "@mediapipe/tasks-vision";
 import { useEyeTrackingSocket } from "@/components/hooks/useEyeTracking";
 
+const CLOCK_PROBES = 5;
+const CLOCK_PROBE_INTERVAL_MS = 20;
+
 interface WebcamGazeTrackerProps {
   sessionId: string | null;
   isActive: boolean;
@@ -76,7 +79,9 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
     }
   }, [isActive, isReady]);
 
-  const sendGazeToBackend = (x: number, y: number) => {
+  // `capturedAt` is the frame's performance.now() in ms; the collector maps it
+  // onto server time using the clock.sync probes sent when the socket opens.
+  const sendGazeToBackend = (x: number, y: number, capturedAt: number) => {
     const socket = socketRef.current;
     if (socket?.readyState === WebSocket.OPEN && sessionId) {
       const payload = {
@@ -87,6 +92,8 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
           gaze_y: y,
           pupil_diameter: 0.0,
           source: "webcam",
+          space: "viewport",
+          t: capturedAt / 1000,
         },
       };
       socket.send(JSON.stringify(payload));
@@ -104,9 +111,10 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
     const drawingUtils = new DrawingUtils(ctx);
 
     const detect = () => {
+      const capturedAt = performance.now();
       const results = faceLandmarkerRef.current!.detectForVideo(
         video,
-        performance.now()
+        capturedAt
       );
       ctx.clearRect(0, 0, canvas.width, canvas.height);
 
@@ -160,7 +168,7 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
         // Ensure the values are numbers before updating.
         if (!isNaN(gazeX) && !isNaN(gazeY)) {
           onGazeData({ x: gazeX, y: gazeY });
-          sendGazeToBackend(gazeX, gazeY);
+          sendGazeToBackend(gazeX, gazeY, capturedAt);
         }
       }
       rafId.current = requestAnimationFrame(detect);
@@ -243,10 +251,20 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
   // WebSocket effect with a readyState check in cleanup.
   useEffect(() => {
     if (!sessionId) return;
-    const socket = new WebSocket(`${process.env.NEXT_PUBLIC_HOST_WS}/ws/gaze-collector/`);
+    const socket = new WebSocket(`${process.env.NEXT_PUBLIC_HOST_WS}/ws/gaze-collector/${sessionId}/`);
     socketRef.current = socket;
 
-    socket.onopen = () => console.log("✅ [GazeCollectorSocket] Connected");
+    socket.onopen = () => {
+      console.log("✅ [GazeCollectorSocket] Connected");
+      // The server keeps the probe that arrived fastest as this page's clock offset.
+      for (let i = 0; i < CLOCK_PROBES; i++) {
+        setTimeout(() => {
+          if (socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: "clock.sync", t: performance.now() / 1000 }));
+          }
+        }, i * CLOCK_PROBE_INTERVAL_MS);
+      }
+    };
     socket.onerror = (err) => console.error("❌ [GazeCollectorSocket] Error:", err);
     socket.onclose = () => console.log("🔌 [GazeCollectorSocket] Closed");
 
@@ -262,7 +280,7 @@ const WebcamGazeTracker: React.FC<WebcamGazeTrackerProps> = ({
   }, [sessionId]);
 
   // Shared alerts via your custom hook.
-  useEyeTrackingSocket();
+  useEyeTrackingSocket(undefined, sessionId);
 
   return (
     <div style={{ display: "none" }}>
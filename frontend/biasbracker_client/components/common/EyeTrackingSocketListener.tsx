@@ -4,11 +4,12 @@ import React from "react";
 import { useEyeTrackingSocket } from "@/components/hooks/useEyeTracking";
 
 interface EyeTrackingSocketListenerProps {
+  sessionId?: string | null;
   onGazeData?: (data: { gaze_x: number; gaze_y: number }) => void;
 }
 
-const EyeTrackingSocketListener: React.FC<EyeTrackingSocketListenerProps> = ({ onGazeData }) => {
-  useEyeTrackingSocket(onGazeData);
+const EyeTrackingSocketListener: React.FC<EyeTrackingSocketListenerProps> = ({ sessionId, onGazeData }) => {
+  useEyeTrackingSocket(onGazeData, sessionId);
   return null; // no UI
 };
 
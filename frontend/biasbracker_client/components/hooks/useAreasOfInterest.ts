@@ -0,0 +1,63 @@
+import { useEffect, RefObject } from "react";
+import { useRegisterAreasOfInterestMutation } from "@/redux/features/eyeTrackingApiSlice";
+
+const REGISTER_DELAY_MS = 250;
+
+/**
+ * Registers the bounding boxes of every `[data-aoi]` element inside
+ * `containerRef` with the eye-tracking session, so the server can map gaze
+ * to article sections. Boxes are re-sent (debounced) after scrolling or
+ * resizing, since both move the sections on screen.
+ */
+const useAreasOfInterest = (
+  sessionId: string | null,
+  containerRef: RefObject<HTMLElement | null>
+) => {
+  const [registerAreasOfInterest] = useRegisterAreasOfInterestMutation();
+
+  useEffect(() => {
+    if (!sessionId) return;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+
+    const register = () => {
+      const container = containerRef.current;
+      if (!container) return;
+      const areas = Array.from(container.querySelectorAll<HTMLElement>("[data-aoi]")).map((el) => {
+        const rect = el.getBoundingClientRect();
+        return {
+          key: el.dataset.aoi as string,
+          label: el.dataset.aoiLabel ?? "",
+          left: rect.left,
+          top: rect.top,
+          right: rect.right,
+          bottom: rect.bottom,
+        };
+      });
+      if (!areas.length) return;
+      registerAreasOfInterest({
+        sessionId,
+        viewport: { width: window.innerWidth, height: window.innerHeight },
+        areas,
+      })
+        .unwrap()
+        .catch(() => {});
+    };
+
+    const schedule = () => {
+      if (timer) clearTimeout(timer);
+      timer = setTimeout(register, REGISTER_DELAY_MS);
+    };
+
+    register();
+    // Capture, so scrolling the article body (not the window) is seen too.
+    window.addEventListener("scroll", schedule, true);
+    window.addEventListener("resize", schedule);
+    return () => {
+      if (timer) clearTimeout(timer);
+      window.removeEventListener("scroll", schedule, true);
+      window.removeEventListener("resize", schedule);
+    };
+  }, [sessionId, containerRef, registerAreasOfInterest]);
+};
+
+export default useAreasOfInterest;
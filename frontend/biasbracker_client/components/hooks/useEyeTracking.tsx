@@ -2,12 +2,14 @@
 import { useEffect, useRef } from "react";
 import { toast } from "react-hot-toast";
 
-export function useEyeTrackingSocket(onGazeData) {
+export function useEyeTrackingSocket(onGazeData, sessionId?: string | null, onAttention?) {
   const socketRef = useRef(null);
   const reconnectDelay = 3000; // milliseconds before attempting reconnect
 
   const connectSocket = () => {
-    const socket = new WebSocket(`${process.env.NEXT_PUBLIC_HOST_WS}/ws/eye-tracking/`);
+    // Scope the socket to one session so only its gaze frames and alerts arrive.
+    const path = sessionId ? `/ws/eye-tracking/${sessionId}/` : "/ws/eye-tracking/";
+    const socket = new WebSocket(`${process.env.NEXT_PUBLIC_HOST_WS}${path}`);
     socketRef.current = socket;
 
     socket.onopen = () => {
@@ -44,6 +46,9 @@ export function useEyeTrackingSocket(onGazeData) {
           if (typeof gaze_x === "number" && typeof gaze_y === "number") {
             onGazeData({ gaze_x, gaze_y });
           }
+        } else if (data.type === "eye.attention" && onAttention) {
+          // 0-1 attention score and the window statistics behind it.
+          onAttention(data.payload);
         }
       } catch (err) {
         console.warn("[EyeTrackingSocket] Invalid message format:", event.data);
@@ -72,5 +77,5 @@ export function useEyeTrackingSocket(onGazeData) {
         socketRef.current.close();
       }
     };
-  }, [onGazeData]);
+  }, [onGazeData, sessionId, onAttention]);
 }
@@ -1,5 +1,33 @@
 import { apiSlice } from "../services/apiSlice";
 
+export interface GazeDataQuery {
+  sessionId: string;
+  // Keyset pagination: page size, and the `next` cursor of the previous page
+  limit?: number;
+  cursor?: string;
+  // Downsample the whole session to at most this many samples
+  maxPoints?: number;
+  downsample?: "lttb" | "minmax";
+  // "columnar" returns parallel t/x/y/pupil arrays instead of one object per sample
+  layout?: "rows" | "columnar";
+}
+
+// Bounding box of a rendered article section, in viewport pixels
+export interface AreaOfInterestBox {
+  key: string;
+  label?: string;
+  left: number;
+  top: number;
+  right: number;
+  bottom: number;
+}
+
+export interface AreasOfInterestRegistration {
+  sessionId: string;
+  viewport: { width: number; height: number };
+  areas: AreaOfInterestBox[];
+}
+
 export const eyeTrackingApiSlice = apiSlice.injectEndpoints({
   endpoints: (builder) => ({
     // Start an eye tracking session
@@ -23,9 +51,30 @@ export const eyeTrackingApiSlice = apiSlice.injectEndpoints({
       query: () => "eye-track/sessions/",
     }),
 
-    // Retrieve gaze data for a specific session
-    getGazeData: builder.query<any, string>({
-      query: (sessionId) => `eye-track/sessions/${sessionId}/gaze/`,
+    // Retrieve gaze data for a specific session, optionally paged or downsampled
+    getGazeData: builder.query<any, string | GazeDataQuery>({
+      query: (arg) => {
+        if (typeof arg === "string") return `eye-track/sessions/${arg}/gaze/`;
+        const { sessionId, limit, cursor, maxPoints, downsample, layout } = arg;
+        return {
+          url: `eye-track/sessions/${sessionId}/gaze/`,
+          params: { limit, cursor, max_points: maxPoints, downsample, layout },
+        };
+      },
+    }),
+
+    // Register the article sections currently on screen for a session
+    registerAreasOfInterest: builder.mutation<any, AreasOfInterestRegistration>({
+      query: ({ sessionId, viewport, areas }) => ({
+        url: `eye-track/sessions/${sessionId}/aois/`,
+        method: "POST",
+        body: { viewport, areas },
+      }),
+    }),
+
+    // Dwell time per article section for a session
+    getAreasOfInterest: builder.query<any, string>({
+      query: (sessionId) => `eye-track/sessions/${sessionId}/aois/`,
     }),
   }),
 });
@@ -35,4 +84,6 @@ export const {
   useStopEyeTrackingSessionMutation,
   useGetEyeTrackingSessionsQuery,
   useGetGazeDataQuery,
+  useRegisterAreasOfInterestMutation,
+  useGetAreasOfInterestQuery,
 } = eyeTrackingApiSlice;
@@ -1,24 +1,25 @@
-import logging
-import socket
 import time
-import json
-import threading
-import queue
 import tkinter as tk
 from tkinter import messagebox
-import websocket
 import tobii_research as tr
-
-WS_URL = "ws://persuasive.research.cs.dal.ca:9987/ws/gaze-collector/"
-
-# throttle interval for sending gaze data
-SEND_THROTTLE = 0.05  
+from capture import GazeCapture, device_time
+from transport import GazeTransport
+
+# the window redraws the latest sample and the transport counters this often (ms),
+# independent of the tracker's sample rate
+UI_REFRESH_MS = 250
+STATUS_LABELS = {
+    "connecting": ("🔌 Connecting…", "#fbc02d"),
+    "connected": ("✅ Tracking '{session_id}'", "#388e3c"),
+    "reconnecting": ("⚠️ Connection lost — reconnecting…", "#fbc02d"),
+    "stopping": ("⏳ Sending the last samples…", "#fbc02d"),
+}
 
 class BiasBreakerApp:
     def __init__(self, master):
         self.master = master
         master.title("BiasBreaker 👁️ Tobii Eye Tracker")
-        master.geometry("600x460")
+        master.geometry("600x490")
         master.configure(bg="#f7f9fc")
         master.resizable(False, False)
 
@@ -52,15 +53,16 @@ class BiasBreakerApp:
         self.status_label.pack(pady=5)
         self.gaze_label = tk.Label(master, text="👁️ Gaze: N/A | 🎯 Pupil: N/A", font=("Helvetica", 11), bg="#f7f9fc")
         self.gaze_label.pack()
+        self.stats_label = tk.Label(master, text="", font=("Helvetica", 10), fg="#555555", bg="#f7f9fc")
+        self.stats_label.pack(pady=(5, 0))
 
         # Internal state
         self.eyetracker = None
-        self.ws = None
-        self.ws_thread = None
-        self.ws_queue = queue.Queue()
-        self.ws_running = False
+        self.transport = None
+        self.capture = None
         self.tracking = False
-        self.last_emit_time = 0
+        self.closing = False
+        self.last_refresh = None
 
         self.check_tobii()
         master.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -83,124 +85,91 @@ class BiasBreakerApp:
             return
         self.session_id = session_id
 
-        if not self._connect_ws():
-            messagebox.showerror("⚠️ Error", "WebSocket connection failed.")
-            return
-
-        # subscribe to Tobii
+        # the transport connects (and reconnects) on its own thread; it first
+        # replays whatever this session left in its spool
+        self.transport = GazeTransport(session_id, clock=device_time)
+        self.transport.start()
+        self.capture = GazeCapture(self.eyetracker, self.transport)
         try:
-            self.eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA, self.gaze_callback, as_dictionary=True)
+            self.capture.start()
         except Exception as e:
+            self.transport.request_stop()
+            self.start_btn.config(state=tk.DISABLED)
+            self.master.after(UI_REFRESH_MS, self.finish_stop)
             messagebox.showerror("❌ Tobii Error", str(e))
             return
 
         # update UI
         self.tracking = True
-        self.status_label.config(text=f"✅ Tracking '{self.session_id}'", fg="#388e3c")
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
+        self.last_refresh = None
+        self.refresh()
 
-    def _connect_ws(self):
-        """Establish WebSocket, enable keepalive, and start sender thread."""
-        try:
-            self.ws = websocket.create_connection(WS_URL)
-            # set a short timeout so we can detect dropped connections
-            self.ws.settimeout(5)
-            # enable TCP keepalive
-            sock = self.ws.sock
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-
-            self.ws_running = True
-            self.ws_thread = threading.Thread(target=self.ws_sender, daemon=True)
-            self.ws_thread.start()
-            return True
-
-        except Exception as e:
-            print("WS connect error:", e)
-            return False
-
-    def ws_sender(self):
-        """Continuously pull from queue, send, and reconnect on failure."""
-        while self.ws_running:
-            try:
-                msg = self.ws_queue.get(timeout=0.1)
-                self.ws.send(msg)
-
-            except queue.Empty:
-                continue
-
-            except Exception as e:
-                # socket was aborted by host
-                print(f"WS Send Error: {e}")
-                self.ws_running = False
-                self._attempt_reconnect()
-
-    def _attempt_reconnect(self):
-        """Try to re-open the WebSocket in a loop."""
-        self.status_label.config(text="⚠️ Connection lost — reconnecting…", fg="#fbc02d")
-        # give the server a moment
-        time.sleep(1)
-
-        while not self.ws_running:
-            if self._connect_ws():
-                self.status_label.config(text="🔄 Reconnected", fg="#388e3c")
-                break
-            time.sleep(2)
-
-    def gaze_callback(self, gaze_data):
+    def refresh(self):
+        """Redraw status, latest gaze and throughput from the capture and
+        transport snapshots; Tk is only touched from this thread."""
         if not self.tracking:
             return
-
-        now = time.time()
-        if now - self.last_emit_time < SEND_THROTTLE:
-            return
-        self.last_emit_time = now
-
-        left = gaze_data.get("left_gaze_point_on_display_area")
-        pupil = gaze_data.get("left_pupil_diameter")
-        if not left or None in left:
-            return
-
-        x = round(left[0] * 1920, 2)
-        y = round(left[1] * 1080, 2)
-
-        self.gaze_label.config(text=f"👁️ Gaze: ({x}, {y}) | 🎯 Pupil: {round(pupil,2)}")
-        packet = json.dumps({
-            "type": "eye.data",
-            "payload": {
-                "session_id": self.session_id,
-                "gaze_x": x,
-                "gaze_y": y,
-                "pupil_diameter": pupil,
-                "source": "tobii",
-            }
-        })
-        self.ws_queue.put(packet)
+        stats = self.transport.stats()
+        text, color = STATUS_LABELS.get(stats["state"], ("Status: Idle", "black"))
+        self.status_label.config(text=text.format(session_id=self.session_id), fg=color)
+
+        latest = self.capture.latest
+        if latest is not None:
+            _, x, y, pupil = latest
+            pupil = "N/A" if pupil is None else round(pupil, 2)
+            self.gaze_label.config(text=f"👁️ Gaze: ({x:.0f}, {y:.0f}) | 🎯 Pupil: {pupil}")
+
+        now = time.monotonic()
+        samples, confirmed = self.capture.samples, stats["confirmed"]
+        if self.last_refresh is not None:
+            then, last_samples, last_confirmed = self.last_refresh
+            elapsed = now - then
+            self.stats_label.config(text=(
+                f"📈 {(samples - last_samples) / elapsed:.0f} samples/s · "
+                f"{(confirmed - last_confirmed) / elapsed:.1f} msgs/s · "
+                f"queue {stats['queued']} · backlog {stats['backlog_bytes'] / 1024:.1f} KiB · "
+                f"dropped {stats['dropped']}"
+            ))
+        self.last_refresh = (now, samples, confirmed)
+        self.master.after(UI_REFRESH_MS, self.refresh)
 
     def stop_tracking(self):
         self.tracking = False
-        # unsubscribe Tobii
-        try:
-            self.eyetracker.unsubscribe_from(tr.EYETRACKER_GAZE_DATA, self.gaze_callback)
-        except Exception:
-            pass
+        # hand over the last partial batch and let the transport drain the spool
+        # on its own thread; whatever it cannot send in time stays on disk for
+        # the next start
+        self.capture.stop()
+        self.transport.request_stop()
+        text, color = STATUS_LABELS["stopping"]
+        self.status_label.config(text=text, fg=color)
+        self.stop_btn.config(state=tk.DISABLED)
+        self.master.after(UI_REFRESH_MS, self.finish_stop)
 
-        # tear down WS
-        self.ws_running = False
-        try:
-            self.ws.close()
-        except Exception:
-            pass
+    def finish_stop(self):
+        """Poll until the transport has drained, then reset the window."""
+        if not self.transport.stopped:
+            self.master.after(UI_REFRESH_MS, self.finish_stop)
+            return
+        self.transport.spool.close()
+        self.transport = None
+        if self.closing:
+            self.master.destroy()
+            return
 
         self.status_label.config(text="⛔️ Tracking stopped", fg="#c62828")
         self.gaze_label.config(text="👁️ Gaze: N/A | 🎯 Pupil: N/A")
+        self.stats_label.config(text="")
         self.start_btn.config(state=tk.NORMAL)
-        self.stop_btn.config(state=tk.DISABLED)
 
     def on_close(self):
+        # a stop in progress destroys the window once the spool is drained
+        self.closing = True
         if self.tracking:
             self.stop_tracking()
-        self.master.destroy()
+        elif self.transport is None:
+            self.master.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
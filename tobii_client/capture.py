@@ -0,0 +1,79 @@
+"""Gaze capture on the Tobii SDK callback thread.
+
+``GazeCapture`` subscribes to a tracker, merges and filters each sample (see
+gaze_filters), collects them into batches of ``BATCH_WINDOW`` seconds and
+hands each batch to the transport. The callback only does numeric work: no
+I/O and no GUI calls. Frontends poll ``latest`` and ``samples`` instead,
+at whatever rate suits them.
+"""
+import os
+import threading
+import tobii_research as tr
+from gaze_filters import FilterPipeline, gaze_point
+
+# samples are collected for this many seconds and sent as one message
+BATCH_WINDOW = float(os.getenv("BIASBREAKER_BATCH_WINDOW", "0.15"))
+
+
+def device_time():
+    """Now on the clock of ``system_time_stamp``, in seconds."""
+    return tr.get_system_time_stamp() / 1_000_000
+
+
+class GazeCapture:
+    def __init__(self, eyetracker, transport):
+        self.eyetracker = eyetracker
+        self.transport = transport
+        self.filters = FilterPipeline.from_names()
+        self.batch = []
+        self.tracking = False
+        # held by the callback while it batches a sample, and by stop()
+        self.lock = threading.Lock()
+        # read from other threads; each is replaced by a single assignment
+        self.latest = None
+        self.samples = 0
+
+    def start(self):
+        self.filters.reset()
+        self.batch = []
+        self.latest = None
+        self.eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA, self.gaze_callback, as_dictionary=True)
+        self.tracking = True
+
+    def stop(self):
+        """Unsubscribe and hand over the last partial batch."""
+        # Once stop holds the lock no sample is half-batched, and callbacks
+        # still in flight after it find tracking off and return.
+        with self.lock:
+            self.tracking = False
+            batch, self.batch = self.batch, []
+        try:
+            self.eyetracker.unsubscribe_from(tr.EYETRACKER_GAZE_DATA, self.gaze_callback)
+        except Exception:
+            pass
+        if batch:
+            self.transport.submit(batch)
+
+    def gaze_callback(self, gaze_data):
+        with self.lock:
+            if self.tracking:
+                self._add(gaze_data)
+
+    def _add(self, gaze_data):
+        # device clock in seconds; every sample keeps its own capture time
+        t = gaze_data["system_time_stamp"] / 1_000_000
+        self.samples += 1
+        point = gaze_point(gaze_data)
+        if point is not None:
+            sample = self.filters.process(t, *point)
+            if sample is not None:
+                self.batch.append(sample)
+                self.latest = sample
+
+        # invalid samples still advance the clock, so a batch never stalls
+        if self.batch and t - self.batch[0][0] >= BATCH_WINDOW:
+            self._emit_batch()
+
+    def _emit_batch(self):
+        batch, self.batch = self.batch, []
+        self.transport.submit(batch)
@@ -0,0 +1,182 @@
+"""Per-sample gaze filters run on the Tobii callback before batching.
+
+``gaze_point`` merges the two eyes of one SDK sample, weighting each by its
+validity flag, and ``FilterPipeline`` passes the point through a chain of
+stages, each O(1) per sample with no buffering:
+
+* ``OneEuroFilter``: the 1€ filter of Casiez et al. (CHI 2012), an adaptive
+  low-pass that smooths hard while the gaze is still and follows saccades
+  with little lag;
+* ``DeadBand``: drops samples within ``radius`` px of the last one sent, but
+  always lets one through every ``max_hold`` s so the server never sees a gap
+  it would take for lost tracking (its fixation detector closes after 0.25 s).
+
+A stage's ``process(t, x, y)`` returns the filtered ``(x, y)``, or None to
+drop the sample. The pipeline resets every stage after a gap in the stream,
+so a blink is not smoothed across.
+"""
+import math
+import os
+
+SCREEN_WIDTH = 1920
+SCREEN_HEIGHT = 1080
+# Samples further apart than this (s) start the filters afresh.
+MAX_GAP = 0.25
+
+# 1€ defaults for pixel coordinates: ~1 Hz cutoff at rest, opening up by
+# BETA Hz per px/s of gaze speed.
+MIN_CUTOFF = float(os.getenv("BIASBREAKER_MIN_CUTOFF", "1.0"))
+BETA = float(os.getenv("BIASBREAKER_BETA", "0.007"))
+D_CUTOFF = 1.0
+DEAD_BAND_RADIUS = float(os.getenv("BIASBREAKER_DEAD_BAND", "2.0"))
+DEAD_BAND_MAX_HOLD = 0.1
+# comma-separated stage names, see STAGES; empty sends raw samples
+FILTERS = os.getenv("BIASBREAKER_FILTERS", "one-euro,dead-band")
+# "both" averages the valid eyes, "left" or "right" uses one eye only
+EYES = os.getenv("BIASBREAKER_EYES", "both")
+
+
+def _valid(point):
+    return point is not None and not (math.isnan(point[0]) or math.isnan(point[1]))
+
+
+def gaze_point(gaze_data, eyes=EYES):
+    """(x, y, pupil) of an SDK gaze sample in screen pixels, or None.
+
+    The point is the validity-weighted mean of the selected eyes; the pupil
+    likewise, or None when no pupil reading is valid.
+    """
+    x = y = weight = pupil = pupil_weight = 0.0
+    for eye in ("left", "right") if eyes == "both" else (eyes,):
+        point = gaze_data.get(f"{eye}_gaze_point_on_display_area")
+        validity = gaze_data.get(f"{eye}_gaze_point_validity", 1)
+        if validity and _valid(point):
+            x += validity * point[0]
+            y += validity * point[1]
+            weight += validity
+        diameter = gaze_data.get(f"{eye}_pupil_diameter")
+        validity = gaze_data.get(f"{eye}_pupil_validity", 1)
+        if validity and diameter is not None and not math.isnan(diameter):
+            pupil += validity * diameter
+            pupil_weight += validity
+    if not weight:
+        return None
+    return (
+        x / weight * SCREEN_WIDTH,
+        y / weight * SCREEN_HEIGHT,
+        pupil / pupil_weight if pupil_weight else None,
+    )
+
+
+def _smoothing(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class _OneEuroAxis:
+    __slots__ = ("value", "slope")
+
+    def update(self, value, dt, min_cutoff, beta):
+        a = _smoothing(D_CUTOFF, dt)
+        self.slope = a * (value - self.value) / dt + (1 - a) * self.slope
+        a = _smoothing(min_cutoff + beta * abs(self.slope), dt)
+        self.value = a * value + (1 - a) * self.value
+        return self.value
+
+
+class OneEuroFilter:
+    """1€ filter applied to x and y independently."""
+
+    __slots__ = ("min_cutoff", "beta", "x", "y", "last_t")
+
+    def __init__(self, min_cutoff=MIN_CUTOFF, beta=BETA):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.x = _OneEuroAxis()
+        self.y = _OneEuroAxis()
+        self.reset()
+
+    def reset(self):
+        self.last_t = None
+
+    def process(self, t, x, y):
+        if self.last_t is None:
+            self.last_t = t
+            self.x.value, self.x.slope = x, 0.0
+            self.y.value, self.y.slope = y, 0.0
+            return x, y
+        dt = t - self.last_t
+        if dt <= 0:
+            # duplicate timestamp: nothing new to smooth with
+            return self.x.value, self.y.value
+        self.last_t = t
+        return (
+            self.x.update(x, dt, self.min_cutoff, self.beta),
+            self.y.update(y, dt, self.min_cutoff, self.beta),
+        )
+
+
+class DeadBand:
+    """Drops samples that moved less than ``radius`` px since the last one kept."""
+
+    __slots__ = ("radius", "max_hold", "last_t", "last_x", "last_y")
+
+    def __init__(self, radius=DEAD_BAND_RADIUS, max_hold=DEAD_BAND_MAX_HOLD):
+        self.radius = radius
+        self.max_hold = max_hold
+        self.reset()
+
+    def reset(self):
+        self.last_t = None
+        self.last_x = self.last_y = 0.0
+
+    def process(self, t, x, y):
+        if (
+            self.last_t is not None and t - self.last_t < self.max_hold
+            and abs(x - self.last_x) <= self.radius and abs(y - self.last_y) <= self.radius
+        ):
+            return None
+        self.last_t = t
+        self.last_x = x
+        self.last_y = y
+        return x, y
+
+
+STAGES = {
+    "one-euro": OneEuroFilter,
+    "dead-band": DeadBand,
+}
+
+
+class FilterPipeline:
+    """Runs (t, x, y, pupil) samples through ``stages`` in order."""
+
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+        self.last_t = None
+        self.received = 0
+        self.passed = 0
+
+    @classmethod
+    def from_names(cls, names=FILTERS):
+        """Build a pipeline from comma-separated STAGES names."""
+        return cls(STAGES[name.strip()]() for name in names.split(",") if name.strip())
+
+    def reset(self):
+        self.last_t = None
+        for stage in self.stages:
+            stage.reset()
+
+    def process(self, t, x, y, pupil):
+        """The filtered sample, or None if a stage dropped it."""
+        self.received += 1
+        if self.last_t is not None and not 0 <= t - self.last_t <= MAX_GAP:
+            self.reset()
+        self.last_t = t
+        for stage in self.stages:
+            point = stage.process(t, x, y)
+            if point is None:
+                return None
+            x, y = point
+        self.passed += 1
+        return t, x, y, pupil
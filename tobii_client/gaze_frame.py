@@ -0,0 +1,39 @@
+"""Encoder for the binary gaze batch frame accepted by /ws/gaze-collector/.
+
+Mirrors backend/eye_tracking/protocol.py: a little-endian header
+(magic, version, flags, count, t0, session id length, source length), the
+session id and source as UTF-8, then ``count`` packed (t, x, y, pupil)
+records with ``t`` relative to ``t0``. Bits 1-2 of flags give the coordinate
+space of x and y, an index into COORDINATE_SPACES.
+"""
+import math
+import struct
+import sys
+from array import array
+
+FRAME_MAGIC = b"GZ"
+FRAME_VERSION = 1
+FLAG_FLOAT64 = 0x01
+HEADER = struct.Struct("<2sBBHdBB")
+COORDINATE_SPACES = ("screen", "viewport", "normalised")
+SPACE_SHIFT = 1
+
+
+def encode_frame(session_id, source, samples, double=False, space="screen"):
+    """Pack (t, x, y, pupil) samples with absolute t in seconds into one frame.
+
+    float32 records keep sub-millisecond offsets for batches of a few seconds;
+    pass double=True for longer batches. A missing pupil is sent as NaN.
+    The companion's gaze points are in screen pixels.
+    """
+    t0 = samples[0][0] if samples else 0.0
+    records = array("d" if double else "f")
+    for t, x, y, pupil in samples:
+        records.extend((t - t0, x, y, math.nan if pupil is None else pupil))
+    if sys.byteorder == "big":
+        records.byteswap()
+    sid = session_id.encode("utf-8")
+    src = source.encode("utf-8")
+    flags = (FLAG_FLOAT64 if double else 0) | COORDINATE_SPACES.index(space) << SPACE_SHIFT
+    header = HEADER.pack(FRAME_MAGIC, FRAME_VERSION, flags, len(samples), t0, len(sid), len(src))
+    return header + sid + src + records.tobytes()
@@ -0,0 +1,86 @@
+"""Headless Tobii companion: stream one session without the Tk window.
+
+    python headless.py SESSION_ID [--url ws://host:port/ws/gaze-collector/] [--duration 600]
+    python headless.py SESSION_ID --drain
+
+Prints the sample rate and the transport's counters every few seconds; Ctrl-C stops tracking
+and lets the spool drain. ``--drain`` only sends the session's spooled backlog, e.g. one left
+behind by a crash, and exits once the server has acknowledged all of it.
+"""
+import argparse
+import time
+import tobii_research as tr
+from capture import GazeCapture, device_time
+from transport import DRAIN_TIMEOUT, WS_URL, GazeTransport
+
+
+def drain(session_id, url, report_every):
+    # spooled samples are already on the wall clock
+    transport = GazeTransport(session_id, url=url, clock=time.time)
+    transport.start()
+    try:
+        while True:
+            stats = transport.stats()
+            if not stats["backlog_bytes"]:
+                break
+            print(
+                f"{stats['state']:<12} backlog {stats['backlog_bytes'] / 1024:>8.1f} KiB  "
+                f"sent {stats['sent']:>7}  confirmed {stats['confirmed']:>7}  reconnects {stats['reconnects']:>3}"
+            )
+            time.sleep(report_every)
+        print("Backlog sent.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transport.stop()
+        transport.spool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Tobii gaze to the BiasBreaker server without a GUI.")
+    parser.add_argument("session_id")
+    parser.add_argument("--url", default=WS_URL, help="Gaze collector URL, without the session id.")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds.")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between status lines.")
+    parser.add_argument("--drain", action="store_true", help="Only send the session's spooled backlog.")
+    args = parser.parse_args()
+    if args.drain:
+        drain(args.session_id, args.url, args.report_every)
+        return
+
+    trackers = tr.find_all_eyetrackers()
+    if not trackers:
+        raise SystemExit("No Tobii device found.")
+    eyetracker = trackers[0]
+    print(f"Tobii device: {eyetracker.model}")
+
+    transport = GazeTransport(args.session_id, url=args.url, clock=device_time)
+    transport.start()
+    capture = GazeCapture(eyetracker, transport)
+    capture.start()
+    started = time.monotonic()
+    samples = 0
+    try:
+        while args.duration is None or time.monotonic() - started < args.duration:
+            time.sleep(args.report_every)
+            stats = transport.stats()
+            latency = stats["confirm_latency"]
+            rate = (capture.samples - samples) / args.report_every
+            samples = capture.samples
+            print(
+                f"{stats['state']:<12} {rate:>5.0f} samples/s  sent {stats['sent']:>7}  confirmed {stats['confirmed']:>7}  "
+                f"queued {stats['queued']:>4}  dropped {stats['dropped']:>4}  "
+                f"backlog {stats['backlog_bytes'] / 1024:>8.1f} KiB  reconnects {stats['reconnects']:>3}  "
+                f"rtt {'-' if latency is None else f'{latency * 1000:.0f} ms'}"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+        print(f"Stopping; waiting up to {DRAIN_TIMEOUT} s for the spool to drain.")
+        transport.stop()
+        transport.spool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,7 +31,8 @@ def gaze_callback(gaze_data, ws):
                     "gaze_x": x,
                     "gaze_y": y,
                     "pupil_diameter": pupil_diameter,
-                    "source": "tobii"
+                    "source": "tobii",
+                    "space": "normalised"
                 }
             }
 
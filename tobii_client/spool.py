@@ -0,0 +1,221 @@
+"""Append-only on-disk spool of outgoing gaze messages.
+
+Every batch is appended here before it is sent and only committed once the
+server confirmed it, so batches queued during a disconnect (or before a
+crash) are replayed later with their original device timestamps instead of
+piling up in memory.
+
+The spool is a directory of fixed-size segment files, each memory-mapped
+while in use. A segment starts with a header (magic, version, read offset)
+followed by records of (length, crc32, flags) and the payload. The length
+is written last, so a record cut short by a crash reads as the end of the
+segment. When a record does not fit, a new segment is started; a segment
+is deleted once everything in it has been sent. Only the segment being read
+and the one being written are mapped, however long the backlog.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+SEGMENT_SIZE = 4 * 1024 * 1024
+SEGMENT_MAGIC = b"GZSP"
+SEGMENT_VERSION = 1
+# magic, version, read offset
+SEGMENT_HEADER = struct.Struct("<4sHxxQ")
+# payload length, crc32 of payload, flags
+RECORD_HEADER = struct.Struct("<IIB")
+FLAG_TEXT = 0x01
+
+
+class SpoolError(Exception):
+    pass
+
+
+class _Segment:
+    """One segment file; ``read`` and ``write`` are byte offsets into it."""
+
+    def __init__(self, path, number):
+        self.path = path
+        self.number = number
+        self.file = None
+        self.map = None
+        self.read = self.write = self.synced = SEGMENT_HEADER.size
+
+    def open(self, size):
+        if self.map is not None:
+            return
+        exists = os.path.exists(self.path)
+        self.file = open(self.path, "r+b" if exists else "w+b")
+        if exists:
+            # Segments written with another SEGMENT_SIZE keep their own size.
+            size = os.fstat(self.file.fileno()).st_size
+        else:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        if not exists:
+            SEGMENT_HEADER.pack_into(self.map, 0, SEGMENT_MAGIC, SEGMENT_VERSION, self.read)
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
+            self.map = self.file = None
+
+    def recover(self):
+        """Read the header and scan the records for the end of the segment."""
+        magic, version, read = SEGMENT_HEADER.unpack_from(self.map, 0)
+        if magic == bytes(len(SEGMENT_MAGIC)):
+            # created, but the process died before the header was written
+            return
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise SpoolError(f"{self.path} is not a version {SEGMENT_VERSION} spool segment")
+        pos = SEGMENT_HEADER.size
+        while pos + RECORD_HEADER.size <= len(self.map):
+            length, crc, _ = RECORD_HEADER.unpack_from(self.map, pos)
+            end = pos + RECORD_HEADER.size + length
+            if not length or end > len(self.map) or zlib.crc32(self.map[end - length:end]) != crc:
+                break
+            pos = end
+        self.write = self.synced = pos
+        self.read = min(max(read, SEGMENT_HEADER.size), pos)
+
+    def set_read(self, pos):
+        self.read = pos
+        SEGMENT_HEADER.pack_into(self.map, 0, SEGMENT_MAGIC, SEGMENT_VERSION, pos)
+
+
+class Spool:
+    """Thread-safe FIFO of byte records kept in ``directory``.
+
+    ``append`` adds a record and ``sync`` flushes appended records to disk.
+    ``peek`` returns the next record after those already peeked; ``commit``
+    drops every peeked record (or those before a ``position``) for good,
+    ``rewind`` makes the rest peekable again.
+    """
+
+    def __init__(self, directory, segment_size=SEGMENT_SIZE):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segments = []
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("segment-") and name.endswith(".spool"):
+                segment = _Segment(os.path.join(directory, name), int(name[8:-6]))
+                if os.path.getsize(segment.path) < SEGMENT_HEADER.size:
+                    os.remove(segment.path)
+                    continue
+                segment.open(segment_size)
+                segment.recover()
+                segment.close()
+                if segment.read == segment.write:
+                    os.remove(segment.path)
+                else:
+                    self.segments.append(segment)
+        self.pending = sum(segment.write - segment.read for segment in self.segments)
+        # Appends always start a fresh segment, so a recovered tail is never
+        # written into after a record of unknown state.
+        self._new_segment()
+        self.cursor_segment = 0
+        self.cursor = self.segments[0].read
+
+    def _new_segment(self):
+        if self.segments and self.segments[-1] is not self.segments[0]:
+            self.segments[-1].close()
+        number = self.segments[-1].number + 1 if self.segments else 0
+        segment = _Segment(os.path.join(self.directory, f"segment-{number:08d}.spool"), number)
+        segment.open(self.segment_size)
+        self.segments.append(segment)
+        return segment
+
+    def append(self, payload, text=False):
+        size = RECORD_HEADER.size + len(payload)
+        if size > self.segment_size - SEGMENT_HEADER.size:
+            raise SpoolError(f"Record of {len(payload)} bytes does not fit a spool segment.")
+        with self.lock:
+            segment = self.segments[-1]
+            if segment.write + size > self.segment_size:
+                segment = self._new_segment()
+            pos = segment.write
+            segment.map[pos + RECORD_HEADER.size:pos + size] = payload
+            RECORD_HEADER.pack_into(
+                segment.map, pos, len(payload), zlib.crc32(payload), FLAG_TEXT if text else 0
+            )
+            segment.write = pos + size
+            self.pending += size
+
+    def sync(self):
+        """Flush records appended since the last sync to the file."""
+        with self.lock:
+            segment = self.segments[-1]
+            if segment.synced == segment.write:
+                return
+            start = segment.synced - segment.synced % mmap.ALLOCATIONGRANULARITY
+            segment.map.flush(start, segment.write - start)
+            segment.synced = segment.write
+
+    def peek(self):
+        """The next record as ``(payload, text)``, or None if all were peeked."""
+        with self.lock:
+            segment = self.segments[self.cursor_segment]
+            while self.cursor == segment.write:
+                if segment is self.segments[-1]:
+                    return None
+                if segment is not self.segments[0]:
+                    segment.close()
+                self.cursor_segment += 1
+                segment = self.segments[self.cursor_segment]
+                self.cursor = segment.read
+            segment.open(self.segment_size)
+            length, _, flags = RECORD_HEADER.unpack_from(segment.map, self.cursor)
+            start = self.cursor + RECORD_HEADER.size
+            self.cursor = start + length
+            return bytes(segment.map[start:self.cursor]), bool(flags & FLAG_TEXT)
+
+    def position(self):
+        """The cursor after the records peeked so far, to ``commit`` up to later."""
+        with self.lock:
+            return self.segments[self.cursor_segment].number, self.cursor
+
+    def commit(self, position=None):
+        """Drop every record peeked so far, or only those before ``position``."""
+        with self.lock:
+            if position is None:
+                index, offset = self.cursor_segment, self.cursor
+            else:
+                number, offset = position
+                index = next(
+                    (i for i, segment in enumerate(self.segments) if segment.number == number), None
+                )
+                if index is None or index > self.cursor_segment:
+                    # already committed, or not peeked yet
+                    return
+            # Segments before it are fully sent and no longer written to.
+            for segment in self.segments[:index]:
+                self.pending -= segment.write - segment.read
+                segment.close()
+                os.remove(segment.path)
+            del self.segments[:index]
+            self.cursor_segment -= index
+            segment = self.segments[0]
+            segment.open(self.segment_size)
+            if offset > segment.read:
+                self.pending -= offset - segment.read
+                segment.set_read(offset)
+
+    def rewind(self):
+        """Make the records peeked since the last commit peekable again."""
+        with self.lock:
+            for segment in self.segments[1:self.cursor_segment + 1]:
+                if segment is not self.segments[-1]:
+                    segment.close()
+            self.cursor_segment = 0
+            self.cursor = self.segments[0].read
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
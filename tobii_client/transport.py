@@ -0,0 +1,323 @@
+"""asyncio transport from the Tobii companion to /ws/gaze-collector/.
+
+``GazeTransport`` runs one event loop on its own thread that owns the
+WebSocket. The SDK callback thread hands finished batches over with
+``submit``, which only schedules them onto the loop, so it never blocks on
+the network. From there a batch goes
+
+    bounded handoff queue (drop-oldest) -> encoded into the spool -> socket
+
+and leaves the spool once the server acknowledged it. Every burst of
+batches is followed by a ``sync`` marker; the server answers it with an
+``ack`` once the samples before it are written to the database, and the
+spool is committed up to that marker while later bursts are already on the
+way. Each session spools into its own directory, so its backlog is only
+ever replayed to that session. Unacknowledged batches are sent again after
+a reconnect, each sample still carrying its capture time. Device
+timestamps are moved onto this machine's wall clock as they are spooled,
+with an anchor taken once at start, so a backlog spooled before a restart
+or reboot (which restarts the device clock) keeps its times. Every
+connection starts with a few ``clock.sync`` probes on the wall clock, from
+which the server maps those times onto its own clock, so a replayed
+backlog is stored at the time it was captured. Keepalive pings
+detect a dead connection while idle and reconnects back off exponentially
+with jitter.
+
+Counters are only changed on the loop thread; ``stats()`` reads them from
+any thread for a frontend to display.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+from gaze_frame import encode_frame
+from spool import Spool
+
+WS_URL = os.getenv("BIASBREAKER_WS_URL", "ws://persuasive.research.cs.dal.ca:9987/ws/gaze-collector/")
+# "binary" packs each batch into a gaze frame, "json" sends an eye.data.batch message
+WIRE_FORMAT = os.getenv("BIASBREAKER_WIRE_FORMAT", "binary")
+# batches wait here on disk until the server stored them, across disconnects
+# and restarts; one subdirectory per session
+SPOOL_DIR = os.getenv("BIASBREAKER_SPOOL_DIR", os.path.join(os.path.expanduser("~"), ".biasbreaker", "spool"))
+# batches waiting to be spooled; the oldest is dropped beyond this
+QUEUE_SIZE = int(os.getenv("BIASBREAKER_QUEUE_SIZE", "256"))
+# a backlog is replayed at most this many batches per second after reconnecting
+REPLAY_RATE = float(os.getenv("BIASBREAKER_REPLAY_RATE", "50"))
+# batches sent before waiting for the server to acknowledge them
+MAX_IN_FLIGHT = 50
+# the server keeps the probe that arrived fastest
+CLOCK_PROBES = 5
+CLOCK_PROBE_INTERVAL = 0.02
+CONFIRM_TIMEOUT = 5
+PING_INTERVAL = 5
+PING_TIMEOUT = 5
+OPEN_TIMEOUT = 5
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30
+# seconds stop waits for the spool to drain; the rest is sent on the next start
+DRAIN_TIMEOUT = 5
+
+CONNECTION_ERRORS = (OSError, WebSocketException, asyncio.TimeoutError)
+
+
+def spool_dir(session_id, root=SPOOL_DIR):
+    """The directory a session's batches are spooled in."""
+    return os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", session_id))
+
+
+class GazeTransport:
+    def __init__(self, session_id, url=WS_URL, wire_format=WIRE_FORMAT, spool=None, clock=None):
+        self.session_id = session_id
+        # seconds on the clock the samples are stamped with; None sends no probes
+        self.clock = clock
+        # wall time - device time, for the whole run
+        self.anchor = None
+        # session-scoped route so the server only fans out to this session's viewers
+        self.url = f"{url}{session_id}/"
+        self.wire_format = wire_format
+        self.spool = spool if spool is not None else Spool(spool_dir(session_id))
+        self.queue = deque()
+        self.state = "idle"
+        self.counters = dict.fromkeys(
+            ("submitted", "dropped", "sent", "confirmed", "reconnects"), 0
+        )
+        self.confirm_latency = None
+        # bursts sent but not acknowledged, as (seq, spool position, batches, sent at)
+        self.unacked = deque()
+        self.in_flight = 0
+        self.seq = 0
+        self.loop = None
+        self.task = None
+        self.thread = None
+        self.wakeup = None
+        self.closing = False
+
+    def start(self):
+        """Start the event loop thread; returns once ``submit`` can be used."""
+        if self.clock is not None:
+            self.anchor = time.time() - self.clock()
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=asyncio.run, args=(self._main(ready),), name="gaze-transport", daemon=True
+        )
+        self.thread.start()
+        ready.wait()
+
+    @property
+    def stopped(self):
+        """True once the loop thread has exited (or was never started)."""
+        return self.thread is None or not self.thread.is_alive()
+
+    def request_stop(self, timeout=DRAIN_TIMEOUT):
+        """Send what is left for up to ``timeout`` s, then shut the loop down.
+
+        Returns at once; the draining happens on the loop thread, so a GUI
+        stays responsive and polls ``stopped`` instead of waiting.
+        """
+        if self.stopped:
+            return
+        self.state = "stopping"
+        self.loop.call_soon_threadsafe(self._close, timeout)
+
+    def stop(self, timeout=DRAIN_TIMEOUT):
+        """``request_stop`` and wait for it."""
+        if self.stopped:
+            return
+        self.request_stop(timeout)
+        self.thread.join(timeout + 1)
+        self.thread = None
+        self.state = "stopped"
+
+    def submit(self, batch):
+        """Hand a batch over from any thread without blocking."""
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, batch)
+        except RuntimeError:
+            # loop already closed
+            pass
+
+    def stats(self):
+        return {
+            "state": self.state,
+            **self.counters,
+            "queued": len(self.queue),
+            "in_flight": self.in_flight,
+            "backlog_bytes": self.spool.pending,
+            "confirm_latency": self.confirm_latency,
+        }
+
+    def _enqueue(self, batch):
+        self.counters["submitted"] += 1
+        if len(self.queue) >= QUEUE_SIZE:
+            self.queue.popleft()
+            self.counters["dropped"] += 1
+        self.queue.append(batch)
+        self.wakeup.set()
+
+    def _close(self, timeout):
+        self.closing = True
+        self.wakeup.set()
+        # the spool keeps whatever is still unsent when the deadline cancels the run
+        self.loop.call_later(timeout, self.task.cancel)
+
+    def _spool_queued(self):
+        queue = self.queue
+        while queue:
+            batch = queue.popleft()
+            if self.anchor is not None:
+                batch = [(t + self.anchor, x, y, pupil) for t, x, y, pupil in batch]
+            if self.wire_format == "json":
+                self.spool.append(json.dumps({
+                    "type": "eye.data.batch",
+                    "payload": {
+                        "session_id": self.session_id,
+                        "source": "tobii",
+                        "space": "screen",
+                        "samples": batch,
+                    }
+                }).encode("utf-8"), text=True)
+            else:
+                self.spool.append(encode_frame(self.session_id, "tobii", batch))
+
+    async def _main(self, ready):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.wakeup = asyncio.Event()
+        ready.set()
+        try:
+            await self.run()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # whatever was not confirmed stays on disk for the next start
+            self._spool_queued()
+            self.spool.rewind()
+            self.spool.sync()
+            self.state = "stopped"
+
+    async def run(self):
+        backoff = BACKOFF_INITIAL
+        while True:
+            self._spool_queued()
+            self.state = "connecting"
+            try:
+                async with connect(
+                    self.url, open_timeout=OPEN_TIMEOUT, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT
+                ) as ws:
+                    self.state = "connected"
+                    backoff = BACKOFF_INITIAL
+                    await self._sync_clock(ws)
+                    await self._send_spooled(ws)
+                    return
+            except CONNECTION_ERRORS as e:
+                print(f"WS error: {e!r}")
+                self.spool.rewind()
+                if self.closing:
+                    return
+            self.state = "reconnecting"
+            self.counters["reconnects"] += 1
+            # equal jitter keeps a lab full of companions from reconnecting in step
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+            try:
+                await asyncio.wait_for(self._closed(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def _closed(self):
+        while not self.closing:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+            self._spool_queued()
+
+    async def _sync_clock(self, ws):
+        if self.clock is None:
+            return
+        for i in range(CLOCK_PROBES):
+            if i:
+                await asyncio.sleep(CLOCK_PROBE_INTERVAL)
+            await ws.send(json.dumps({"type": "clock.sync", "t": time.time()}))
+
+    async def _send_spooled(self, ws):
+        self.unacked.clear()
+        self.in_flight = 0
+        self.seq = 0
+        acks = asyncio.ensure_future(self._receive_acks(ws))
+        try:
+            await self._send_bursts(ws, acks)
+        finally:
+            acks.cancel()
+
+    async def _send_bursts(self, ws, acks):
+        next_send = 0.0
+        while True:
+            self._spool_queued()
+            sent = 0
+            while self.in_flight < MAX_IN_FLIGHT:
+                record = self.spool.peek()
+                if record is None:
+                    break
+                # only a replayed backlog comes close to this rate
+                delay = next_send - self.loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                payload, text = record
+                await ws.send(payload.decode("utf-8") if text else payload)
+                sent += 1
+                self.in_flight += 1
+                next_send = self.loop.time() + 1 / REPLAY_RATE
+            if sent:
+                self.counters["sent"] += sent
+                self.spool.sync()
+                self.seq += 1
+                self.unacked.append((self.seq, self.spool.position(), sent, self.loop.time()))
+                await ws.send(json.dumps({"type": "sync", "seq": self.seq}))
+                continue
+            if self.closing and not self.unacked:
+                return
+
+            # wait for a batch or an ack, or notice the connection dying meanwhile
+            timeout = None
+            if self.unacked:
+                timeout = self.unacked[0][3] + CONFIRM_TIMEOUT - self.loop.time()
+                if timeout <= 0:
+                    raise asyncio.TimeoutError(f"sync {self.unacked[0][0]} not acknowledged")
+            self.wakeup.clear()
+            woken = asyncio.ensure_future(self.wakeup.wait())
+            await asyncio.wait((woken, acks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            woken.cancel()
+            if acks.done():
+                acks.result()
+                raise ConnectionError("connection closed")
+
+    async def _receive_acks(self, ws):
+        async for message in ws:
+            if not isinstance(message, str):
+                continue
+            try:
+                message = json.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(message, dict) or message.get("type") != "ack":
+                continue
+            seq = message.get("seq")
+            if not isinstance(seq, int):
+                continue
+            # acks are cumulative; a late one for an earlier burst changes nothing
+            acked = 0
+            while self.unacked and self.unacked[0][0] <= seq:
+                _, position, count, sent_at = self.unacked.popleft()
+                acked += count
+            if acked:
+                self.spool.commit(position)
+                self.in_flight -= acked
+                self.counters["confirmed"] += acked
+                self.confirm_latency = self.loop.time() - sent_at
+                self.wakeup.set()